@@ -1,51 +1,477 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 import seaborn as sns
 
+from observation_store import get_observation_store
+from timeseries import MAX_CHART_POINTS, lttb_indices
+
+# Uploads above this size are scored chunk by chunk instead of in one frame.
+CHUNKED_THRESHOLD_BYTES = int(
+    os.getenv("ANOMALY_CHUNKED_THRESHOLD_BYTES", str(50 * 1024 * 1024))
+)
+CHUNK_ROWS = int(os.getenv("ANOMALY_CHUNK_ROWS", "200000"))
+SAMPLE_SIZE = int(os.getenv("ANOMALY_SAMPLE_SIZE", "100000"))
+PREVIEW_ROWS = 1000
+MAX_DISPLAY_ANOMALIES = 5000
+# Chunked-mode downloads keep at most this many rows, the most anomalous.
+MAX_DOWNLOAD_ANOMALIES = int(os.getenv("ANOMALY_MAX_DOWNLOAD_ROWS", "100000"))
+DEFAULT_CONTAMINATION = 0.05
+# Groups smaller than this are left unscored (flagged normal).
+MIN_GROUP_ROWS = 20
+# Results up to this size are drawn as a static seaborn scatter; larger ones
+# get a downsampled interactive chart.
+STATIC_PLOT_MAX_ROWS = 5000
+
+
+def _fit_score(X, contamination, n_jobs=None):
+    # Returns (flags, scores, fit seconds, score seconds). Flags are -1 for
+    # anomalies and 1 otherwise; lower scores are more anomalous.
+    model = IsolationForest(contamination=contamination, random_state=42, n_jobs=n_jobs)
+    start = time.perf_counter()
+    model.fit(X)
+    fitted = time.perf_counter()
+    scores = model.decision_function(X)
+    flags = np.where(scores < 0, -1, 1)
+    return flags, scores, fitted - start, time.perf_counter() - fitted
+
+
+def _score_group_task(key, X, contamination):
+    # Runs in a worker process; failures are returned, not raised, so one
+    # bad group does not abort the batch.
+    try:
+        return (key, *_fit_score(X, contamination, n_jobs=1), None)
+    except Exception as e:
+        return key, None, None, 0.0, 0.0, str(e)
+
+
+def detect_anomalies(
+    data,
+    columns,
+    contamination=DEFAULT_CONTAMINATION,
+    group_by=None,
+    max_workers=None,
+):
+    # Flag anomalies jointly over one or more numeric columns, with one
+    # model per group_by value when given. Groups are fitted and scored in
+    # a process pool; a single model uses all cores for its trees instead.
+    # Adds "anomaly" (-1 anomaly, 1 normal) and "anomaly_score" columns to
+    # data and returns (data, failures, stats). Rows with missing values
+    # in the selected columns are left as normal with no score.
+    if isinstance(columns, str):
+        columns = [columns]
+    values = data[columns].to_numpy(dtype=float)
+    valid = ~np.isnan(values).any(axis=1)
+    flags = np.ones(len(data), dtype=np.int8)
+    scores = np.full(len(data), np.nan)
+    failures = {}
+    fit_seconds = score_seconds = 0.0
+    start = time.perf_counter()
+
+    if group_by is None:
+        rows = np.flatnonzero(valid)
+        if len(rows):
+            f, sc, fit_seconds, score_seconds = _fit_score(
+                values[rows], contamination, n_jobs=max_workers or -1
+            )
+            flags[rows], scores[rows] = f, sc
+        groups = 1
+    else:
+        positions = {
+            key: rows[valid[rows]]
+            for key, rows in data.groupby(group_by, sort=False).indices.items()
+        }
+        groups = len(positions)
+        for key, rows in positions.items():
+            if len(rows) < MIN_GROUP_ROWS:
+                failures[key] = f"only {len(rows)} rows, need {MIN_GROUP_ROWS}"
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            futures = [
+                pool.submit(_score_group_task, key, values[rows], contamination)
+                for key, rows in positions.items()
+                if key not in failures
+            ]
+            for future in as_completed(futures):
+                key, f, sc, fit_s, score_s, error = future.result()
+                if error is not None:
+                    failures[key] = error
+                    continue
+                rows = positions[key]
+                flags[rows], scores[rows] = f, sc
+                fit_seconds += fit_s
+                score_seconds += score_s
+
+    elapsed = time.perf_counter() - start
+    data["anomaly"] = flags
+    data["anomaly_score"] = scores
+    scored = int(np.isfinite(scores).sum())
+    stats = {
+        "rows": len(data),
+        "scored_rows": scored,
+        "anomalies": int((flags == -1).sum()),
+        "groups": groups,
+        "failed": len(failures),
+        "elapsed": elapsed,
+        # Fit and score rates are per worker, from time spent in each phase.
+        "fit_rows_per_second": scored / fit_seconds if fit_seconds else 0.0,
+        "score_rows_per_second": scored / score_seconds if score_seconds else 0.0,
+        "rows_per_second": len(data) / elapsed if elapsed else 0.0,
+    }
+    return data, failures, stats
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def read_preview(source, nrows=PREVIEW_ROWS):
+    # First rows only, for the preview table and the column picker.
+    preview = pd.read_csv(_rewind(source), nrows=nrows)
+    _rewind(source)
+    return preview
+
+
+def _as_columns(columns):
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def reservoir_sample(source, columns, size=SAMPLE_SIZE, chunksize=CHUNK_ROWS, seed=42):
+    # Uniform sample of rows without holding the file in memory
+    # (Algorithm R, vectorized per chunk). Reads only the given columns, as
+    # float32, skipping rows with missing values. Returns (sample of shape
+    # (n, len(columns)), total complete rows seen).
+    columns = _as_columns(columns)
+    rng = np.random.default_rng(seed)
+    sample = np.empty((size, len(columns)), dtype=np.float32)
+    seen = 0
+    for chunk in pd.read_csv(
+        _rewind(source),
+        usecols=columns,
+        dtype=dict.fromkeys(columns, np.float32),
+        chunksize=chunksize,
+    ):
+        values = chunk[columns].dropna().to_numpy()
+        fill = min(max(size - seen, 0), len(values))
+        sample[seen : seen + fill] = values[:fill]
+        rest = values[fill:]
+        if len(rest):
+            # Item number t (0-based) replaces a random slot with
+            # probability size / (t + 1). On repeated slots the later item
+            # wins, as in the sequential algorithm.
+            t = seen + fill + np.arange(len(rest))
+            slots = rng.integers(0, t + 1)
+            keep = slots < size
+            sample[slots[keep]] = rest[keep]
+        seen += len(values)
+    return sample[: min(seen, size)], seen
+
+
+def fit_sample_model(sample, contamination=DEFAULT_CONTAMINATION):
+    model = IsolationForest(contamination=contamination, random_state=42, n_jobs=-1)
+    model.fit(sample)
+    return model
+
+
+def score_chunks(source, columns, model, chunksize=CHUNK_ROWS):
+    # Score the whole file chunk by chunk. Yields (anomalous rows, rows
+    # scored) per chunk; anomalous rows keep their original row number as
+    # the index and carry an "anomaly_score" column (lower is more
+    # anomalous). Rows with missing values in the columns are skipped.
+    columns = _as_columns(columns)
+    for chunk in pd.read_csv(
+        _rewind(source),
+        dtype=dict.fromkeys(columns, np.float32),
+        chunksize=chunksize,
+    ):
+        values = chunk[columns].to_numpy()
+        valid = ~np.isnan(values).any(axis=1)
+        scores = np.zeros(len(chunk), dtype=np.float32)
+        if valid.any():
+            scores[valid] = model.decision_function(values[valid])
+        anomalous = scores < 0
+        yield chunk[anomalous].assign(anomaly_score=scores[anomalous]), len(chunk)
+
+
+def detect_anomalies_chunked(
+    source,
+    columns,
+    sample_size=SAMPLE_SIZE,
+    chunksize=CHUNK_ROWS,
+    contamination=DEFAULT_CONTAMINATION,
+):
+    # Fit on a reservoir sample of the columns, then stream the anomalous
+    # rows of the full file. Peak memory is bounded by chunksize and
+    # sample_size, not by the file size. Yields what score_chunks yields.
+    sample, _ = reservoir_sample(source, columns, sample_size, chunksize)
+    if not len(sample):
+        return
+    model = fit_sample_model(sample, contamination)
+    yield from score_chunks(source, columns, model, chunksize)
 
-def detect_anomalies(data, column):
-    model = IsolationForest(contamination=0.05, random_state=42)
-    data["anomaly"] = model.fit_predict(data[[column]])
-    return data
+
+def _most_anomalous(kept, anomalies, limit):
+    # The limit lowest-scoring rows of kept and anomalies together.
+    both = pd.concat([kept, anomalies]) if kept is not None else anomalies
+    return both.nsmallest(limit, "anomaly_score") if len(both) > limit else both
+
+
+def chunked_detection(uploaded_file, columns, contamination):
+    # Streamlit holds the whole upload in memory as an UploadedFile, so
+    # chunking bounds the parsing and scoring, not the upload itself. The
+    # download is capped at the MAX_DOWNLOAD_ANOMALIES most anomalous rows
+    # for the same reason: download_button keeps its payload in memory.
+    progress = st.progress(0.0)
+    status = st.empty()
+    total_bytes = uploaded_file.size or 1
+    shown, kept, found, scored = [], None, 0, 0
+    for anomalies, rows in detect_anomalies_chunked(
+        uploaded_file, columns, contamination=contamination
+    ):
+        scored += rows
+        found += len(anomalies)
+        kept = _most_anomalous(kept, anomalies, MAX_DOWNLOAD_ANOMALIES)
+        if sum(len(a) for a in shown) < MAX_DISPLAY_ANOMALIES:
+            shown.append(anomalies)
+        progress.progress(min(uploaded_file.tell() / total_bytes, 1.0))
+        status.write(f"Scored {scored:,} rows, {found:,} anomalies so far")
+    progress.progress(1.0)
+
+    st.write(f"📍 {found:,} anomalies in {scored:,} rows")
+    if shown:
+        table = pd.concat(shown).head(MAX_DISPLAY_ANOMALIES)
+        if found > len(table):
+            st.caption(f"Showing the first {len(table):,}; download for more.")
+        st.dataframe(table)
+    if kept is not None and len(kept):
+        if found > len(kept):
+            st.caption(
+                f"The download has the {len(kept):,} most anomalous of "
+                f"{found:,} rows."
+            )
+        st.download_button(
+            "📥 Download Anomalies CSV",
+            kept.sort_index().to_csv(index_label="row"),
+            file_name="anomalies.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+
+def _thin_scatter(x, y, bins=100):
+    # One point per occupied cell of a bins x bins grid: keeps the outline
+    # and density structure of a 2-D scatter at a bounded point count.
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if not len(x):
+        return np.arange(0)
+    cells = []
+    for v in (x, y):
+        span = np.ptp(v) or 1.0
+        cells.append(
+            np.minimum(((v - v.min()) / span * bins).astype(np.int64), bins - 1)
+        )
+    _, first = np.unique(cells[0] * bins + cells[1], return_index=True)
+    return np.sort(first)
+
+
+def anomaly_figure(result_df, columns, max_points=MAX_CHART_POINTS):
+    # Interactive chart of detection results. Every anomaly is drawn; normal
+    # points are downsampled (LTTB over rows, or grid thinning for a
+    # two-column scatter) so the chart stays light for any input size.
+    y_column = columns[0]
+    x_column = columns[1] if len(columns) > 1 else None
+    anomalous = result_df["anomaly"].to_numpy() == -1
+    x = result_df[x_column].to_numpy() if x_column else np.arange(len(result_df))
+    y = result_df[y_column].to_numpy(dtype=float)
+
+    normal = np.flatnonzero(~anomalous & ~np.isnan(y))
+    if x_column:
+        keep = normal[_thin_scatter(x[normal], y[normal])]
+    else:
+        keep = normal[lttb_indices(x[normal], y[normal], max_points)]
+    anomalies = np.flatnonzero(anomalous)
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scattergl(
+            x=x[keep],
+            y=y[keep],
+            mode="markers" if x_column else "lines",
+            name=f"Normal ({len(keep):,} of {len(normal):,} shown)",
+            marker=dict(color="green", size=4),
+            line=dict(color="green", width=1),
+        )
+    )
+    fig.add_trace(
+        go.Scattergl(
+            x=x[anomalies],
+            y=y[anomalies],
+            mode="markers",
+            name=f"Anomaly ({len(anomalies):,})",
+            marker=dict(color="red", size=6),
+        )
+    )
+    fig.update_layout(
+        title=f"Anomaly Detection on {', '.join(columns)}",
+        xaxis_title=x_column or "row",
+        yaxis_title=y_column,
+    )
+    return fig
+
+
+def anomaly_plot(result_df, columns):
+    if len(result_df) > STATIC_PLOT_MAX_ROWS:
+        st.plotly_chart(anomaly_figure(result_df, columns), use_container_width=True)
+        return
+
+    # Plot: the first column over rows, or the first two columns against
+    # each other for multivariate models.
+    x_column = columns[1] if len(columns) > 1 else None
+    fig, ax = plt.subplots()
+    sns.scatterplot(
+        data=result_df,
+        x=x_column or result_df.index,
+        y=columns[0],
+        hue="anomaly",
+        palette={1: "green", -1: "red"},
+        ax=ax,
+    )
+    ax.set_title(f"Anomaly Detection on {', '.join(columns)}")
+    st.pyplot(fig)
+
+
+# Bucket sizes offered when reading from the observation store; readings
+# from different APIs are lined up by averaging them per bucket.
+STORE_BUCKETS = {"15min": 15 * 60, "Hourly": 60 * 60, "Daily": 24 * 60 * 60}
+
+
+def load_observations():
+    # Wide (city, ds, metric...) frame picked from the observation store, or
+    # None while the store is empty or no city is selected.
+    store = get_observation_store()
+    cities = store.cities()
+    # A series can exist before any of its readings are committed.
+    span = store.time_range() if cities else None
+    if span is None:
+        st.info(
+            "ℹ️ No observations recorded yet. Weather, AQI and traffic lookups "
+            "are stored as they are made."
+        )
+        return None
+    selected = st.multiselect(
+        "🏙️ Cities", cities, default=cities[:1], key="anomaly_store_cities"
+    )
+    first, last = span
+    c1, c2 = st.columns(2)
+    start = c1.date_input("From", first.date(), key="anomaly_store_from")
+    end = c2.date_input("To", last.date(), key="anomaly_store_to")
+    label = st.selectbox(
+        "🕒 Resolution", list(STORE_BUCKETS), index=1, key="anomaly_store_bucket"
+    )
+    if not selected:
+        return None
+    return store.frame(
+        selected,
+        start=start,
+        end=pd.Timestamp(end) + pd.Timedelta(days=1),
+        bucket=STORE_BUCKETS[label],
+    )
 
 
 def anomaly_detection():
     st.title("🚨 Anomaly Detection")
 
-    uploaded_file = st.file_uploader("📂 Upload CSV File", type=["csv"])
-    if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+    source = st.radio(
+        "📥 Data source", ["📂 Upload CSV", "🗄️ Observation store"], horizontal=True
+    )
+    chunked = False
+    uploaded_file = None
+    if source == "📂 Upload CSV":
+        uploaded_file = st.file_uploader("📂 Upload CSV File", type=["csv"])
+        if not uploaded_file:
+            return
+        chunked = st.checkbox(
+            "🧩 Chunked mode for large files (fits on a sample, streams results)",
+            value=(uploaded_file.size or 0) > CHUNKED_THRESHOLD_BYTES,
+        )
+        df = read_preview(uploaded_file) if chunked else pd.read_csv(uploaded_file)
         st.success("✅ File Uploaded Successfully")
+    else:
+        df = load_observations()
+        if df is None or df.empty:
+            return
 
-        st.write("📊 Preview of Data")
-        st.dataframe(df.head())
+    st.write("📊 Preview of Data")
+    st.dataframe(df.head())
 
-        numeric_columns = df.select_dtypes(include=["float", "int"]).columns.tolist()
+    numeric_columns = df.select_dtypes(include=["float", "int"]).columns.tolist()
 
-        if numeric_columns:
-            selected_column = st.selectbox(
-                "📈 Select column to detect anomalies", numeric_columns
+    if numeric_columns:
+        selected_columns = st.multiselect(
+            "📈 Select columns to detect anomalies (jointly)",
+            numeric_columns,
+            default=numeric_columns[:1],
+        )
+        contamination = st.slider(
+            "🎯 Expected share of anomalies (contamination)",
+            min_value=0.001,
+            max_value=0.5,
+            value=DEFAULT_CONTAMINATION,
+            step=0.001,
+            format="%.3f",
+        )
+        group_by = None
+        if not chunked:
+            group_options = [None] + [
+                c for c in df.columns if c not in selected_columns
+            ]
+            group_by = st.selectbox(
+                "🗂️ Train a separate model per (optional)",
+                group_options,
+                index=group_options.index("city") if "city" in group_options else 0,
+                format_func=lambda c: "— one model for all rows —" if c is None else c,
             )
 
-            if st.button("🔍 Detect Anomalies"):
-                result_df = detect_anomalies(df.copy(), selected_column)
-
-                st.write("📍 Anomaly Flags (-1 = Anomaly, 1 = Normal)")
-                st.dataframe(result_df[result_df["anomaly"] == -1])
-
-                # Plot
-                fig, ax = plt.subplots()
-                sns.scatterplot(
-                    data=result_df,
-                    x=result_df.index,
-                    y=selected_column,
-                    hue="anomaly",
-                    palette={1: "green", -1: "red"},
-                    ax=ax,
+        if not selected_columns:
+            st.info("Select at least one column.")
+        elif st.button("🔍 Detect Anomalies"):
+            if chunked:
+                chunked_detection(uploaded_file, selected_columns, contamination)
+                return
+
+            # Metrics missing in a bucket (e.g. no traffic reading that hour)
+            # cannot be scored jointly.
+            df = df.dropna(subset=selected_columns)
+            with st.spinner("Fitting and scoring..."):
+                result_df, failures, stats = detect_anomalies(
+                    df.copy(), selected_columns, contamination, group_by
+                )
+
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Anomalies", f"{stats['anomalies']:,}")
+            c2.metric("Models", stats["groups"] - stats["failed"])
+            c3.metric("Fit (per worker)", f"{stats['fit_rows_per_second']:,.0f} rows/s")
+            c4.metric(
+                "Score (per worker)",
+                f"{stats['score_rows_per_second']:,.0f} rows/s",
+            )
+            if failures:
+                st.warning("⚠️ Some groups were not scored:")
+                st.dataframe(
+                    pd.DataFrame(list(failures.items()), columns=[group_by, "error"])
                 )
-                ax.set_title(f"Anomaly Detection on {selected_column}")
-                st.pyplot(fig)
-        else:
-            st.warning("⚠️ No numeric columns available in uploaded file.")
+
+            st.write("📍 Anomaly Flags (-1 = Anomaly, 1 = Normal)")
+            st.dataframe(result_df[result_df["anomaly"] == -1])
+
+            anomaly_plot(result_df, selected_columns)
+    else:
+        st.warning("⚠️ No numeric columns available in the data.")
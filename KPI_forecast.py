@@ -1,53 +1,272 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import streamlit as st
 import pandas as pd
-from prophet import Prophet
 import plotly.graph_objects as go
+from forecast_cache import get_or_fit_forecast, series_hash
+from forecasters import ENGINE_LABELS, get_forecaster
+from observation_store import get_observation_store
+from timeseries import (
+    FREQUENCIES,
+    coarser_frequencies,
+    downsample_minmax,
+    infer_frequency,
+    resample_series,
+)
+
+# Fit workers start from a clean interpreter (forkserver, or spawn) rather
+# than a fork of the threaded Streamlit process.
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_SOURCE_LABELS = {
+    "memory": "♻️ Reused fitted model from this session's cache",
+    "disk": "💾 Loaded fitted model from disk cache",
+    "warm": "🔥 Refitted, warm-started from the previous fit of this series",
+    "cold": "🆕 Fitted a new model",
+}
+
+
+def _fit_series_task(series_id, series_df, engine, periods, freq):
+    # Runs in a worker process; failures are returned, not raised, so one
+    # bad series does not abort the batch.
+    start = time.perf_counter()
+    try:
+        forecast = get_forecaster(engine).fit(series_df).forecast(periods, freq)
+        out = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
+        out.insert(0, "series_id", series_id)
+        return series_id, out, None, time.perf_counter() - start
+    except Exception as e:
+        return series_id, None, str(e), time.perf_counter() - start
+
+
+def fit_grouped_forecasts(
+    df,
+    id_column,
+    engine="fast",
+    periods=None,
+    freq=None,
+    max_workers=None,
+    on_result=None,
+    how="sum",
+):
+    # Fit one model per series in a process pool across all cores, after
+    # summing (or with how="mean", averaging) each series into freq buckets
+    # (inferred when not given).
+    # Returns a long-format forecast (series_id, ds, yhat, ...) of the next
+    # periods buckets, per-series failures and throughput stats.
+    # on_result(done, total, series_id, error) is called from the calling
+    # thread as each series finishes.
+    freq = freq or infer_frequency(df["ds"])
+    periods = periods or FREQUENCIES[freq][2]
+    resampled = resample_series(df, freq, id_column, how)
+    groups = [
+        (series_id, group[["ds", "y"]].reset_index(drop=True))
+        for series_id, group in resampled.groupby(id_column, sort=False)
+    ]
+    forecasts, failures = [], {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(), mp_context=_MP_CONTEXT
+    ) as pool:
+        futures = [
+            pool.submit(_fit_series_task, series_id, group, engine, periods, freq)
+            for series_id, group in groups
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            series_id, forecast, error, _ = future.result()
+            if error is None:
+                forecasts.append(forecast)
+            else:
+                failures[series_id] = error
+            if on_result:
+                on_result(done, len(groups), series_id, error)
+
+    elapsed = time.perf_counter() - start
+    combined = (
+        pd.concat(forecasts, ignore_index=True)
+        if forecasts
+        else pd.DataFrame(columns=["series_id", "ds", "yhat"])
+    )
+    stats = {
+        "series": len(groups),
+        "failed": len(failures),
+        "elapsed": elapsed,
+        "series_per_second": len(groups) / elapsed if elapsed else 0.0,
+    }
+    return combined, failures, stats
+
+
+def grouped_forecast(df, id_column, engine, periods, freq, how="sum"):
+    st.subheader(f"🗂️ Grouped Forecast by '{id_column}'")
+    st.write(f"{df[id_column].nunique()} series found")
+    # Results survive reruns (e.g. the download click) for the same upload.
+    result_key = (id_column, engine, periods, freq, how, series_hash(df))
+    stored = st.session_state.get("kpi_grouped_result")
+    if stored is not None and stored[0] != result_key:
+        del st.session_state.kpi_grouped_result
+
+    if st.button("🚀 Forecast All Series"):
+        progress = st.progress(0.0)
+        status = st.empty()
+
+        def on_result(done, total, series_id, error):
+            progress.progress(done / total)
+            state = f"❌ {error}" if error else "✅"
+            status.write(f"{done}/{total} — {series_id}: {state}")
+
+        st.session_state.kpi_grouped_result = (
+            result_key,
+            fit_grouped_forecasts(
+                df, id_column, engine, periods, freq, on_result=on_result, how=how
+            ),
+        )
+
+    if "kpi_grouped_result" in st.session_state:
+        combined, failures, stats = st.session_state.kpi_grouped_result[1]
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Series", stats["series"])
+        c2.metric("Failed", stats["failed"])
+        c3.metric("Throughput", f"{stats['series_per_second']:.2f} series/s")
+        if failures:
+            st.warning("⚠️ Some series could not be forecast:")
+            st.dataframe(
+                pd.DataFrame(list(failures.items()), columns=[id_column, "error"])
+            )
+        st.download_button(
+            "📥 Download Long-Format Forecast CSV",
+            combined.rename(columns={"series_id": id_column}).to_csv(index=False),
+            file_name="grouped_forecast.csv",
+            mime="text/csv",
+        )
+
+
+def load_observations():
+    # One metric for one or more cities from the observation store, as a
+    # (city, ds, y) frame; None while the store is empty or nothing is
+    # selected.
+    store = get_observation_store()
+    cities = store.cities()
+    # Series rows are written before their readings commit, so the store
+    # can have cities but no observations yet.
+    span = store.time_range() if cities else None
+    if span is None:
+        st.info(
+            "ℹ️ No observations recorded yet. Weather, AQI and traffic lookups "
+            "are stored as they are made."
+        )
+        return None
+    selected = st.multiselect(
+        "🏙️ Cities", cities, default=cities[:1], key="kpi_store_cities"
+    )
+    metric = st.selectbox(
+        "📏 Metric", store.metrics(selected or None), key="kpi_store_metric"
+    )
+    first, last = span
+    c1, c2 = st.columns(2)
+    start = c1.date_input("From", first.date(), key="kpi_store_from")
+    end = c2.date_input("To", last.date(), key="kpi_store_to")
+    if not selected or metric is None:
+        return None
+    df = store.query(selected, metric, start, pd.Timestamp(end) + pd.Timedelta(days=1))
+    return df.rename(columns={"value": "y"})[["city", "ds", "y"]]
+
+
+def read_upload():
+    uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
+    if not uploaded_file:
+        return None
+    df = pd.read_csv(uploaded_file)
+
+    if "date" not in df.columns or "usage_kwh" not in df.columns:
+        st.error("CSV must have 'date' and 'usage_kwh' columns.")
+        return None
+
+    df = df.rename(columns={"date": "ds", "usage_kwh": "y"})
+    df["ds"] = pd.to_datetime(df["ds"])
+    return df
 
 
 def kpi_forecast():
     st.title("📈 Forecast KPI from Uploaded File")
 
-    uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
-    if uploaded_file:
-        try:
-            df = pd.read_csv(uploaded_file)
-
-            if "date" not in df.columns or "usage_kwh" not in df.columns:
-                st.error("CSV must have 'date' and 'usage_kwh' columns.")
-                return
-
-            df = df.rename(columns={"date": "ds", "usage_kwh": "y"})
-            df["ds"] = pd.to_datetime(df["ds"])
-
-            st.subheader("📊 Uploaded Historical Data")
-            st.line_chart(df.set_index("ds")["y"])
-
-            # Train Prophet
-            with st.spinner("Training forecasting model..."):
-                model = Prophet()
-                model.fit(df)
-
-                future = model.make_future_dataframe(periods=365 * 5)  # Next 5 years
-                forecast = model.predict(future)
-
-            st.subheader("📈 Forecast for Next 5 Years")
-            fig = go.Figure()
-            fig.add_trace(
-                go.Scatter(
-                    x=forecast["ds"], y=forecast["yhat"], name="Forecasted Usage"
-                )
-            )
-            fig.add_trace(go.Scatter(x=df["ds"], y=df["y"], name="Historical Usage"))
-            st.plotly_chart(fig, use_container_width=True)
-
-            # Optional: download forecast
-            csv = forecast[["ds", "yhat"]].to_csv(index=False)
-            st.download_button(
-                "📥 Download Forecast CSV",
-                csv,
-                file_name="forecast.csv",
-                mime="text/csv",
+    data_source = st.radio(
+        "📥 Data source", ["📂 Upload CSV", "🗄️ Observation store"], horizontal=True
+    )
+    try:
+        # Uploaded KPIs are totals (kWh) and are summed into buckets; stored
+        # observations are levels (°C, AQI, km/h) and are averaged.
+        if data_source == "📂 Upload CSV":
+            df, how = read_upload(), "sum"
+        else:
+            df, how = load_observations(), "mean"
+        if df is None or df.empty:
+            return
+        if "city" in df.columns and df["city"].nunique() == 1:
+            df = df.drop(columns="city")
+
+        engine = st.radio(
+            "⚙️ Forecasting engine",
+            list(ENGINE_LABELS),
+            format_func=ENGINE_LABELS.get,
+            horizontal=True,
+        )
+
+        input_freq = infer_frequency(df["ds"])
+        c1, c2 = st.columns(2)
+        freq = c1.selectbox(
+            f"🕒 Output frequency (input looks {FREQUENCIES[input_freq][0].lower()})",
+            coarser_frequencies(input_freq),
+            format_func=lambda f: FREQUENCIES[f][0],
+        )
+        label, _, default_periods, max_periods = FREQUENCIES[freq]
+        periods = int(
+            c2.number_input(
+                f"🔭 Horizon ({label.lower()} periods)",
+                min_value=1,
+                max_value=max_periods,
+                value=default_periods,
             )
+        )
+
+        id_columns = [c for c in df.columns if c not in ("ds", "y")]
+        if id_columns and st.checkbox(
+            "🗂️ Forecast each meter/district separately (grouped mode)"
+        ):
+            id_column = st.selectbox("Series ID column", id_columns)
+            grouped_forecast(df, id_column, engine, periods, freq, how)
+            return
+
+        series = resample_series(df, freq, how=how)
+
+        st.subheader("📊 Uploaded Historical Data")
+        hist_x, hist_y = downsample_minmax(series["ds"], series["y"])
+        st.line_chart(pd.Series(hist_y, index=hist_x, name="y"))
+
+        # Fit the selected engine, or reuse a cached fit of the same series
+        with st.spinner("Training forecasting model..."):
+            model, forecast, source = get_or_fit_forecast(series, engine, periods, freq)
+        st.caption(_SOURCE_LABELS[source])
+
+        st.subheader(f"📈 Forecast for Next {periods} {label} Periods")
+        fig = go.Figure()
+        x, y = downsample_minmax(forecast["ds"], forecast["yhat"])
+        fig.add_trace(go.Scatter(x=x, y=y, name="Forecasted Usage"))
+        fig.add_trace(go.Scatter(x=hist_x, y=hist_y, name="Historical Usage"))
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Optional: download forecast
+        csv = forecast[["ds", "yhat"]].to_csv(index=False)
+        st.download_button(
+            "📥 Download Forecast CSV",
+            csv,
+            file_name="forecast.csv",
+            mime="text/csv",
+        )
 
-        except Exception as e:
-            st.error(f"❌ Error processing file: {str(e)}")
+    except Exception as e:
+        st.error(f"❌ Error processing file: {str(e)}")
@@ -1,26 +1,39 @@
 import streamlit as st
 import os
+import requests
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Import custom modules
+# Import custom modules. Only the light ones used by the sidebar and the
+# city tabs are imported here; the rest are loaded by module_registry when
+# their tab is first opened.
 from weather import (
     get_weather_data,
+    get_city_coords,
+    cache_stats,
+    display_current_weather,
     get_weekly_forecast,
     display_weekly_forecast,
     get_air_pollution_data,
     display_air_pollution,
     plot_forecast_chart,
 )
-from traffic import get_traffic_data, display_traffic_data
-from chatbot import run_chatbot
-from summarizer import run_summarizer
-from KPI_forecast import kpi_forecast
-from customer_feedback import feedback_form
-from Anomoly_detection import anomaly_detection
-from Eco_tips import eco_tips_module
+from traffic import (
+    get_traffic_data,
+    display_traffic_data,
+    display_traffic_survey,
+    load_corridors,
+    survey_city,
+)
+from traffic import cache_stats as traffic_cache_stats
+from http_client import client_stats, error_message
+from granite_client import client_stats as granite_stats
+from observation_store import recording_stats
+from city_snapshot import fetch_city_snapshot
+from module_registry import import_times, is_loaded, load_target, start_preload
+from prewarm import get_prewarm_scheduler
 
 
 # -------------------- Custom Background & Styling --------------------
@@ -51,33 +64,46 @@ st.markdown(
 )
 
 
-# -------------------- Main Dashboard --------------------
-def main():
-    st.set_page_config(page_title="Smart City Assistant", layout="wide")
-    st.sidebar.title("🧭 Smart City Assistant")
+# -------------------- Pages --------------------
+# Timeouts, exhausted retries, HTTP errors and undecodable bodies from the
+# upstream APIs; shown to the user instead of a traceback.
+UPSTREAM_ERRORS = (requests.RequestException, ValueError)
 
-    selected_module = st.sidebar.radio(
-        "📚 Choose a Module",
-        [
-            "🌦️ Weather Forecast",
-            "🌫️ Air Pollution",
-            "🚦 Traffic Monitor",
-            "📝 Policy Summarizer",
-            "🤖 Chat Assistant",
-            "📊 KPI Forecast 📈",
-            "🚨 Anomaly Detection",
-            "🗣️ Customer Feedback ",
-            "🌿 Eco Tips",
-        ],
-    )
 
-    if selected_module == "🌦️ Weather Forecast":
-        st.markdown(
-            '<div class="section"><div class="title">🌦️ Weather Forecast Module</div>',
-            unsafe_allow_html=True,
-        )
-        city = st.text_input("🏙️ Enter City", "London")
-        if st.button("📡 Get Weather"):
+def show_upstream_error(error):
+    st.error(f"⚠️ Could not fetch data: {error_message(error)}")
+
+
+def city_overview_page():
+    city = st.text_input("🏙️ Enter City", "London", key="overview_city")
+    if st.button("📡 Get City Overview"):
+        try:
+            get_prewarm_scheduler().track_request(city)
+            snapshot = fetch_city_snapshot(city)
+            if snapshot.found:
+                st.success(f"✅ {city} overview fetched in {snapshot.elapsed:.2f}s")
+                if snapshot.weather:
+                    display_current_weather(snapshot.weather)
+                if snapshot.forecast:
+                    display_weekly_forecast(snapshot.forecast)
+                    plot_forecast_chart(snapshot.forecast)
+                if snapshot.air_pollution:
+                    display_air_pollution(snapshot.air_pollution)
+                if snapshot.traffic:
+                    display_traffic_data(snapshot.traffic)
+                for name, error in snapshot.errors.items():
+                    st.warning(f"⚠️ {name}: {error}")
+            else:
+                st.error("🚫 City not found.")
+        except UPSTREAM_ERRORS as e:
+            show_upstream_error(e)
+
+
+def weather_page():
+    city = st.text_input("🏙️ Enter City", "London")
+    if st.button("📡 Get Weather"):
+        try:
+            get_prewarm_scheduler().track_request(city, ("weather", "forecast"))
             api_key = os.getenv("openweathermap_api")
             weather_data = get_weather_data(city, api_key)
             if weather_data.get("cod") != 404:
@@ -85,101 +111,167 @@ def main():
                 lon = weather_data["coord"]["lon"]
                 forecast_data = get_weekly_forecast(api_key, lat, lon)
                 st.success(f"✅ Live Weather in {city}")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric(
-                        "🌡️ Temperature",
-                        f"{weather_data['main']['temp'] - 273.15:.2f}°C",
-                    )
-                    st.metric("💧 Humidity", f"{weather_data['main']['humidity']}%")
-                with col2:
-                    st.metric("📊 Pressure", f"{weather_data['main']['pressure']} hPa")
-                    st.metric("🌬️ Wind Speed", f"{weather_data['wind']['speed']} m/s")
+                display_current_weather(weather_data)
                 display_weekly_forecast(forecast_data)
                 plot_forecast_chart(forecast_data)
             else:
                 st.error("🚫 City not found.")
-        st.markdown("</div>", unsafe_allow_html=True)
+        except UPSTREAM_ERRORS as e:
+            show_upstream_error(e)
 
-    elif selected_module == "🌫️ Air Pollution":
-        st.markdown(
-            '<div class="section"><div class="title">🌫️ Air Quality Index Monitor</div>',
-            unsafe_allow_html=True,
-        )
-        city = st.text_input("🏙️ Enter City for AQI", "Delhi")
-        if st.button("🔍 Get AQI"):
+
+def air_pollution_page():
+    city = st.text_input("🏙️ Enter City for AQI", "Delhi")
+    if st.button("🔍 Get AQI"):
+        try:
+            get_prewarm_scheduler().track_request(city, ("air_pollution",))
             api_key = os.getenv("openweathermap_api")
-            weather_data = get_weather_data(city, api_key)
-            if weather_data.get("cod") != 404:
-                lat = weather_data["coord"]["lat"]
-                lon = weather_data["coord"]["lon"]
+            coords = get_city_coords(city, api_key)
+            if coords is not None:
+                lat, lon = coords
                 pollution_data = get_air_pollution_data(lat, lon, api_key)
                 display_air_pollution(pollution_data)
             else:
                 st.error("🚫 City not found.")
-        st.markdown("</div>", unsafe_allow_html=True)
+        except UPSTREAM_ERRORS as e:
+            show_upstream_error(e)
 
-    elif selected_module == "🚦 Traffic Monitor":
-        st.markdown(
-            '<div class="section"><div class="title">🚦 Real-Time Traffic Monitoring</div>',
-            unsafe_allow_html=True,
-        )
-        city = st.text_input("🚗 City for Traffic", "Hyderabad")
-        if st.button("🛰️ Get Traffic Data"):
+
+def traffic_page():
+    city = st.text_input("🚗 City for Traffic", "Hyderabad")
+    areas = load_corridors().get(city.strip().lower(), {})
+    modes = ["📍 City centre", "🗺️ Area grid"] + [f"🛣️ {name}" for name in areas]
+    mode = st.radio("Sampling", modes, horizontal=True)
+    if st.button("🛰️ Get Traffic Data"):
+        try:
+            if mode == modes[0]:
+                get_prewarm_scheduler().track_request(city, ("traffic",))
             weather_api_key = os.getenv("openweathermap_api")
             tomtom_api_key = os.getenv("TOMTOM_API_KEY")
-            weather_data = get_weather_data(city, weather_api_key)
-            if weather_data.get("cod") != 404:
-                lat = weather_data["coord"]["lat"]
-                lon = weather_data["coord"]["lon"]
+            coords = get_city_coords(city, weather_api_key)
+            if coords is None:
+                st.error("🚫 City not found.")
+                return
+            lat, lon = coords
+            if mode == modes[0]:
                 traffic_data = get_traffic_data(lat, lon, tomtom_api_key)
                 display_traffic_data(traffic_data)
-            else:
-                st.error("🚫 City not found.")
-        st.markdown("</div>", unsafe_allow_html=True)
+                return
+            progress = st.progress(0.0)
+            df, errors, stats = survey_city(
+                city,
+                lat,
+                lon,
+                tomtom_api_key,
+                corridor=None if mode == modes[1] else mode.split(" ", 1)[1],
+                on_progress=lambda done, total: progress.progress(done / total),
+            )
+            display_traffic_survey(df, errors, stats, lat, lon)
+        except UPSTREAM_ERRORS as e:
+            show_upstream_error(e)
 
-    elif selected_module == "📝 Policy Summarizer":
-        st.markdown(
-            '<div class="section"><div class="title">📝 Policy Summarizer</div>',
-            unsafe_allow_html=True,
-        )
-        run_summarizer()
-        st.markdown("</div>", unsafe_allow_html=True)
 
-    elif selected_module == "🤖 Chat Assistant":
-        st.markdown(
-            '<div class="section"><div class="title">🤖 Smart City Chatbot</div>',
-            unsafe_allow_html=True,
-        )
-        run_chatbot()
-        st.markdown("</div>", unsafe_allow_html=True)
+# Sidebar label -> (section title, page). Pages given as "module:function"
+# are imported the first time their tab is opened; a None title renders the
+# page without the section card.
+MODULES = {
+    "🏙️ City Overview": ("🏙️ City Overview", city_overview_page),
+    "🌦️ Weather Forecast": ("🌦️ Weather Forecast Module", weather_page),
+    "🌫️ Air Pollution": ("🌫️ Air Quality Index Monitor", air_pollution_page),
+    "🚦 Traffic Monitor": ("🚦 Real-Time Traffic Monitoring", traffic_page),
+    "📋 Batch Monitor": (
+        "📋 Multi-City Batch Monitor",
+        "batch_monitor:batch_monitor",
+    ),
+    "📝 Policy Summarizer": ("📝 Policy Summarizer", "summarizer:run_summarizer"),
+    "🤖 Chat Assistant": ("🤖 Smart City Chatbot", "chatbot:run_chatbot"),
+    "📊 KPI Forecast 📈": (
+        "📊 Key Performance Indicator Forecast",
+        "KPI_forecast:kpi_forecast",
+    ),
+    "🚨 Anomaly Detection": (
+        "🚨 Anomaly Detection",
+        "Anomoly_detection:anomaly_detection",
+    ),
+    "🗣️ Customer Feedback ": (
+        "🗣️ Customer Feedback Portal",
+        "customer_feedback:feedback_form",
+    ),
+    "📈 Feedback Analytics": (
+        "📈 Feedback Analytics",
+        "customer_feedback:feedback_dashboard",
+    ),
+    "🌿 Eco Tips": (None, "Eco_tips:eco_tips_module"),
+}
 
-    elif selected_module == "📊 KPI Forecast 📈":
-        st.markdown(
-            '<div class="section"><div class="title">📊 Key Performance Indicator Forecast</div>',
-            unsafe_allow_html=True,
-        )
-        kpi_forecast()
-        st.markdown("</div>", unsafe_allow_html=True)
 
-    elif selected_module == "🗣️ Customer Feedback ":
-        st.markdown(
-            '<div class="section"><div class="title">🗣️ Customer Feedback Portal</div>',
-            unsafe_allow_html=True,
+# -------------------- Main Dashboard --------------------
+def main():
+    st.set_page_config(page_title="Smart City Assistant", layout="wide")
+    st.sidebar.title("🧭 Smart City Assistant")
+    start_preload([page for _, page in MODULES.values()])
+    prewarm = get_prewarm_scheduler()
+
+    selected_module = st.sidebar.radio("📚 Choose a Module", list(MODULES))
+
+    with st.sidebar.expander("🗄️ API Cache Stats"):
+        for name, stats in {**cache_stats(), **traffic_cache_stats()}.items():
+            st.write(
+                f"**{name}**: {stats['hits']} hits / {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%}), {stats['size']} entries"
+            )
+        http = client_stats()
+        st.write(
+            f"**upstream**: {http['requests']} requests, "
+            f"{http['coalesced']} coalesced, {http['errors']} errors"
+        )
+        granite = granite_stats()
+        st.write(
+            f"**granite**: {granite['created']} created, {granite['reused']} reused, "
+            f"{granite['saved_seconds']:.2f}s setup saved"
+        )
+        recording = recording_stats()
+        st.write(
+            f"**observations**: {recording['errors']} unrecorded responses, "
+            f"{recording['dropped']} rows dropped"
         )
-        feedback_form()
-        st.markdown("</div>", unsafe_allow_html=True)
 
-    elif selected_module == "🚨 Anomaly Detection":
-        st.markdown(
-            '<div class="section"><div class="title">🚨 Anomaly Detection</div>',
-            unsafe_allow_html=True,
+    with st.sidebar.expander("🔥 Prewarm"):
+        stats = prewarm.stats()
+        st.write(
+            f"**warm requests**: {stats['warm']} / {stats['requests']} "
+            f"({stats['warm_share']:.0%})"
+        )
+        st.write(
+            f"**refreshes**: {stats['refreshes']}, {stats['errors']} errors, "
+            f"{stats['over_budget']} deferred by budget, "
+            f"{stats['unknown']} unknown cities skipped"
         )
-        anomaly_detection()
-        st.markdown("</div>", unsafe_allow_html=True)
+        for kind, share in stats["freshness"].items():
+            st.write(f"**{kind}**: {share:.0%} of TTL left")
+        if stats["hot_cities"]:
+            st.caption("Hot: " + ", ".join(stats["hot_cities"][:10]))
+
+    title, page = MODULES[selected_module]
+    if is_loaded(page):
+        render = load_target(page)
+    else:
+        with st.spinner("Loading module..."):
+            render = load_target(page)
 
-    elif selected_module == "🌿 Eco Tips":
-        eco_tips_module()
+    with st.sidebar.expander("⏱️ Module Load Times"):
+        for name, seconds in import_times().items():
+            st.write(f"**{name}**: {seconds * 1000:.0f} ms")
+
+    if title is None:
+        render()
+        return
+    st.markdown(
+        f'<div class="section"><div class="title">{title}</div>',
+        unsafe_allow_html=True,
+    )
+    render()
+    st.markdown("</div>", unsafe_allow_html=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import streamlit as st
+
+from http_client import error_message
+from traffic import get_traffic_data
+from weather import (
+    get_air_pollution_data,
+    get_weather_data,
+    get_weather_group,
+)
+
+# Optional default city list, used when nothing is uploaded.
+BATCH_CITIES_FILE = os.getenv("BATCH_CITIES_FILE", "batch_cities.csv")
+DEFAULT_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+
+
+def load_city_list(source):
+    # Accepts a path or an uploaded file. Uses the "city" column if present,
+    # otherwise the first column.
+    df = pd.read_csv(source)
+    column = "city" if "city" in df.columns else df.columns[0]
+    cities = df[column].dropna().astype(str).str.strip()
+    return list(dict.fromkeys(c for c in cities if c))
+
+
+def _fetch_city_row(city, weather_api_key, tomtom_api_key):
+    row = {"city": city}
+    try:
+        weather_data = get_weather_data(city, weather_api_key)
+        if "coord" not in weather_data:
+            row["error"] = "City not found"
+            return row
+        lat = weather_data["coord"]["lat"]
+        lon = weather_data["coord"]["lon"]
+        row.update(
+            lat=lat,
+            lon=lon,
+            temp_c=round(weather_data["main"]["temp"] - 273.15, 2),
+            humidity=weather_data["main"]["humidity"],
+            wind_speed=weather_data["wind"]["speed"],
+        )
+
+        pollution = get_air_pollution_data(lat, lon, weather_api_key)
+        if pollution.get("list"):
+            row["aqi"] = pollution["list"][0]["main"]["aqi"]
+            row["pm2_5"] = pollution["list"][0]["components"].get("pm2_5")
+
+        if tomtom_api_key:
+            flow = get_traffic_data(lat, lon, tomtom_api_key).get("flowSegmentData")
+            if flow:
+                row["current_speed"] = flow["currentSpeed"]
+                row["free_flow_speed"] = flow["freeFlowSpeed"]
+                row["congestion_ratio"] = round(
+                    flow["currentTravelTime"] / flow["freeFlowTravelTime"], 2
+                )
+    except Exception as e:
+        row["error"] = error_message(e)
+    return row
+
+
+def fetch_batch(
+    cities,
+    weather_api_key,
+    tomtom_api_key=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    on_progress=None,
+):
+    # Fetch weather, AQI and traffic for every city through a bounded worker
+    # pool. Per-provider rate limits are enforced in http_client.
+    start = time.perf_counter()
+
+    # Cities whose OpenWeatherMap IDs are known get current weather through
+    # the group endpoint, 20 per request, instead of one call each.
+    try:
+        grouped = len(get_weather_group(cities, weather_api_key))
+    except Exception:
+        grouped = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_fetch_city_row, city, weather_api_key, tomtom_api_key)
+            for city in cities
+        ]
+        for done, _ in enumerate(as_completed(futures), start=1):
+            if on_progress:
+                on_progress(done, len(cities))
+
+    elapsed = time.perf_counter() - start
+    df = pd.DataFrame([future.result() for future in futures])
+    stats = {
+        "cities": len(cities),
+        "failed": int(df["error"].notna().sum()) if "error" in df else 0,
+        "grouped_weather": grouped,
+        "elapsed": elapsed,
+        "cities_per_second": len(cities) / elapsed if elapsed else 0.0,
+    }
+    return df, stats
+
+
+def batch_monitor():
+    st.title("📋 Multi-City Batch Monitor")
+
+    uploaded_file = st.file_uploader(
+        "Upload a CSV with a 'city' column", type=["csv"], key="batch_cities"
+    )
+    cities = []
+    if uploaded_file:
+        cities = load_city_list(uploaded_file)
+    elif os.path.exists(BATCH_CITIES_FILE):
+        cities = load_city_list(BATCH_CITIES_FILE)
+        st.info(f"Using city list from {BATCH_CITIES_FILE}")
+
+    if not cities:
+        st.warning("⚠️ Upload a city list to start.")
+        return
+
+    st.write(f"🏙️ {len(cities)} cities loaded")
+    max_workers = st.slider("Parallel workers", 1, 32, DEFAULT_MAX_WORKERS)
+
+    if st.button("🚀 Fetch All"):
+        progress = st.progress(0.0)
+        df, stats = fetch_batch(
+            cities,
+            os.getenv("openweathermap_api"),
+            os.getenv("TOMTOM_API_KEY"),
+            max_workers=max_workers,
+            on_progress=lambda done, total: progress.progress(done / total),
+        )
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Cities", stats["cities"])
+        c2.metric("Failed", stats["failed"])
+        c3.metric("Throughput", f"{stats['cities_per_second']:.1f} cities/s")
+
+        st.dataframe(df, use_container_width=True)
+        st.download_button(
+            "📥 Download Comparison CSV",
+            df.to_csv(index=False),
+            file_name="city_comparison.csv",
+            mime="text/csv",
+        )
@@ -0,0 +1,98 @@
+"""Peak memory of in-memory versus chunked anomaly detection on large CSVs.
+
+Each run happens in a fresh interpreter so peaks do not leak between
+modes. Run from the repository root:
+
+    python -m benchmarks.bench_anomaly_chunked --rows 500000 2000000 8000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def write_sensor_csv(path, rows, chunk=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01")
+    for offset in range(0, rows, chunk):
+        n = min(chunk, rows - offset)
+        value = rng.normal(20, 2, n)
+        spikes = rng.random(n) < 0.01
+        value[spikes] += rng.choice([-15, 15], spikes.sum())
+        pd.DataFrame(
+            {
+                "timestamp": start + pd.to_timedelta(offset + np.arange(n), "s"),
+                "sensor_id": rng.integers(0, 50, n),
+                "temperature": value.round(3),
+                "humidity": rng.uniform(30, 70, n).round(2),
+            }
+        ).to_csv(path, mode="a", header=offset == 0, index=False)
+
+
+def run_mode(path, mode):
+    import resource
+    import tracemalloc
+
+    from Anomoly_detection import detect_anomalies, detect_anomalies_chunked
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "in-memory":
+        df = pd.read_csv(path)
+        result, _, _ = detect_anomalies(df.copy(), "temperature")
+        anomalies = int((result["anomaly"] == -1).sum())
+    else:
+        anomalies = sum(
+            len(a) for a, _ in detect_anomalies_chunked(path, "temperature")
+        )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return {
+        "anomalies": anomalies,
+        "elapsed": elapsed,
+        "traced_peak_mb": peak / 2**20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[500_000, 2_000_000])
+    parser.add_argument("--modes", nargs="+", default=["in-memory", "chunked"])
+    parser.add_argument("--_child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        print(json.dumps(run_mode(*args._child)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"sensors_{rows}.csv")
+            write_sensor_csv(path, rows)
+            size_mb = os.path.getsize(path) / 2**20
+            for mode in args.modes:
+                out = subprocess.run(
+                    [sys.executable, "-m", __spec__.name, "--_child", path, mode],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+                print(
+                    f"rows={rows:>10,} file={size_mb:7.1f}MB mode={mode:<9} "
+                    f"traced_peak={r['traced_peak_mb']:8.1f}MB "
+                    f"max_rss={r['max_rss_mb']:8.1f}MB "
+                    f"elapsed={r['elapsed']:6.1f}s anomalies={r['anomalies']:,}"
+                )
+
+
+if __name__ == "__main__":
+    main()
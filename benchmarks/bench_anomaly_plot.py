@@ -0,0 +1,84 @@
+"""Render time of the seaborn anomaly plot versus the downsampled chart.
+
+The seaborn path is timed up to the PNG that st.pyplot ships; the fast
+path up to the JSON that st.plotly_chart ships. Run from the repository
+root:
+
+    python -m benchmarks.bench_anomaly_plot --rows 10000 100000 500000
+"""
+
+import argparse
+import io
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from Anomoly_detection import anomaly_figure  # noqa: E402
+
+
+def synthetic_result(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    value = np.sin(np.arange(rows) / 500) * 5 + rng.normal(20, 1, rows)
+    anomaly = np.where(rng.random(rows) < 0.02, -1, 1)
+    value[anomaly == -1] += rng.choice([-8, 8], (anomaly == -1).sum())
+    return pd.DataFrame({"value": value, "anomaly": anomaly})
+
+
+def seaborn_render(df):
+    fig, ax = plt.subplots()
+    sns.scatterplot(
+        data=df,
+        x=df.index,
+        y="value",
+        hue="anomaly",
+        palette={1: "green", -1: "red"},
+        ax=ax,
+    )
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    plt.close(fig)
+    return len(df)
+
+
+def fast_render(df):
+    fig = anomaly_figure(df, ["value"])
+    fig.to_json()
+    return sum(len(trace.x) for trace in fig.data)
+
+
+def timed(fn, df, repeat):
+    best, points = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        points = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = synthetic_result(rows)
+        anomalies = int((df["anomaly"] == -1).sum())
+        seaborn_ms, seaborn_points = timed(seaborn_render, df, args.repeat)
+        fast_ms, fast_points = timed(fast_render, df, args.repeat)
+        print(
+            f"rows={rows:>9,} anomalies={anomalies:>7,} "
+            f"seaborn={seaborn_ms:9.1f}ms ({seaborn_points:,} pts) "
+            f"fast={fast_ms:7.1f}ms ({fast_points:,} pts) "
+            f"speedup={seaborn_ms / fast_ms:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Document index build, load and top-k query speed.
+
+Builds a fresh index from synthetic documents (Zipf-distributed words),
+reopens it from disk through the memory map, then times queries made of a
+few words from a random passage, reporting how often that passage is in
+the top k, with and without the retrieval budget. Run from the
+repository root:
+
+    python -m benchmarks.bench_doc_index --passages 200000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from document_index import RAG_BUDGET_MS, DocumentIndex
+
+
+def synthetic_documents(n_passages, per_doc, words_per_passage, rng, vocab=30000):
+    words = np.array([f"w{i}" for i in range(vocab)])
+    weights = 1.0 / np.arange(1, vocab + 1)
+    weights /= weights.sum()
+    for doc in range(0, n_passages, per_doc):
+        n = min(per_doc, n_passages - doc)
+        ids = rng.choice(vocab, size=(n, words_per_passage), p=weights)
+        # One paragraph per passage so each becomes exactly one passage.
+        yield f"doc{doc}", [" ".join(words[row]) + "." for row in ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--passages", type=int, default=200_000)
+    parser.add_argument("--per-doc", type=int, default=500)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=6)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    path = tempfile.mkdtemp()
+    index = DocumentIndex(path)
+    corpus = {}
+    build = 0.0
+    for doc_id, passages in synthetic_documents(
+        args.passages, args.per_doc, args.words, rng
+    ):
+        text = "\n\n".join(passages)
+        start = time.perf_counter()
+        index.add_document(doc_id, f"{doc_id}.pdf", text)
+        build += time.perf_counter() - start
+        corpus[doc_id] = passages
+    size = index.stats()["bytes"]
+    print(
+        f"build: {index.count:,} passages in {build:.1f}s "
+        f"({index.count / build:,.0f} passages/s), {size / 2**20:,.0f} MiB on disk"
+    )
+
+    start = time.perf_counter()
+    reopened = DocumentIndex(path)
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    reopened.search("w1 w2 w3")
+    first_ms = (time.perf_counter() - start) * 1000
+    print(f"load (memory-mapped): {load_ms:.1f} ms, first query {first_ms:.1f} ms")
+
+    docs = list(corpus)
+    queries = []
+    for _ in range(args.queries):
+        doc = docs[rng.integers(len(docs))]
+        i = int(rng.integers(len(corpus[doc])))
+        words = corpus[doc][i].rstrip(".").split()
+        # Prefer the passage's rarer words, as a real question would.
+        words = sorted(set(words), key=lambda w: -int(w[1:]))[: args.query_words * 3]
+        query = " ".join(rng.choice(words, args.query_words, replace=False))
+        queries.append((query, doc, i))
+
+    for label, budget in (
+        ("budget %g ms" % RAG_BUDGET_MS, RAG_BUDGET_MS),
+        ("full scan", 0),
+    ):
+        times, found, partial = [], 0, 0
+        for query, doc, i in queries:
+            hits, stats = reopened.search(query, k=args.k, budget_ms=budget)
+            times.append(stats["ms"])
+            partial += stats["partial"]
+            target = corpus[doc][i]
+            found += any(h["doc"] == doc and h["text"] == target for h in hits)
+        times.sort()
+        print(
+            f"{label:>15}: p50 {statistics.median(times):6.1f} ms, "
+            f"p95 {times[int(len(times) * 0.95) - 1]:6.1f} ms, "
+            f"target in top {args.k}: {found / len(queries):.0%}, "
+            f"{partial} partial scans"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Feedback analytics render time against a large feedback store.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_feedback_analytics --rows 1000000 --budget-ms 500
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from feedback_store import FeedbackStore
+
+CITIES = ["Delhi", "Hyderabad", "London", "Nandyal", "Pune", "Chennai", "Mumbai"]
+
+
+def fill(store, rows, days=730, batch=50_000):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    written = 0
+    while written < rows:
+        n = min(batch, rows - written)
+        store.add_many(
+            {
+                "timestamp": (
+                    start + timedelta(seconds=rng.randrange(days * 86400))
+                ).strftime("%Y-%m-%d %H:%M:%S"),
+                "name": f"user{written + i}",
+                "city": rng.choice(CITIES),
+                "rating": rng.randint(1, 5),
+                "feedback": "clean streets, slow buses",
+            }
+            for i in range(n)
+        )
+        written += n
+
+
+def full_rescan(path):
+    # What a naive dashboard would do: load every row on every rerun.
+    df = pd.read_sql("SELECT * FROM feedback", sqlite3.connect(path))
+    df["day"] = df["timestamp"].str[:10]
+    df.groupby(["city", "rating"]).size()
+    df.groupby("day")["rating"].agg(["count", "mean"]).rolling(7).mean()
+
+
+def render(path):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["FEEDBACK_DB_PATH"] = path
+    at = AppTest.from_function(_dashboard_app, default_timeout=60)
+    at.run()  # first run opens the store
+    start = time.perf_counter()
+    at.run()
+    return (time.perf_counter() - start) * 1000
+
+
+def _dashboard_app():
+    from customer_feedback import feedback_dashboard
+
+    feedback_dashboard()
+
+
+def timed(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--budget-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    from customer_feedback import load_dashboard_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feedback.sqlite3")
+        store = FeedbackStore(path, legacy_csv=None)
+        start = time.perf_counter()
+        fill(store, args.rows)
+        print(f"filled {args.rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+        aggregates_ms = timed(lambda: load_dashboard_data(store))
+        rescan_ms = timed(lambda: full_rescan(path), repeat=1)
+        render_ms = render(path)
+        print(f"aggregate queries: {aggregates_ms:8.1f} ms")
+        print(f"full rescan:       {rescan_ms:8.1f} ms")
+        print(
+            f"page render:       {render_ms:8.1f} ms "
+            f"({'within' if render_ms <= args.budget_ms else 'OVER'} "
+            f"{args.budget_ms:.0f} ms budget)"
+        )
+
+
+if __name__ == "__main__":
+    main()
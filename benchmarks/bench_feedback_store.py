@@ -0,0 +1,141 @@
+"""Submission latency and concurrent-writer safety of the feedback store.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_feedback_store --rows 1000000
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from feedback_store import FeedbackStore
+
+CITIES = ["Delhi", "Hyderabad", "London", "Nandyal", "Pune", "Chennai"]
+
+
+def record(i):
+    return {
+        "timestamp": "2025-06-23 13:20:10",
+        "name": f"user{i}",
+        "city": CITIES[i % len(CITIES)],
+        "rating": i % 5 + 1,
+        "feedback": "great service, clean streets",
+    }
+
+
+def submit_latency(submit, samples=200):
+    times = []
+    for i in range(samples):
+        start = time.perf_counter()
+        submit(record(i))
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99) - 1]
+
+
+def legacy_submit(path):
+    # The original read-concat-rewrite of feedback_data.csv.
+    def submit(row):
+        if os.path.exists(path):
+            df = pd.concat([pd.read_csv(path), pd.DataFrame([row])], ignore_index=True)
+        else:
+            df = pd.DataFrame([row])
+        df.to_csv(path, index=False)
+
+    return submit
+
+
+def bench_growth(tmp, total_rows, checkpoints):
+    print(f"{'rows':>10} {'store p50 ms':>13} {'store p99 ms':>13} {'csv p50 ms':>11}")
+    store = FeedbackStore(os.path.join(tmp, "growth.sqlite3"), legacy_csv=None)
+    csv_path = os.path.join(tmp, "growth.csv")
+    filled = 0
+    for target in checkpoints:
+        if target > total_rows:
+            break
+        batch = [record(i) for i in range(min(50_000, target - filled))]
+        while filled < target:
+            n = min(len(batch), target - filled)
+            store.add_many(batch[:n])
+            filled += n
+        p50, p99 = submit_latency(store.add)
+        filled += 200
+
+        # The legacy path is only measured while it finishes in reasonable time.
+        csv_p50 = "-"
+        if target <= 100_000:
+            pd.DataFrame([record(i) for i in range(target)]).to_csv(
+                csv_path, index=False
+            )
+            csv_p50 = f"{submit_latency(legacy_submit(csv_path), 20)[0]:.2f}"
+        print(f"{target:>10} {p50:>13.2f} {p99:>13.2f} {csv_p50:>11}")
+
+
+def _process_writer(path, writer_id, count):
+    store = FeedbackStore(path, legacy_csv=None)
+    for i in range(count):
+        store.add(record(writer_id * count + i))
+
+
+def bench_concurrency(tmp, writers, per_writer):
+    path = os.path.join(tmp, "concurrent.sqlite3")
+    store = FeedbackStore(path, legacy_csv=None)
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=lambda w=w: [
+                store.add(record(w * per_writer + i)) for i in range(per_writer)
+            ]
+        )
+        for w in range(writers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    expected = writers * per_writer
+    print(
+        f"threads:   {writers} writers x {per_writer} rows -> "
+        f"{store.count()}/{expected} stored, {expected / elapsed:,.0f} rows/s"
+    )
+
+    start = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=_process_writer, args=(path, w, per_writer))
+        for w in range(writers)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    print(
+        f"processes: {writers} writers x {per_writer} rows -> "
+        f"{store.count() - expected}/{expected} stored, "
+        f"{expected / elapsed:,.0f} rows/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--per-writer", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_growth(tmp, args.rows, [1_000, 10_000, 100_000, 1_000_000, 10_000_000])
+        bench_concurrency(tmp, args.writers, args.per_writer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Forecast payload parsing: three per-renderer passes versus one cached frame.
+
+Times the data preparation the three forecast renderers used to do on
+their own (walking the payload, first entry per day) against
+weather.forecast_frames, parsed once per payload and shared. Also shows
+how far the old first-entry min/max were from the true daily range.
+Run from the repository root:
+
+    python -m benchmarks.bench_forecast_frame --cities 1000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from weather import _forecast_frame_cache, forecast_frames
+
+
+def synthetic_payload(rng, start=1_760_000_400):
+    # 5 days of 3-hourly entries in Kelvin, as the standard-units endpoint
+    # returns them.
+    base = rng.uniform(265, 305)
+    entries = []
+    for i in range(40):
+        dt = start + i * 3 * 3600
+        temp = base + 6 * np.sin(2 * np.pi * (i % 8) / 8) + rng.normal(0, 1)
+        entries.append(
+            {
+                "dt": dt,
+                "dt_txt": datetime.utcfromtimestamp(dt).strftime("%Y-%m-%d %H:%M:%S"),
+                "main": {
+                    "temp": temp,
+                    "temp_min": temp - rng.uniform(0, 1),
+                    "temp_max": temp + rng.uniform(0, 1),
+                    "humidity": int(rng.uniform(30, 95)),
+                },
+                "wind": {"speed": rng.uniform(0, 12)},
+                "weather": [{"description": rng.choice(["clear sky", "rain"])}],
+            }
+        )
+    return {"list": entries, "city": {"timezone": int(rng.integers(-12, 13)) * 3600}}
+
+
+def legacy_prepare(data):
+    # The old per-renderer loops, minus the Streamlit calls.
+    rows = []
+    displayed_dates = set()
+    for day in data["list"]:
+        date = datetime.fromtimestamp(day["dt"]).strftime("%A, %B, %d")
+        if date not in displayed_dates:
+            displayed_dates.add(date)
+            rows.append(
+                (
+                    date,
+                    day["weather"][0]["description"],
+                    day["main"]["temp_min"] - 273.15,
+                    day["main"]["temp_max"] - 273.15,
+                )
+            )
+    displayed_days = set()
+    for entry in data["list"]:
+        date = entry["dt_txt"].split(" ")[0]
+        if date not in displayed_days:
+            displayed_days.add(date)
+            rows.append((date, entry["dt_txt"].split(" ")[1]))
+    daily_data = []
+    seen_dates = set()
+    for entry in data["list"]:
+        date_str = entry["dt_txt"].split(" ")[0]
+        if date_str not in seen_dates:
+            seen_dates.add(date_str)
+            daily_data.append(
+                {
+                    "Date": date_str,
+                    "Min Temp (°C)": entry["main"]["temp_min"],
+                    "Max Temp (°C)": entry["main"]["temp_max"],
+                    "Humidity (%)": entry["main"]["humidity"],
+                    "Wind Speed (m/s)": entry["wind"]["speed"],
+                }
+            )
+    return rows, pd.DataFrame(daily_data)
+
+
+def shared_prepare(data):
+    # Each of the three renderers asks for the frame; only the first parses.
+    for _ in range(3):
+        _, daily = forecast_frames(data)
+    return daily
+
+
+def timed(fn, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        fn(payload)
+    return (time.perf_counter() - start) / len(payloads) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    payloads = [synthetic_payload(rng) for _ in range(args.cities)]
+
+    legacy_us = timed(legacy_prepare, payloads)
+    _forecast_frame_cache.clear()
+    cold_us = timed(shared_prepare, payloads)
+    # Only the most recent payloads are still in the frame cache.
+    warm_us = timed(shared_prepare, payloads[-_forecast_frame_cache.maxsize :])
+    print(f"cities={args.cities}")
+    print(f"  three legacy passes:        {legacy_us:8.0f} us/city")
+    print(f"  one shared frame (cold):    {cold_us:8.0f} us/city")
+    print(f"  one shared frame (cached):  {warm_us:8.0f} us/city")
+
+    # First-entry-per-day versus true daily range, in degrees.
+    under = []
+    for payload in payloads[:100]:
+        first = {}
+        for e in payload["list"]:
+            first.setdefault(e["dt_txt"][:10], e["main"])
+        _, daily = forecast_frames(payload)
+        true_range = (daily["temp_max_c"] - daily["temp_min_c"]).mean()
+        old_range = np.mean([m["temp_max"] - m["temp_min"] for m in first.values()])
+        under.append(true_range - old_range)
+    print(f"  old daily range understated by {np.mean(under):.1f} °C on average")
+
+
+if __name__ == "__main__":
+    main()
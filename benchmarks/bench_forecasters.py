@@ -0,0 +1,79 @@
+"""Fit time, predict time and backtest error of each forecasting engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_forecasters --days 1095 --holdout 90
+"""
+
+import argparse
+import logging
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasters import ENGINES, get_forecaster
+
+
+def synthetic_series(days, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    y = (
+        200
+        + 0.05 * t
+        + 15 * np.sin(2 * np.pi * t / 7)
+        + 40 * np.sin(2 * np.pi * t / 365.25)
+        + rng.normal(0, 5, days)
+    )
+    return pd.DataFrame({"ds": pd.date_range("2021-01-01", periods=days), "y": y})
+
+
+def import_seconds(module):
+    # Cold import cost, measured in a fresh interpreter.
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--holdout", type=int, default=90)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    df = synthetic_series(args.days)
+    train, test = df.iloc[: -args.holdout], df.iloc[-args.holdout :]
+
+    print(f"import forecasters: {import_seconds('forecasters'):.2f}s")
+    print(f"import prophet:     {import_seconds('prophet'):.2f}s")
+    print(
+        f"{'engine':<16} {'fit s':>8} {'predict s':>10} {'MAE':>8} {'MAPE %':>8} "
+        f"{'RMSE':>8}"
+    )
+    for engine in args.engines:
+        start = time.perf_counter()
+        model = get_forecaster(engine).fit(train)
+        fit_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pred = model.predict(test["ds"])
+        predict_s = time.perf_counter() - start
+
+        err = test["y"].to_numpy() - pred["yhat"].to_numpy()
+        mae = np.abs(err).mean()
+        mape = (np.abs(err) / np.abs(test["y"].to_numpy())).mean() * 100
+        rmse = np.sqrt((err**2).mean())
+        print(
+            f"{engine:<16} {fit_s:>8.3f} {predict_s:>10.4f} {mae:>8.2f} "
+            f"{mape:>8.2f} {rmse:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Grouped KPI forecasting throughput on synthetic meter data.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_kpi_grouped --series 500 --days 365
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from KPI_forecast import fit_grouped_forecasts
+
+
+def synthetic_meters(series, days, seed=0):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2023-01-01", periods=days, freq="D")
+    t = np.arange(days)
+    frames = []
+    for i in range(series):
+        base = rng.uniform(50, 500)
+        y = (
+            base
+            + base * 0.1 * np.sin(2 * np.pi * t / 7)
+            + base * 0.2 * np.sin(2 * np.pi * t / 365.25)
+            + rng.normal(0, base * 0.02, days)
+        )
+        frames.append(pd.DataFrame({"meter_id": f"M{i:04d}", "ds": ds, "y": y}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--engine", default="fast")
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    df = synthetic_meters(args.series, args.days)
+    for workers in dict.fromkeys(args.workers):
+        combined, failures, stats = fit_grouped_forecasts(
+            df, "meter_id", engine=args.engine, max_workers=workers
+        )
+        print(
+            f"workers={workers:<3} series={stats['series']} failed={stats['failed']} "
+            f"rows={len(combined):,} elapsed={stats['elapsed']:.1f}s "
+            f"throughput={stats['series_per_second']:.2f} series/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
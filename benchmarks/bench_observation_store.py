@@ -0,0 +1,124 @@
+"""Observation store ingest and query speed at tens of millions of rows.
+
+Bulk loads synthetic readings (cities x metrics series at a fixed
+interval, in time order as live ingestion would produce them) into a fresh
+store, then times raw and downsampled range queries, a cross-city time
+window and the per-request record() cost. Run from the repository root:
+
+    python -m benchmarks.bench_observation_store --rows 20000000
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from observation_store import ObservationStore
+
+START = pd.Timestamp("2025-01-01")
+
+
+def chunks(cities, metrics, steps, interval, chunk_steps, rng):
+    # DataFrames of chunk_steps timestamps x every series, in time order.
+    city = np.repeat(np.arange(len(cities)), len(metrics))
+    metric = np.tile(np.arange(len(metrics)), len(cities))
+    for first in range(0, steps, chunk_steps):
+        n = min(chunk_steps, steps - first)
+        step = np.arange(first, first + n)
+        daily = np.sin(2 * np.pi * step * interval / 86400)
+        values = daily[:, None] * 5 + rng.normal(0, 1, (n, len(city)))
+        yield pd.DataFrame(
+            {
+                "city": pd.Categorical.from_codes(np.tile(city, n), cities),
+                "metric": pd.Categorical.from_codes(np.tile(metric, n), metrics),
+                "ds": np.repeat(START.value // 10**9 + step * interval, len(city)),
+                "value": values.ravel(),
+            }
+        )
+
+
+def timed(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--cities", type=int, default=100)
+    parser.add_argument("--metrics", type=int, default=10)
+    parser.add_argument("--interval", type=int, default=900, help="seconds")
+    parser.add_argument("--path", help="store file (default: a temp file)")
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), "observations.sqlite3")
+    store = ObservationStore(path)
+    cities = [f"City{i}" for i in range(args.cities)]
+    metrics = [f"metric{i}" for i in range(args.metrics)]
+    n_series = len(cities) * len(metrics)
+    steps = args.rows // n_series
+    rng = np.random.default_rng(0)
+
+    written, start = 0, time.perf_counter()
+    for df in chunks(cities, metrics, steps, args.interval, 1000, rng):
+        written += store.add_frame(df)
+    elapsed = time.perf_counter() - start
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(path)
+    end = START + pd.Timedelta(seconds=steps * args.interval)
+    print(
+        f"ingest: {written:,} rows ({n_series} series, {START.date()} to "
+        f"{end.date()}) in {elapsed:.1f}s = {written / elapsed:,.0f} rows/s, "
+        f"{size / 2**20:,.0f} MiB ({size / written:.1f} B/row)"
+    )
+
+    mid = START + (end - START) / 2
+    queries = {
+        "1 series, 1 day raw": lambda: store.query(
+            "City7", "metric3", mid, mid + pd.Timedelta(days=1)
+        ),
+        "1 series, 30 days raw": lambda: store.query(
+            "City7", "metric3", mid, mid + pd.Timedelta(days=30)
+        ),
+        "1 series, all, hourly avg": lambda: store.query(
+            "City7", "metric3", bucket=3600
+        ),
+        "1 series, all, daily max": lambda: store.query(
+            "City7", "metric3", bucket=86400, agg="max"
+        ),
+        "1 city x all metrics, 7 days wide": lambda: store.frame(
+            "City7", start=mid, end=mid + pd.Timedelta(days=7), bucket=3600
+        ),
+        "10 cities, 1 metric, 30 days daily": lambda: store.query(
+            cities[:10], "metric3", mid, mid + pd.Timedelta(days=30), bucket=86400
+        ),
+        "all series, 1 hour window": lambda: store.query(
+            start=mid, end=mid + pd.Timedelta(hours=1)
+        ),
+    }
+    for name, query in queries.items():
+        ms, out = timed(query)
+        print(f"{name:>36}: {ms:8.1f} ms, {len(out):,} rows")
+
+    ts = int(end.value // 10**9)
+    times = []
+    for i in range(1000):
+        begin = time.perf_counter()
+        store.record([("City7", "metric3", ts + i, 1.0)])
+        times.append(time.perf_counter() - begin)
+    store.flush()
+    print(f"record(): median {statistics.median(times) * 1e6:.0f} us per call")
+
+
+if __name__ == "__main__":
+    main()
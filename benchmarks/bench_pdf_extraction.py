@@ -0,0 +1,118 @@
+"""Compare eager vs. streamed/parallel PDF text extraction.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_extraction --pages 200 400 800
+"""
+
+import argparse
+import io
+import itertools
+import time
+import tracemalloc
+
+from PyPDF2 import PdfReader
+
+from document_extractor import iter_pdf_pages
+
+LINE = "Section {page}.{line}: the council shall review water and energy usage."
+
+
+def synthetic_pdf(pages, lines_per_page=40):
+    # Build a minimal text PDF by hand so the benchmark needs no PDF writer.
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects exist
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        commands = ["BT /F1 10 Tf 12 TL 50 760 Td"]
+        for line in range(lines_per_page):
+            commands.append(f"({LINE.format(page=page, line=line)}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids),
+        pages,
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return out.getvalue()
+
+
+def eager_extract(data):
+    # The original approach: every page, sequentially, joined into one string.
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def measure(fn):
+    # Time and memory come from separate runs: tracemalloc slows extraction
+    # several-fold, and it only sees this process, not pool workers.
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300, 600])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--preview-pages", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'mode':<22} {'seconds':>9} {'peak MB':>9}")
+    for pages in args.pages:
+        data = synthetic_pdf(pages)
+        runs = {
+            "eager join": lambda: eager_extract(data),
+            "streamed sequential": lambda: sum(
+                len(t) for t in iter_pdf_pages(data, max_workers=1)
+            ),
+            "streamed parallel": lambda: sum(
+                len(t)
+                for t in iter_pdf_pages(
+                    data, max_workers=args.workers, parallel_threshold=0
+                )
+            ),
+            f"preview ({args.preview_pages} pages)": lambda: list(
+                itertools.islice(
+                    iter_pdf_pages(data, max_workers=1), args.preview_pages
+                )
+            ),
+        }
+        for mode, fn in runs.items():
+            elapsed, peak = measure(fn)
+            print(f"{pages:>6} {mode:<22} {elapsed:>9.3f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
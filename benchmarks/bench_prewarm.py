@@ -0,0 +1,142 @@
+"""Background prewarming of hot cities: request latency and warm share.
+
+Starts a local stub of the OpenWeatherMap and TomTom endpoints with a fixed
+latency, shortens the cache TTLs, and replays Zipf-distributed city
+requests (each fetching weather, forecast, AQI and traffic, like the City
+Overview tab) with and without a PrewarmScheduler running. Run from the
+repository root:
+
+    python -m benchmarks.bench_prewarm --seconds 40 --ttl-scale 0.1
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+LATENCY = [0.0]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY[0])
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith("/weather"):
+            name = query["q"][0]
+            seed = sum(map(ord, name))
+            body = {"coord": {"lat": seed % 90, "lon": seed % 180}, "name": name}
+        elif url.path.endswith("/forecast"):
+            body = {"list": [], "city": {"timezone": 0}}
+        elif "air_pollution" in url.path:
+            body = {"list": [{"main": {"aqi": 2}, "components": {}}]}
+        else:
+            body = {"flowSegmentData": {"currentSpeed": 30, "freeFlowSpeed": 50}}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def replay(cities, weights, seconds, rate, scheduler, rng):
+    # Poisson arrivals of single-city overview requests, served one at a
+    # time. Returns per-request latencies and the warm share.
+    import traffic
+    import weather
+
+    latencies, warm = [], 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        time.sleep(rng.exponential(1 / rate))
+        city = cities[rng.choice(len(cities), p=weights)]
+        warm += scheduler.track_request(city)
+        start = time.perf_counter()
+        weather.get_weather_data(city, "key")
+        lat, lon = weather.get_city_coords(city, "key")
+        weather.get_weekly_forecast("key", lat, lon)
+        weather.get_air_pollution_data(lat, lon, "key")
+        traffic.get_traffic_data(lat, lon, "key")
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies), warm / max(len(latencies), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--rate", type=float, default=5.0, help="requests/s")
+    parser.add_argument("--seconds", type=float, default=40.0)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--ttl-scale", type=float, default=0.1)
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--calls-per-minute", type=float, default=1200)
+    args = parser.parse_args()
+
+    LATENCY[0] = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    os.environ["OPENWEATHERMAP_BASE_URL"] = base
+    os.environ["TOMTOM_BASE_URL"] = base
+    os.environ["OBSERVATIONS_ENABLED"] = "0"
+
+    import http_client
+    import prewarm
+    import traffic
+    import weather
+
+    http_client.set_rate_limit(urlsplit(base).netloc, None)
+    caches = {
+        "weather": weather._weather_cache,
+        "forecast": weather._forecast_cache,
+        "air_pollution": weather._air_pollution_cache,
+        "traffic": traffic._traffic_cache,
+    }
+    for kind, cache in caches.items():
+        cache.ttl = prewarm.TTLS[kind] = prewarm.TTLS[kind] * args.ttl_scale
+    print("TTLs (s): " + ", ".join(f"{k}={v:.0f}" for k, v in prewarm.TTLS.items()))
+
+    cities = [f"City{i}" for i in range(args.cities)]
+    weights = 1.0 / np.arange(1, args.cities + 1) ** args.zipf
+    weights /= weights.sum()
+
+    for label, background in (("no prewarm", False), ("prewarm", True)):
+        weather.clear_caches()
+        traffic._traffic_cache.clear()
+        scheduler = prewarm.PrewarmScheduler(
+            weather_api_key="key",
+            tomtom_api_key="key",
+            top_n=args.top_n,
+            calls_per_minute=args.calls_per_minute,
+            interval=0.5,
+        )
+        if background:
+            scheduler.start()
+        rng = np.random.default_rng(0)
+        latencies, warm_share = replay(
+            cities, weights, args.seconds, args.rate, scheduler, rng
+        )
+        scheduler.stop()
+        stats = scheduler.stats()
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(
+            f"{label:>10}: {len(latencies)} requests, warm {warm_share:.0%}, "
+            f"p50 {p50:.1f} ms, p95 {p95:.1f} ms, mean {latencies.mean() * 1000:.1f} ms, "
+            f"{stats['refreshes']} background refreshes, "
+            f"{stats['over_budget']} deferred"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cold import cost per app module and time to first render of app.py.
+
+Every measurement runs in a fresh interpreter. Time to first render is
+from interpreter start until the first script run of app.py finishes,
+with all modules imported up front (APP_PRELOAD_MODULES=1, the old
+behaviour) and with lazy loading. Run from the repository root:
+
+    python -m benchmarks.bench_startup --repeat 3
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time, streamlit
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+RENDER_SNIPPET = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=300)
+at.run()
+first = time.perf_counter() - start
+assert not at.exception, at.exception
+if {tab!r}:
+    at.sidebar.radio[0].set_value({tab!r})
+    tab_start = time.perf_counter()
+    at.run()
+    print(first, time.perf_counter() - tab_start)
+else:
+    print(first, 0.0)
+"""
+
+
+def run(snippet, env=None):
+    out = subprocess.run(
+        [sys.executable, "-c", snippet],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+    )
+    return [float(v) for v in out.stdout.strip().splitlines()[-1].split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tab", default="🚨 Anomaly Detection")
+    args = parser.parse_args()
+
+    # Lazily loaded pages are the "module:function" strings in app.MODULES;
+    # app.py is read rather than imported since importing it renders.
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as f:
+        modules = [
+            m
+            for m in dict.fromkeys(re.findall(r'"(\w+):\w+"', f.read()))
+            if os.path.exists(os.path.join(ROOT, f"{m}.py"))
+        ]
+    print("cold import cost after streamlit (ms):")
+    costs = {
+        module: statistics.median(
+            run(IMPORT_SNIPPET.format(module=module))[0] for _ in range(args.repeat)
+        )
+        for module in modules
+    }
+    for module, seconds in sorted(costs.items(), key=lambda kv: -kv[1]):
+        print(f"  {module:<20} {seconds * 1000:8.0f}")
+
+    print(f"time to first render (median of {args.repeat}):")
+    for label, preload in (("eager (before)", "1"), ("lazy (after)", "")):
+        runs = [
+            run(
+                RENDER_SNIPPET.format(tab=args.tab),
+                env={"APP_PRELOAD_MODULES": preload},
+            )
+            for _ in range(args.repeat)
+        ]
+        first = statistics.median(r[0] for r in runs)
+        tab = statistics.median(r[1] for r in runs)
+        print(
+            f"  {label:<16} first render {first * 1000:7.0f} ms, "
+            f"then opening {args.tab}: {tab * 1000:6.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Streaming anomaly detector throughput and per-record latency.
+
+Measures the detector on in-memory records, one at a time and in
+micro-batches, then end to end from a local TCP stand-in for a sensor
+socket. Run from the repository root:
+
+    python -m benchmarks.bench_stream_anomaly --records 500000 --columns 3
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+import numpy as np
+
+from stream_anomaly import (
+    StreamingDetector,
+    detect_stream,
+    parse_csv_records,
+    socket_lines,
+)
+
+
+def synthetic_stream(records, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(20, 2, (records, columns))
+    spikes = rng.choice(records, records // 200, replace=False)
+    X[spikes] += rng.choice([-12, 12], (len(spikes), columns))
+    return X, spikes
+
+
+def serve_csv(X, names):
+    # One-shot TCP server that streams X as CSV lines to the first client.
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def run():
+        conn, _ = server.accept()
+        with conn:
+            conn.sendall((",".join(names) + "\n").encode())
+            for start in range(0, len(X), 10_000):
+                block = X[start : start + 10_000]
+                conn.sendall(
+                    "".join(
+                        ",".join(f"{v:.4f}" for v in row) + "\n" for row in block
+                    ).encode()
+                )
+        server.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server.getsockname()
+
+
+def report(label, n, elapsed, latencies=None):
+    line = f"{label:<24} {n / elapsed:>10,.0f} records/s"
+    if latencies is not None:
+        p50, p99, worst = np.percentile(latencies, [50, 99, 100]) * 1e6
+        line += f"  p50={p50:6.0f}us p99={p99:6.0f}us max={worst:7.0f}us"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=500_000)
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    X, spikes = synthetic_stream(args.records, args.columns)
+    names = [f"c{i}" for i in range(args.columns)]
+
+    detector = StreamingDetector(names)
+    n = min(len(X), 20_000)
+    latencies = np.empty(n)
+    start = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        detector.update(X[i])
+        latencies[i] = time.perf_counter() - t
+    report("per record", n, time.perf_counter() - start, latencies)
+    print(f"{'':<24} refits={detector.refits}")
+
+    detector = StreamingDetector(names)
+    flags = np.zeros(len(X), dtype=bool)
+    start = time.perf_counter()
+    for i in range(0, len(X), args.batch_size):
+        batch = detector.update_batch(X[i : i + args.batch_size])
+        flags[i : i + len(batch)] = [d.anomaly for d in batch]
+    report(f"micro-batch ({args.batch_size})", len(X), time.perf_counter() - start)
+    print(
+        f"{'':<24} refits={detector.refits} flagged={flags.mean():.2%} "
+        f"spike recall={flags[spikes].mean():.1%}"
+    )
+
+    host, port = serve_csv(X, names)
+    detector = StreamingDetector(names)
+    start = time.perf_counter()
+    count = sum(
+        1
+        for _ in detect_stream(
+            parse_csv_records(socket_lines(host, port), names),
+            detector,
+            args.batch_size,
+        )
+    )
+    report("socket end to end", count, time.perf_counter() - start)
+    print(f"{'':<24} refits={detector.refits}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Multi-point traffic sampling throughput against a local TomTom stub.
+
+Surveys a city grid through traffic.survey_traffic with different worker
+counts, cold and warm, against benchmarks.stub_tomtom with fixed latency
+and an upstream QPS quota matched by the client rate limit. Run from the
+repository root:
+
+    python -m benchmarks.bench_traffic_grid --grid 15 --latency 0.1 --qps 20
+"""
+
+import argparse
+import os
+from urllib.parse import urlsplit
+
+from benchmarks.stub_tomtom import start_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", type=int, default=10)
+    parser.add_argument("--span-km", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--qps", type=float, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    server = start_stub(args.latency, args.qps)
+    os.environ["TOMTOM_BASE_URL"] = server.base_url
+    os.environ["OBSERVATIONS_ENABLED"] = "0"
+
+    import http_client
+    import traffic
+
+    lat, lon = server.centre
+    points = traffic.grid_points(lat, lon, args.grid, args.span_km)
+    print(
+        f"{len(points)} points, {args.latency * 1000:.0f} ms latency, "
+        f"quota {args.qps:g} req/s"
+    )
+
+    host = urlsplit(server.base_url).netloc
+    for limit in (args.qps, None):
+        http_client.set_rate_limit(host, limit, burst=1 if limit else None)
+        label = f"client limit {limit:g}/s" if limit else "no client limit"
+        for workers in args.workers:
+            traffic._traffic_cache.clear()
+            before = server.throttled, server.requests
+            df, errors, stats = traffic.survey_traffic(points, "key", workers)
+            throttled = server.throttled - before[0]
+            requests = server.requests - before[1]
+            # Failed points are not cached and go upstream again.
+            _, _, warm = traffic.survey_traffic(points, "key", workers)
+            print(
+                f"{label:>20}, {workers:2d} workers: cold {stats['elapsed']:6.2f}s "
+                f"({stats['points_per_second']:5.1f} points/s), "
+                f"warm {warm['elapsed'] * 1000:6.1f} ms, "
+                f"{requests} requests, {throttled} throttled, "
+                f"{stats['failed']} failed, {stats['segments']} segments, "
+                f"index {stats['congestion_index']:+.0f}%"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Local stand-in for the TomTom flowSegmentData endpoint.
+
+Points are snapped to synthetic road segments on a ~1 km lattice, so
+nearby sample points share a segment as they do upstream. Congestion is
+highest near --centre and stable per segment. Requests beyond --qps are
+answered with 429 like the real API. Point the app at it with
+TOMTOM_BASE_URL=http://127.0.0.1:8765:
+
+    python -m benchmarks.stub_tomtom --port 8765 --latency 0.1 --qps 5
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SEGMENT_DEGREES = 0.009  # ~1 km
+
+
+class StubTomTom(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.1, qps=None, centre=(17.385, 78.4867)):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.qps = qps
+        self.centre = centre
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._tokens = qps or 0
+        self._updated = time.monotonic()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def admit(self):
+        # Token bucket with a one-second burst; False means "429".
+        with self._lock:
+            self.requests += 1
+            if not self.qps:
+                return True
+            now = time.monotonic()
+            self._tokens = min(
+                self.qps, self._tokens + (now - self._updated) * self.qps
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.throttled += 1
+            return False
+
+    def flow(self, lat, lon):
+        i, j = round(lat / SEGMENT_DEGREES), round(lon / SEGMENT_DEGREES)
+        a, b = i * SEGMENT_DEGREES, j * SEGMENT_DEGREES
+        distance_km = 111.32 * math.hypot(a - self.centre[0], b - self.centre[1])
+        frc = (i + j) % 4
+        free_speed = (90, 70, 50, 35)[frc]
+        # Busier towards the centre, with a stable per-segment wobble.
+        wobble = ((i * 7919 + j * 104729) % 100) / 100
+        congestion = min(0.9, max(0.0, 0.7 - distance_km / 15 + 0.3 * wobble))
+        speed = max(1, round(free_speed * (1 - congestion)))
+        length_m = 1000
+        return {
+            "flowSegmentData": {
+                "frc": f"FRC{frc}",
+                "currentSpeed": speed,
+                "freeFlowSpeed": free_speed,
+                "currentTravelTime": round(length_m / (speed / 3.6)),
+                "freeFlowTravelTime": round(length_m / (free_speed / 3.6)),
+                "confidence": 0.9,
+                "roadClosure": False,
+                "coordinates": {
+                    "coordinate": [
+                        {"latitude": a, "longitude": b},
+                        {"latitude": a, "longitude": b + SEGMENT_DEGREES},
+                    ]
+                },
+            }
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency)
+        if not server.admit():
+            self._send(429, {"error": "Too Many Requests"}, {"Retry-After": "1"})
+            return
+        url = urlsplit(self.path)
+        try:
+            lat, lon = map(float, parse_qs(url.query)["point"][0].split(","))
+        except (KeyError, ValueError):
+            self._send(400, {"error": "point=lat,lon required"})
+            return
+        self._send(200, server.flow(lat, lon))
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency=0.1, qps=None, port=0):
+    # Serve on a background thread; returns the server (see base_url).
+    server = StubTomTom(("127.0.0.1", port), latency, qps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--qps", type=float, default=5)
+    args = parser.parse_args()
+    server = StubTomTom(("127.0.0.1", args.port), args.latency, args.qps)
+    print(f"Serving on {server.base_url}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+def coord_key(lat, lon):
+    # ~10 m precision, so coordinates from different sources share entries
+    return round(float(lat), 4), round(float(lon), 4)
+
+
+class TTLCache:
+    # Thread-safe key/value cache with per-entry expiry and LRU eviction.
+    # Streamlit runs every session in its own thread, so all access goes
+    # through one lock.
+
+    def __init__(self, ttl, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        # Like get, but without counting a hit or miss or touching LRU
+        # order; for monitoring and background refresh.
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def ttl_remaining(self, key):
+        # Seconds until key expires, or None if it is not cached.
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, should_cache=None):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        # Load outside the lock so one slow upstream call does not block
+        # lookups for every other key.
+        return self.refresh(key, loader, should_cache)
+
+    def refresh(self, key, loader, should_cache=None):
+        # Load and store unconditionally, replacing any cached value.
+        value = loader()
+        if should_cache is None or should_cache(value):
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
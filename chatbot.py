@@ -1,15 +1,60 @@
-import os
 import streamlit as st
-from dotenv import load_dotenv
-from ibm_watsonx_ai.foundation_models.model import Model
+from document_index import get_document_index
+from granite_client import get_model
 
-load_dotenv()
+GENERATION_PARAMS = {
+    "max_new_tokens": 512,
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "decoding_method": "sample",
+    "stop_sequences": ["<|endoftext|>", "User:"],
+}
 
-# Load IBM credentials
-api_key = os.getenv("IBM_GRANITE_API_KEY")
-project_id = os.getenv("IBM_GRANITE_PROJECT_ID")
-base_url = os.getenv("IBM_GRANITE_URL")  # should be for text generation
-model_id = os.getenv("MODEL_ID")  # e.g., granite-3b-instruct
+# Earlier question/answer pairs repeated in the prompt, each cut to this
+# many characters.
+HISTORY_TURNS = 2
+HISTORY_CHARS = 600
+
+
+def build_prompt(user_input, passages=(), history=()):
+    # passages: retrieved document passages (dicts with name and text);
+    # history: earlier messages, alternating user and assistant.
+    prompt = """You are a helpful smart city assistant focused on sustainability and policy advice.
+Provide responses as bullet points where helpful, using a friendly tone.
+"""
+    if passages:
+        context = "\n\n".join(
+            f"[{i}] ({p['name']}) {p['text']}" for i, p in enumerate(passages, 1)
+        )
+        prompt += f"""
+Use the document passages below when they are relevant and cite them as [1], [2].
+If they do not cover the question, say so and answer from general knowledge.
+
+Passages:
+{context}
+"""
+    if history:
+        lines = [
+            f"{'User' if i % 2 == 0 else 'Assistant'}: {message[:HISTORY_CHARS]}"
+            for i, message in enumerate(history)
+        ]
+        prompt += "\nConversation so far:\n" + "\n".join(lines) + "\n"
+    return (
+        prompt
+        + f"""
+Input: {user_input}
+Response:"""
+    )
+
+
+def stream_reply(model, user_input, passages=(), history=()):
+    # Yield response text chunks as the model generates them.
+    for chunk in model.generate_text_stream(
+        prompt=build_prompt(user_input, passages, history), params=GENERATION_PARAMS
+    ):
+        if isinstance(chunk, dict):
+            chunk = chunk.get("results", [{}])[0].get("generated_text", "")
+        yield chunk
 
 
 def run_chatbot():
@@ -19,6 +64,12 @@ def run_chatbot():
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
 
+    # A reply still pending here was cut short by the Stop button (which
+    # reruns the script); keep what had been streamed so far.
+    if "pending_reply" in st.session_state:
+        partial = st.session_state.pop("pending_reply")
+        st.session_state.chat_history.append((partial + " _(stopped)_").strip())
+
     # Display previous chat
     for i in range(0, len(st.session_state.chat_history), 2):
         with st.chat_message("user"):
@@ -27,52 +78,66 @@ def run_chatbot():
             with st.chat_message("assistant"):
                 st.markdown(st.session_state.chat_history[i + 1])
 
+    index = get_document_index()
+    use_documents = st.toggle(
+        f"📚 Answer from summarized documents ({index.count} passages)",
+        value=index.count > 0,
+        disabled=index.count == 0,
+    )
+
     # Chat input
     user_input = st.chat_input("Type your question here...")
 
     if user_input:
+        # Completed exchanges only; an unanswered message has no reply yet.
+        completed = len(st.session_state.chat_history) // 2 * 2
+        history = st.session_state.chat_history[:completed][-2 * HISTORY_TURNS :]
         st.session_state.chat_history.append(user_input)
         with st.chat_message("user"):
             st.write(user_input)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    # Initialize model
-                    model = Model(
-                        model_id=model_id,
-                        credentials={"apikey": api_key, "url": base_url},
-                        project_id=project_id,
-                    )
-
-                    prompt = f"""You are a helpful smart city assistant focused on sustainability and policy advice.
-Provide responses as bullet points where helpful, using a friendly tone.
+            stop_placeholder = st.empty()
+            stop_placeholder.button("⏹️ Stop generating")
+            placeholder = st.empty()
+            placeholder.markdown("_Thinking..._")
+            output = ""
+            st.session_state.pending_reply = output
+            try:
+                passages = []
+                if use_documents:
+                    # Follow-ups ("and when?") rarely name the topic, so
+                    # the previous question is searched along with them.
+                    query = f"{history[-2]} {user_input}" if history else user_input
+                    passages, search = index.search(query)
+                    if passages:
+                        with st.expander(
+                            f"📚 {len(passages)} passages retrieved in "
+                            f"{search['ms']:.0f} ms"
+                            + (" (partial scan)" if search["partial"] else "")
+                        ):
+                            for i, p in enumerate(passages, 1):
+                                st.caption(
+                                    f"[{i}] {p['name']} — score {p['score']:.2f}"
+                                )
+                                st.write(p["text"])
 
-Input: {user_input}
-Response:"""
+                # Shared model client, created once per process
+                model = get_model()
+
+                for chunk in stream_reply(model, user_input, passages, history):
+                    output += chunk
+                    st.session_state.pending_reply = output
+                    placeholder.markdown(output + "▌")
+
+                placeholder.markdown(output)
+                st.session_state.chat_history.append(output)
+
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+                st.session_state.chat_history.append("Sorry, I encountered an issue.")
 
-                    response = model.generate_text(
-                        prompt=prompt,
-                        params={
-                            "max_new_tokens": 512,
-                            "temperature": 0.7,
-                            "top_p": 0.9,
-                            "decoding_method": "sample",
-                            "stop_sequences": ["<|endoftext|>", "User:"],
-                        },
-                    )
-
-                    output = (
-                        response["generated_text"]
-                        if isinstance(response, dict) and "generated_text" in response
-                        else str(response)
-                    )
-
-                    st.markdown(output)
-                    st.session_state.chat_history.append(output)
-
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
-                    st.session_state.chat_history.append(
-                        "Sorry, I encountered an issue."
-                    )
+            # Not reached when Stop interrupts the stream; the partial reply
+            # is then picked up at the top of the next run.
+            st.session_state.pop("pending_reply", None)
+            stop_placeholder.empty()
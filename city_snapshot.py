@@ -0,0 +1,76 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from http_client import error_message
+from traffic import get_traffic_data
+from weather import (
+    get_air_pollution_data,
+    get_city_coords,
+    get_weather_data,
+    get_weekly_forecast,
+)
+
+# Shared by all sessions; each snapshot needs at most four workers.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="city-snapshot")
+
+
+@dataclass
+class CitySnapshot:
+    city: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    weather: Optional[dict] = None
+    forecast: Optional[dict] = None
+    air_pollution: Optional[dict] = None
+    traffic: Optional[dict] = None
+    errors: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def found(self):
+        return self.lat is not None
+
+
+def fetch_city_snapshot(city, weather_api_key=None, tomtom_api_key=None):
+    # Resolve coordinates once, then fetch everything else concurrently, so
+    # latency is roughly that of the slowest single upstream call.
+    weather_api_key = weather_api_key or os.getenv("openweathermap_api")
+    tomtom_api_key = tomtom_api_key or os.getenv("TOMTOM_API_KEY")
+    start = time.perf_counter()
+    snapshot = CitySnapshot(city=city)
+
+    try:
+        coords = get_city_coords(city, weather_api_key)
+    except Exception as e:
+        snapshot.errors["geocode"] = error_message(e)
+        coords = None
+    if coords is None:
+        snapshot.errors.setdefault("geocode", "City not found")
+        snapshot.elapsed = time.perf_counter() - start
+        return snapshot
+    snapshot.lat, snapshot.lon = coords
+
+    # A fresh geocode lookup leaves current weather in the cache, so this
+    # only goes upstream when the coordinates were already known.
+    jobs = {
+        "weather": (get_weather_data, city, weather_api_key),
+        "forecast": (get_weekly_forecast, weather_api_key, *coords),
+        "air_pollution": (get_air_pollution_data, *coords, weather_api_key),
+    }
+    if tomtom_api_key:
+        jobs["traffic"] = (get_traffic_data, *coords, tomtom_api_key)
+    else:
+        snapshot.errors["traffic"] = "Missing TomTom API key"
+
+    futures = {name: _executor.submit(fn, *args) for name, (fn, *args) in jobs.items()}
+    for name, future in futures.items():
+        try:
+            setattr(snapshot, name, future.result())
+        except Exception as e:
+            snapshot.errors[name] = error_message(e)
+
+    snapshot.elapsed = time.perf_counter() - start
+    return snapshot
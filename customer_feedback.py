@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
-import os
 from datetime import datetime
+from feedback_store import get_feedback_store
 
 
 def feedback_form():
@@ -16,10 +16,7 @@ def feedback_form():
         if name.strip() == "" or feedback.strip() == "":
             st.warning("⚠️ Please fill in your name and feedback.")
         else:
-            st.success("✅ Thank you for your valuable feedback!")
-            st.balloons()
-
-            # Save to CSV
+            # Append to the feedback store
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             feedback_data = {
                 "timestamp": timestamp,
@@ -28,13 +25,89 @@ def feedback_form():
                 "rating": rating,
                 "feedback": feedback,
             }
+            get_feedback_store().add(feedback_data)
+            st.success("✅ Thank you for your valuable feedback!")
+            st.balloons()
+
+
+def load_distribution(store):
+    # Read from the trigger-maintained aggregates (one row per city/rating
+    # and per day/city), never the raw feedback history.
+    return pd.DataFrame(
+        store.rating_distribution(), columns=["city", "rating", "count"]
+    )
+
+
+def load_daily(store, city=None, window=7, recent_days=30):
+    daily = pd.DataFrame(
+        store.daily_stats(city), columns=["day", "count", "rating_sum"]
+    )
+    if daily.empty:
+        return daily, None
+    daily["day"] = pd.to_datetime(daily["day"])
+    daily = daily.set_index("day").asfreq("D", fill_value=0)
+    rolling = daily.rolling(window, min_periods=1).sum()
+    daily["average_rating"] = daily["rating_sum"] / daily["count"].where(
+        daily["count"] > 0
+    )
+    daily[f"{window}-day average"] = rolling["rating_sum"] / rolling["count"].where(
+        rolling["count"] > 0
+    )
+    # The last recent_days calendar days up to today, quiet days included.
+    days = pd.date_range(
+        end=pd.Timestamp(datetime.now().date()), periods=recent_days, freq="D"
+    )
+    recent_volume = daily["count"].reindex(days, fill_value=0).rename_axis("day")
+    return daily, recent_volume
+
+
+def load_dashboard_data(store, city=None, window=7, recent_days=30):
+    distribution = load_distribution(store)
+    daily, recent_volume = load_daily(store, city, window, recent_days)
+    return distribution, daily, recent_volume
+
+
+def feedback_dashboard():
+    st.title("📈 Feedback Analytics")
+
+    store = get_feedback_store()
+    distribution = load_distribution(store)
+    if distribution.empty:
+        st.info("No feedback submitted yet.")
+        return
+
+    cities = sorted(c for c in distribution["city"].unique() if c)
+    selected = st.selectbox("🏙️ City", ["All cities"] + cities)
+    window = st.slider("Rolling window (days)", 1, 30, 7)
+    city = None if selected == "All cities" else selected
+    daily, recent_volume = load_daily(store, city, window)
+
+    c1, c2 = st.columns(2)
+    c1.metric("Total Feedback", int(daily["count"].sum()))
+    c2.metric(
+        "Average Rating",
+        f"{daily['rating_sum'].sum() / max(daily['count'].sum(), 1):.2f}",
+    )
+
+    st.subheader("⭐ Rating Distribution per City")
+    if city is not None:
+        distribution = distribution[distribution["city"] == city]
+    pivot = distribution.pivot_table(
+        index="city", columns="rating", values="count", fill_value=0
+    )
+    st.bar_chart(pivot)
+
+    st.subheader(f"📉 {window}-Day Rolling Average Rating")
+    st.line_chart(daily[[f"{window}-day average"]])
 
-            file_path = "feedback_data.csv"
-            if os.path.exists(file_path):
-                df_existing = pd.read_csv(file_path)
-                df_new = pd.DataFrame([feedback_data])
-                df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-            else:
-                df_combined = pd.DataFrame([feedback_data])
+    st.subheader("💬 Comment Volume (last 30 days)")
+    st.bar_chart(recent_volume)
 
-            df_combined.to_csv(file_path, index=False)
+    st.subheader("🆕 Latest Comments")
+    st.dataframe(
+        pd.DataFrame(
+            store.recent(20),
+            columns=["timestamp", "name", "city", "rating", "feedback"],
+        ),
+        use_container_width=True,
+    )
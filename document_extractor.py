@@ -0,0 +1,105 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import docx
+from PyPDF2 import PdfReader
+
+# PDFs with at least this many pages are extracted in a process pool.
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PARALLEL_PAGE_THRESHOLD", "40"))
+PAGES_PER_TASK = 16
+# DOCX has no real pages; group paragraphs into page-sized blocks instead.
+DOCX_PARAGRAPHS_PER_PAGE = 40
+TXT_CHARS_PER_PAGE = 4000
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TXT_TYPE = "text/plain"
+
+# Workers must not be forked from the Streamlit server: a fork copies its
+# threads' locks in whatever state they are in. forkserver where available.
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_worker_reader = None
+
+
+def _init_worker(data):
+    # Each worker parses the PDF once and then serves page ranges from it.
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(data))
+
+
+def _extract_page_range(page_range):
+    start, end = page_range
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pdf_pages(data, max_workers=None, parallel_threshold=None):
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if parallel_threshold is None:
+        parallel_threshold = PARALLEL_PAGE_THRESHOLD
+
+    if page_count < parallel_threshold or (max_workers or os.cpu_count()) < 2:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    del reader
+    ranges = [
+        (start, min(start + PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PAGES_PER_TASK)
+    ]
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=_MP_CONTEXT,
+        initializer=_init_worker,
+        initargs=(data,),
+    )
+    try:
+        # map() hands results back in page order as they complete.
+        for texts in pool.map(_extract_page_range, ranges):
+            yield from texts
+    finally:
+        # Stop early without waiting for the rest of the document.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_docx_pages(data):
+    document = docx.Document(io.BytesIO(data))
+    block = []
+    for paragraph in document.paragraphs:
+        block.append(paragraph.text)
+        if len(block) == DOCX_PARAGRAPHS_PER_PAGE:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+
+def iter_text_pages(data):
+    text = data.decode("utf-8")
+    for page in text.split("\f"):
+        block, size = [], 0
+        for line in page.splitlines():
+            block.append(line)
+            size += len(line) + 1
+            if size >= TXT_CHARS_PER_PAGE:
+                yield "\n".join(block)
+                block, size = [], 0
+        if block:
+            yield "\n".join(block)
+
+
+def iter_document_pages(data, file_type, max_workers=None):
+    # Lazily yield a document's text one page (or page-sized block) at a time.
+    if TXT_TYPE in file_type:
+        return iter_text_pages(data)
+    if PDF_TYPE in file_type:
+        return iter_pdf_pages(data, max_workers=max_workers)
+    if DOCX_TYPE in file_type:
+        return iter_docx_pages(data)
+    return None
@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+DOC_INDEX_DIR = os.getenv("DOC_INDEX_DIR", ".doc_index")
+EMBED_DIM = int(os.getenv("DOC_INDEX_DIM", "512"))
+PASSAGE_CHARS = 1000
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+# Retrieval stops scanning once this is spent and returns the best passages
+# found so far, newest documents first.
+RAG_BUDGET_MS = float(os.getenv("RAG_BUDGET_MS", "50"))
+SCAN_BLOCK_ROWS = 32768
+
+_vectorizer = HashingVectorizer(
+    n_features=EMBED_DIM, stop_words="english", norm=None, alternate_sign=True
+)
+
+
+def embed(texts):
+    # Hashed bag-of-words embeddings: each word is hashed to one of
+    # EMBED_DIM signed buckets, counts are log-damped and rows L2-normalized.
+    # Needs no model download and is stable across processes, so vectors
+    # can be appended to the index forever.
+    X = _vectorizer.transform(texts)
+    X.data = np.sign(X.data) * np.log1p(np.abs(X.data))
+    dense = X.toarray().astype(np.float32)
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    return dense / np.maximum(norms, 1e-12)
+
+
+def split_passages(text, max_chars=PASSAGE_CHARS):
+    # Pack paragraphs (then sentences) into passages of up to max_chars.
+    passages, current = [], ""
+    for paragraph in re.split(r"\f|\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        pieces = (
+            [paragraph]
+            if len(paragraph) <= max_chars
+            else re.split(r"(?<=[.!?])\s+", paragraph)
+        )
+        for piece in pieces:
+            while len(piece) > max_chars:
+                passages.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            if current and len(current) + len(piece) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+class DocumentIndex:
+    # Append-only passage index on disk:
+    #   vectors.f32    row-major float32 embeddings, memory-mapped for search
+    #   offsets.i64    byte offset of each passage in passages.jsonl
+    #   passages.jsonl {"doc": id, "name": ..., "text": ...} per passage
+    #   meta.json      row count, documents and per-bucket document counts
+    # meta.json is rewritten last, so rows past its count (from a crash
+    # mid-append) are ignored and overwritten by the next add.
+
+    def __init__(self, path=DOC_INDEX_DIR, dim=EMBED_DIM):
+        self.path = path
+        self.dim = dim
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._meta_path = os.path.join(path, "meta.json")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._offsets_path = os.path.join(path, "offsets.i64")
+        self._passages_path = os.path.join(path, "passages.jsonl")
+        meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta.get("dim", dim) != dim:
+            raise ValueError(
+                f"index at {path} has dim {meta['dim']}, expected {dim}; "
+                "delete it to rebuild"
+            )
+        self.count = meta.get("count", 0)
+        self.documents = meta.get("documents", {})
+        # Number of passages with a non-zero value in each bucket, for
+        # query-side IDF weighting.
+        self._df = np.array(meta.get("df", [0] * dim), dtype=np.float64)
+        self._passages_bytes = None
+        self._map()
+
+    def _map(self):
+        # Re-map the files at the committed row count. Searches take the
+        # (vectors, offsets) pair in one read, so they never see a mix.
+        if self.count:
+            vectors = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.count, self.dim),
+            )
+            offsets = np.memmap(
+                self._offsets_path, dtype=np.int64, mode="r", shape=(self.count,)
+            )
+        else:
+            vectors = np.empty((0, self.dim), dtype=np.float32)
+            offsets = np.empty(0, dtype=np.int64)
+        self._view = vectors, offsets
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def add_document(self, doc_id, name, text):
+        # Split, embed and append a document. Returns the number of new
+        # passages; 0 if doc_id is already indexed.
+        if doc_id in self.documents:
+            return 0
+        passages = split_passages(text)
+        if not passages:
+            return 0
+        vectors = embed(passages)
+        with self._lock:
+            if doc_id in self.documents:
+                return 0
+            offsets = []
+            with open(self._passages_path, "ab") as f:
+                f.truncate(self._committed_bytes())
+                f.seek(0, os.SEEK_END)
+                for passage in passages:
+                    offsets.append(f.tell())
+                    record = {"doc": doc_id, "name": name, "text": passage}
+                    f.write(json.dumps(record).encode("utf-8") + b"\n")
+                end = f.tell()
+            for file_path, array in (
+                (self._vectors_path, vectors),
+                (self._offsets_path, np.asarray(offsets, dtype=np.int64)),
+            ):
+                mode = "r+b" if os.path.exists(file_path) else "wb"
+                with open(file_path, mode) as f:
+                    f.seek(self.count * array[:1].nbytes)
+                    f.write(array.tobytes())
+                    f.truncate()
+            self._df += vectors.astype(bool).sum(axis=0)
+            self.documents[doc_id] = {
+                "name": name,
+                "first_row": self.count,
+                "passages": len(passages),
+                "added": time.time(),
+            }
+            self.count += len(passages)
+            self._passages_bytes = end
+            self._write_meta()
+            self._map()
+        return len(passages)
+
+    def _committed_bytes(self):
+        if not self.count:
+            return 0
+        if self._passages_bytes is None:
+            # End of the last committed passage line.
+            with open(self._passages_path, "rb") as f:
+                f.seek(int(self._view[1][-1]))
+                f.readline()
+                self._passages_bytes = f.tell()
+        return self._passages_bytes
+
+    def _write_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "count": self.count,
+                    "documents": self.documents,
+                    "df": self._df.tolist(),
+                },
+                f,
+            )
+        os.replace(tmp, self._meta_path)
+
+    def _query_vector(self, query):
+        q = embed([query])[0]
+        # Rare buckets count for more, as with TF-IDF.
+        idf = np.log((self.count + 1) / (self._df + 1)) + 1
+        q = (q * idf).astype(np.float32)
+        return q / max(np.linalg.norm(q), 1e-12)
+
+    def search(self, query, k=RAG_TOP_K, budget_ms=RAG_BUDGET_MS):
+        # Top-k passages by cosine similarity, scanning newest rows first in
+        # blocks until done or budget_ms is spent. Returns (hits, stats);
+        # each hit is a dict with score, doc, name and text.
+        start = time.perf_counter()
+        vectors, offsets = self._view
+        n = len(vectors)
+        if not n or not query.strip():
+            return [], {"scanned": 0, "rows": n, "partial": False, "ms": 0.0}
+        q = self._query_vector(query)
+        deadline = start + budget_ms / 1000 if budget_ms else None
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        scanned, partial = 0, False
+        for hi in range(n, 0, -SCAN_BLOCK_ROWS):
+            lo = max(0, hi - SCAN_BLOCK_ROWS)
+            scores = vectors[lo:hi] @ q
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            best_rows = np.concatenate([best_rows, top + lo])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            keep = np.argsort(-best_scores)[:k]
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+            scanned += hi - lo
+            if deadline and lo > 0 and time.perf_counter() > deadline:
+                partial = True
+                break
+
+        hits = []
+        with open(self._passages_path, "rb") as f:
+            for row, score in zip(best_rows, best_scores):
+                if score <= 0:
+                    continue
+                f.seek(int(offsets[row]))
+                hit = json.loads(f.readline())
+                hit["score"] = float(score)
+                hits.append(hit)
+        stats = {
+            "scanned": scanned,
+            "rows": n,
+            "partial": partial,
+            "ms": (time.perf_counter() - start) * 1000,
+        }
+        return hits, stats
+
+    def stats(self):
+        size = sum(
+            os.path.getsize(p)
+            for p in (self._vectors_path, self._offsets_path, self._passages_path)
+            if os.path.exists(p)
+        )
+        return {"documents": len(self.documents), "passages": self.count, "bytes": size}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_document_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DocumentIndex()
+        return _index
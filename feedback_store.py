@@ -0,0 +1,189 @@
+import csv
+import os
+import threading
+
+from sqlite_writer import GroupCommitWriter, connect
+
+FEEDBACK_DB_PATH = os.getenv("FEEDBACK_DB_PATH", "feedback.sqlite3")
+LEGACY_CSV_PATH = "feedback_data.csv"
+
+# Group commit: while one transaction commits, new submissions queue up and
+# the writer thread commits them together, up to this many rows at a time.
+BATCH_MAX_ROWS = 500
+
+COLUMNS = ("timestamp", "name", "city", "rating", "feedback")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    name TEXT NOT NULL,
+    city TEXT,
+    rating INTEGER NOT NULL,
+    feedback TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Aggregates maintained by a trigger in the same transaction as each insert,
+# so analytics never rescan the feedback history. The last two statements
+# backfill them for a store created before they existed.
+_AGGREGATE_STATEMENTS = (
+    """CREATE TABLE IF NOT EXISTS feedback_city_ratings (
+        city TEXT NOT NULL,
+        rating INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (city, rating)
+    )""",
+    """CREATE TABLE IF NOT EXISTS feedback_daily (
+        day TEXT NOT NULL,
+        city TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        rating_sum INTEGER NOT NULL,
+        PRIMARY KEY (day, city)
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS feedback_aggregate AFTER INSERT ON feedback
+    BEGIN
+        INSERT INTO feedback_city_ratings (city, rating, count)
+        VALUES (COALESCE(NEW.city, ''), NEW.rating, 1)
+        ON CONFLICT (city, rating) DO UPDATE SET count = count + 1;
+        INSERT INTO feedback_daily (day, city, count, rating_sum)
+        VALUES (substr(NEW.timestamp, 1, 10), COALESCE(NEW.city, ''), 1, NEW.rating)
+        ON CONFLICT (day, city) DO UPDATE
+        SET count = count + 1, rating_sum = rating_sum + excluded.rating_sum;
+    END""",
+    """INSERT INTO feedback_city_ratings (city, rating, count)
+    SELECT COALESCE(city, ''), rating, COUNT(*) FROM feedback
+    GROUP BY COALESCE(city, ''), rating""",
+    """INSERT INTO feedback_daily (day, city, count, rating_sum)
+    SELECT substr(timestamp, 1, 10), COALESCE(city, ''), COUNT(*), SUM(rating)
+    FROM feedback GROUP BY substr(timestamp, 1, 10), COALESCE(city, '')""",
+)
+
+_INSERT = (
+    "INSERT INTO feedback (timestamp, name, city, rating, feedback)"
+    " VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _row(record):
+    return tuple(record.get(column) for column in COLUMNS)
+
+
+class FeedbackStore:
+    # Append-only feedback store on SQLite in WAL mode. Inserts go through a
+    # single writer thread that batches concurrent submissions into one
+    # transaction; add() returns once its rows are committed.
+
+    def __init__(self, path=FEEDBACK_DB_PATH, legacy_csv=LEGACY_CSV_PATH):
+        self.path = path
+        self._conn = connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+        self._ensure_aggregates()
+        if legacy_csv and os.path.exists(legacy_csv):
+            self.import_csv(legacy_csv)
+
+        self._writer = GroupCommitWriter(
+            path, _INSERT, BATCH_MAX_ROWS, name="feedback-writer"
+        )
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        self._writer.write([_row(r) for r in records])
+
+    def import_csv(self, csv_path):
+        # One-time migration of the legacy feedback_data.csv. Re-running is a
+        # no-op; the import is recorded in the meta table.
+        marker = f"imported:{os.path.abspath(csv_path)}"
+        with self._read_lock:
+            # IMMEDIATE takes the write lock up front, so two app processes
+            # starting together cannot both import the file.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute(
+                    "SELECT 1 FROM meta WHERE key = ?", (marker,)
+                ).fetchone():
+                    self._conn.rollback()
+                    return 0
+                with open(csv_path, newline="", encoding="utf-8") as f:
+                    rows = [_row(record) for record in csv.DictReader(f)]
+                self._conn.executemany(_INSERT, rows)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    (marker, str(len(rows))),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return len(rows)
+
+    def _ensure_aggregates(self):
+        with self._read_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                built = self._conn.execute(
+                    "SELECT 1 FROM meta WHERE key = 'aggregates'"
+                ).fetchone()
+                if not built:
+                    for statement in _AGGREGATE_STATEMENTS:
+                        self._conn.execute(statement)
+                    self._conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('aggregates', '1')"
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def rating_distribution(self):
+        return self.query(
+            "SELECT city, rating, count FROM feedback_city_ratings"
+            " ORDER BY city, rating"
+        )
+
+    def daily_stats(self, city=None, since=None):
+        sql = "SELECT day, SUM(count), SUM(rating_sum) FROM feedback_daily"
+        clauses, params = [], []
+        if city is not None:
+            clauses.append("city = ?")
+            params.append(city)
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(since)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self.query(sql + " GROUP BY day ORDER BY day", params)
+
+    def recent(self, limit=20):
+        return self.query(
+            "SELECT timestamp, name, city, rating, feedback FROM feedback"
+            " ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+
+    def count(self):
+        with self._read_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    def query(self, sql, params=()):
+        with self._read_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feedback_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeedbackStore()
+        return _store
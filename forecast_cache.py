@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from cache import TTLCache
+from forecasters import ENGINES, get_forecaster
+
+KPI_MODEL_CACHE_DIR = os.getenv("KPI_MODEL_CACHE_DIR", ".kpi_model_cache")
+KPI_MODEL_CACHE_MAX_ENTRIES = int(os.getenv("KPI_MODEL_CACHE_MAX_ENTRIES", "50"))
+
+# Fitted models and forecasts from this process, in front of the disk cache.
+_memory = TTLCache(ttl=24 * 60 * 60, maxsize=16)
+_index_lock = threading.Lock()
+
+
+def series_hash(df):
+    hashed = pd.util.hash_pandas_object(df[["ds", "y"]], index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _path(name):
+    return os.path.join(KPI_MODEL_CACHE_DIR, name)
+
+
+def _load_index():
+    try:
+        with open(_path("index.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index):
+    tmp = _path("index.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, _path("index.json"))
+
+
+def _remove_entry(key):
+    for name in (f"{key}.model", f"{key}.forecast.pkl"):
+        try:
+            os.remove(_path(name))
+        except OSError:
+            pass
+
+
+def _find_warm_start(index, df, cfg_hash):
+    # Newest cached fit of the same config whose series is a strict prefix
+    # of this one, i.e. the same upload with rows appended.
+    candidates = sorted(
+        (
+            (entry["n_rows"], key)
+            for key, entry in index.items()
+            if entry["config"] == cfg_hash and entry["n_rows"] < len(df)
+        ),
+        reverse=True,
+    )
+    for n_rows, key in candidates:
+        if series_hash(df.iloc[:n_rows]) == index[key]["series"]:
+            return key
+    return None
+
+
+def _load_model(engine, key):
+    with open(_path(f"{key}.model"), "rb") as f:
+        return ENGINES[engine].loads(f.read())
+
+
+def get_or_fit_forecast(df, engine="fast", periods=365, freq="D"):
+    # Return (forecaster, forecast, source) for the series in df (columns ds,
+    # y). The forecast covers only the periods after the history. source is
+    # one of "memory", "disk", "warm" or "cold".
+    config = {
+        "engine": engine,
+        "periods": periods,
+        "freq": freq,
+        "include_history": False,
+    }
+    cfg_hash = config_hash(config)
+    key = f"{series_hash(df)[:32]}-{cfg_hash}"
+
+    hit = _memory.get(key)
+    if hit is not None:
+        return hit[0], hit[1], "memory"
+
+    os.makedirs(KPI_MODEL_CACHE_DIR, exist_ok=True)
+    with _index_lock:
+        index = _load_index()
+        entry = index.get(key)
+        if entry is not None:
+            try:
+                model = _load_model(engine, key)
+                forecast = pd.read_pickle(_path(f"{key}.forecast.pkl"))
+                entry["last_access"] = time.time()
+                _save_index(index)
+                _memory.set(key, (model, forecast))
+                return model, forecast, "disk"
+            except Exception:
+                _remove_entry(key)
+                index.pop(key)
+        warm_key = _find_warm_start(index, df, cfg_hash)
+
+    init = None
+    if warm_key is not None:
+        try:
+            init = _load_model(engine, warm_key).warm_start_params()
+        except Exception:
+            init = None
+
+    model = get_forecaster(engine).fit(df, init=init)
+    forecast = model.forecast(periods, freq)
+    _memory.set(key, (model, forecast))
+
+    with _index_lock:
+        with open(_path(f"{key}.model"), "wb") as f:
+            f.write(model.dumps())
+        forecast.to_pickle(_path(f"{key}.forecast.pkl"))
+        index = _load_index()
+        index[key] = {
+            "series": series_hash(df),
+            "n_rows": len(df),
+            "config": cfg_hash,
+            "last_access": time.time(),
+        }
+        # Evict least recently used entries beyond the limit.
+        for old_key in sorted(index, key=lambda k: index[k]["last_access"])[
+            : max(0, len(index) - KPI_MODEL_CACHE_MAX_ENTRIES)
+        ]:
+            _remove_entry(old_key)
+            index.pop(old_key)
+        _save_index(index)
+
+    return model, forecast, "warm" if init is not None else "cold"
@@ -0,0 +1,224 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+
+DAY = np.timedelta64(1, "D")
+# yhat_lower/yhat_upper cover an 80% interval, matching Prophet's default.
+INTERVAL_Z = 1.2816
+
+
+class Forecaster:
+    # Common interface for forecasting engines. fit() takes a frame with ds
+    # and y columns; predict() returns ds, yhat, yhat_lower and yhat_upper
+    # for the requested timestamps.
+
+    name = ""
+
+    def fit(self, df, init=None):
+        raise NotImplementedError
+
+    def predict(self, ds):
+        raise NotImplementedError
+
+    def make_future(self, periods, freq="D", include_history=True):
+        last = self.history_ds[-1]
+        future = pd.date_range(last, periods=periods + 1, freq=freq)[1:]
+        if include_history:
+            return pd.DatetimeIndex(self.history_ds).append(future)
+        return future
+
+    def forecast(self, periods, freq="D", include_history=False):
+        return self.predict(self.make_future(periods, freq, include_history))
+
+    def warm_start_params(self):
+        # Parameters a later fit of a longer series can start from, if the
+        # engine supports warm starts.
+        return None
+
+    def dumps(self):
+        return pickle.dumps(self)
+
+    @classmethod
+    def loads(cls, data):
+        return pickle.loads(data)
+
+
+def _frame(ds, yhat, sigma):
+    return pd.DataFrame(
+        {
+            "ds": pd.DatetimeIndex(ds),
+            "yhat": yhat,
+            "yhat_lower": yhat - INTERVAL_Z * sigma,
+            "yhat_upper": yhat + INTERVAL_Z * sigma,
+        }
+    )
+
+
+def _as_datetime64(ds):
+    return pd.DatetimeIndex(pd.to_datetime(ds)).values
+
+
+class SeasonalNaiveForecaster(Forecaster):
+    # Repeats the value observed one season earlier (weekly by default).
+
+    name = "seasonal_naive"
+
+    def __init__(self, season=pd.Timedelta(days=7)):
+        self.season = np.timedelta64(season)
+
+    def fit(self, df, init=None):
+        df = df.sort_values("ds")
+        self.history_ds = _as_datetime64(df["ds"])
+        self.history_y = df["y"].to_numpy(dtype=float)
+        fitted = self._lookup(self.history_ds - self.season)
+        resid = self.history_y - fitted
+        self.sigma = float(np.nanstd(resid)) if np.isfinite(resid).any() else 0.0
+        return self
+
+    def _lookup(self, ds):
+        # Value at the latest history timestamp at or before each ds.
+        idx = np.searchsorted(self.history_ds, ds, side="right") - 1
+        out = np.where(idx >= 0, self.history_y[np.clip(idx, 0, None)], np.nan)
+        return out
+
+    def predict(self, ds):
+        ds = _as_datetime64(ds)
+        last = self.history_ds[-1]
+        # Step back whole seasons until the timestamp falls inside history.
+        seasons_ahead = np.ceil(
+            np.maximum(ds - last, np.timedelta64(0)) / self.season
+        ).astype(np.int64)
+        lagged = ds - np.maximum(seasons_ahead, 1) * self.season
+        yhat = self._lookup(lagged)
+        yhat = np.where(np.isnan(yhat), self.history_y[0], yhat)
+        return _frame(ds, yhat, self.sigma)
+
+
+class FourierRidgeForecaster(Forecaster):
+    # Linear trend plus Fourier seasonality terms, fitted by closed-form ridge
+    # regression. Seasonalities are enabled with Prophet's rules: yearly
+    # with two years of history, weekly with two weeks, daily for sub-daily
+    # data.
+
+    name = "fourier_ridge"
+
+    SEASONALITIES = {"yearly": (365.25, 10), "weekly": (7.0, 3), "daily": (1.0, 4)}
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+
+    def _features(self, ds):
+        t = (ds - self._t0) / DAY
+        columns = [np.ones_like(t), t / self._t_scale]
+        for period, order in self._seasonalities:
+            angles = 2 * np.pi * np.outer(t, np.arange(1, order + 1)) / period
+            columns.extend([np.sin(angles), np.cos(angles)])
+        return np.column_stack(columns)
+
+    def fit(self, df, init=None):
+        df = df.sort_values("ds")
+        ds = _as_datetime64(df["ds"])
+        y = df["y"].to_numpy(dtype=float)
+        self.history_ds = ds
+        self._t0 = ds[0]
+        span_days = (ds[-1] - ds[0]) / DAY
+        self._t_scale = max(span_days, 1.0)
+
+        step_days = np.median(np.diff(ds) / DAY) if len(ds) > 1 else 1.0
+        enabled = {
+            "yearly": span_days >= 730,
+            "weekly": span_days >= 14 and step_days <= 1,
+            "daily": span_days >= 2 and step_days < 1,
+        }
+        self._seasonalities = [
+            self.SEASONALITIES[name] for name, on in enabled.items() if on
+        ]
+
+        # Scale y so alpha means the same thing for kWh and MWh series.
+        self._y_scale = float(np.abs(y).max()) or 1.0
+        X = self._features(ds)
+        penalty = np.eye(X.shape[1]) * self.alpha
+        penalty[0, 0] = penalty[1, 1] = 0.0  # do not shrink level and trend
+        self.coef = np.linalg.solve(X.T @ X + penalty, X.T @ (y / self._y_scale))
+        resid = y - (X @ self.coef) * self._y_scale
+        self.sigma = float(resid.std())
+        return self
+
+    def predict(self, ds):
+        ds = _as_datetime64(ds)
+        yhat = (self._features(ds) @ self.coef) * self._y_scale
+        return _frame(ds, yhat, self.sigma)
+
+
+class ProphetForecaster(Forecaster):
+    # Prophet is slower and much heavier to import, so it is only loaded
+    # when this engine is actually used.
+
+    name = "prophet"
+
+    def __init__(self, model=None):
+        self.model = model
+
+    def fit(self, df, init=None):
+        from prophet import Prophet
+
+        self.model = Prophet()
+        if init is not None:
+            self.model.fit(df, init=init)
+        else:
+            self.model.fit(df)
+        return self
+
+    @property
+    def history_ds(self):
+        return self.model.history["ds"].values
+
+    def predict(self, ds):
+        forecast = self.model.predict(pd.DataFrame({"ds": ds}))
+        return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+    def warm_start_params(self):
+        # See Prophet's "Updating fitted models" docs.
+        model = self.model
+        params = {}
+        for name in ("k", "m", "sigma_obs"):
+            if model.mcmc_samples == 0:
+                params[name] = model.params[name][0][0]
+            else:
+                params[name] = np.mean(model.params[name])
+        for name in ("delta", "beta"):
+            if model.mcmc_samples == 0:
+                params[name] = model.params[name][0]
+            else:
+                params[name] = np.mean(model.params[name], axis=0)
+        return params
+
+    def dumps(self):
+        from prophet.serialize import model_to_json
+
+        return json.dumps({"prophet": model_to_json(self.model)}).encode()
+
+    @classmethod
+    def loads(cls, data):
+        from prophet.serialize import model_from_json
+
+        return cls(model_from_json(json.loads(data)["prophet"]))
+
+
+ENGINES = {
+    "fast": FourierRidgeForecaster,
+    "seasonal_naive": SeasonalNaiveForecaster,
+    "prophet": ProphetForecaster,
+}
+
+ENGINE_LABELS = {
+    "fast": "⚡ Fast (Fourier ridge)",
+    "seasonal_naive": "🔁 Seasonal naive",
+    "prophet": "🎯 Accurate (Prophet, slower)",
+}
+
+
+def get_forecaster(engine):
+    return ENGINES[engine]()
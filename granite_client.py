@@ -0,0 +1,205 @@
+import hashlib
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# IBM credentials
+API_KEY = os.getenv("IBM_GRANITE_API_KEY")
+PROJECT_ID = os.getenv("IBM_GRANITE_PROJECT_ID")
+API_URL = os.getenv("IBM_GRANITE_URL")  # e.g. https://us-south.ml.cloud.ibm.com
+MODEL_ID = os.getenv("MODEL_ID")  # e.g., granite-3b-instruct
+
+# IAM tokens last about an hour; refresh well before expiry so no user
+# request pays for the token exchange.
+TOKEN_REFRESH_INTERVAL = int(os.getenv("IBM_TOKEN_REFRESH_SECONDS", "1200"))
+
+# "fake" swaps in a local FakeModel so the LLM paths run offline.
+GRANITE_BACKEND = os.getenv("GRANITE_BACKEND", "watsonx")
+FAKE_TOKEN_DELAY = float(os.getenv("FAKE_MODEL_TOKEN_DELAY", "0.02"))
+
+_models = {}
+_lock = threading.Lock()
+_refresher = None
+_stats = {
+    "created": 0,
+    "reused": 0,
+    "setup_seconds": 0.0,
+    "saved_seconds": 0.0,
+    "token_refreshes": 0,
+    "token_refresh_errors": 0,
+}
+
+
+class _Entry:
+    # Registry slot for one credential set. The first caller builds the
+    # model outside _lock; later callers wait on `ready`.
+    def __init__(self):
+        self.ready = threading.Event()
+        self.model = None
+        self.error = None
+        self.setup_seconds = 0.0
+
+
+class FakeModel:
+    # Offline stand-in for ibm_watsonx_ai's Model. Echoes a canned answer
+    # word by word, with a per-token delay to mimic generation latency.
+
+    def __init__(self, model_id="fake-granite", token_delay=FAKE_TOKEN_DELAY):
+        self.model_id = model_id
+        self.token_delay = token_delay
+
+    def _reply(self, prompt, params):
+        words = prompt.split()
+        limit = (params or {}).get("max_new_tokens", 512)
+        body = " ".join(words[-min(len(words), 40) :])
+        reply = f"This is a fake response to: {body}".split()
+        return reply[:limit], len(words)
+
+    def generate_text(self, prompt=None, params=None, raw_response=False, **kwargs):
+        tokens, input_tokens = self._reply(prompt or "", params)
+        time.sleep(self.token_delay * len(tokens))
+        text = " ".join(tokens)
+        if raw_response:
+            return {
+                "model_id": self.model_id,
+                "results": [
+                    {
+                        "generated_text": text,
+                        "generated_token_count": len(tokens),
+                        "input_token_count": input_tokens,
+                        "stop_reason": "eos_token",
+                    }
+                ],
+            }
+        return text
+
+    def generate_text_stream(self, prompt=None, params=None, **kwargs):
+        tokens, _ = self._reply(prompt or "", params)
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_delay)
+            yield token if i == 0 else " " + token
+
+
+def _registry_key(backend, model_id, api_key, url, project_id):
+    # Never keep the raw API key around as a dict key.
+    key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()
+    return backend, model_id, key_hash, url, project_id
+
+
+def configured_model_id():
+    # The model_id get_model() builds by default, without building it.
+    if GRANITE_BACKEND == "fake":
+        return MODEL_ID or "fake-granite"
+    return MODEL_ID
+
+
+def get_model(model_id=None, api_key=None, url=None, project_id=None, backend=None):
+    # Return the process-wide Model for these credentials, creating it on
+    # first use. Safe to call from any Streamlit session thread.
+    model_id = model_id or MODEL_ID
+    api_key = api_key or API_KEY
+    url = url or API_URL
+    project_id = project_id or PROJECT_ID
+    backend = backend or GRANITE_BACKEND
+    key = _registry_key(backend, model_id, api_key, url, project_id)
+
+    with _lock:
+        entry = _models.get(key)
+        builder = entry is None
+        if builder:
+            entry = _models[key] = _Entry()
+
+    if not builder:
+        # Concurrent first calls wait for the one credential exchange
+        # instead of each paying for it.
+        entry.ready.wait()
+        if entry.error is not None:
+            raise entry.error
+        with _lock:
+            _stats["reused"] += 1
+            _stats["saved_seconds"] += entry.setup_seconds
+        return entry.model
+
+    # Built outside _lock: the IAM exchange can take seconds, and must not
+    # block other credential sets or client_stats().
+    start = time.perf_counter()
+    try:
+        if backend == "fake":
+            model = FakeModel(model_id or "fake-granite")
+        else:
+            from ibm_watsonx_ai.foundation_models.model import Model
+
+            model = Model(
+                model_id=model_id,
+                credentials={"apikey": api_key, "url": url},
+                project_id=project_id,
+            )
+        entry.model = model
+    except Exception as e:
+        entry.error = e
+        with _lock:
+            # Let the next call retry rather than caching the failure.
+            if _models.get(key) is entry:
+                del _models[key]
+        raise
+    finally:
+        entry.setup_seconds = time.perf_counter() - start
+        entry.ready.set()
+
+    with _lock:
+        _stats["created"] += 1
+        _stats["setup_seconds"] += entry.setup_seconds
+        _start_refresher()
+    return model
+
+
+def _refresh_tokens():
+    with _lock:
+        models = [entry.model for entry in _models.values() if entry.model]
+    for model in models:
+        client = getattr(model, "_client", None)
+        if client is None:
+            continue
+        try:
+            # Reading the token renews it through the SDK's auth method when
+            # it is close to expiry.
+            client.token
+            key = "token_refreshes"
+        except Exception:
+            key = "token_refresh_errors"
+        with _lock:
+            _stats[key] += 1
+
+
+def _refresh_loop():
+    while True:
+        time.sleep(TOKEN_REFRESH_INTERVAL)
+        _refresh_tokens()
+
+
+def _start_refresher():
+    global _refresher
+    if _refresher is None and TOKEN_REFRESH_INTERVAL > 0:
+        _refresher = threading.Thread(
+            target=_refresh_loop, name="granite-token-refresh", daemon=True
+        )
+        _refresher.start()
+
+
+def clear_models():
+    with _lock:
+        _models.clear()
+
+
+def client_stats():
+    with _lock:
+        calls = _stats["created"] + _stats["reused"]
+        return dict(
+            _stats,
+            models=sum(entry.model is not None for entry in _models.values()),
+            avg_saved_per_call=_stats["saved_seconds"] / calls if calls else 0.0,
+        )
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Upstream base URLs. Override them to point the app at a local stub server.
+OPENWEATHERMAP_BASE_URL = os.getenv(
+    "OPENWEATHERMAP_BASE_URL", "https://api.openweathermap.org"
+).rstrip("/")
+TOMTOM_BASE_URL = os.getenv("TOMTOM_BASE_URL", "https://api.tomtom.com").rstrip("/")
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = 0.5  # sleeps 0.5s, 1s, 2s between retries
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 32
+
+# Requests per second allowed per upstream host (0 disables the limit).
+# Both providers throttle; override to match your plan's quota.
+DEFAULT_RATE_LIMITS = {
+    urlsplit(OPENWEATHERMAP_BASE_URL).netloc: float(
+        os.getenv("OPENWEATHERMAP_RATE_LIMIT", "10")
+    ),
+    urlsplit(TOMTOM_BASE_URL).netloc: float(os.getenv("TOMTOM_RATE_LIMIT", "5")),
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_stats = {"requests": 0, "coalesced": 0, "errors": 0}
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    # Token bucket: `rate` requests per second with bursts of up to `burst`.
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self):
+        # Take a token if one is available and return 0, otherwise return
+        # the seconds until the next one.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+def set_rate_limit(host, rate, burst=None):
+    with _rate_limiters_lock:
+        _rate_limiters[host] = RateLimiter(rate, burst) if rate else None
+
+
+def _get_rate_limiter(host):
+    with _rate_limiters_lock:
+        if host not in _rate_limiters:
+            # A rate of 0 (or less) in the environment means no limit.
+            rate = DEFAULT_RATE_LIMITS.get(host) or 0
+            _rate_limiters[host] = RateLimiter(rate) if rate > 0 else None
+        return _rate_limiters[host]
+
+
+def _build_session():
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    # One keep-alive session per process, shared by all Streamlit sessions.
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def reset_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _request_key(url, params):
+    return url, tuple(sorted((params or {}).items()))
+
+
+def get_json(url, params=None, timeout=None):
+    # GET a JSON document. Concurrent callers asking for the same URL and
+    # params share a single in-flight request (single-flight coalescing).
+    key = _request_key(url, params)
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _inflight[key] = call
+            _stats["requests"] += 1
+        else:
+            _stats["coalesced"] += 1
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        limiter = _get_rate_limiter(urlsplit(url).netloc)
+        if limiter is not None:
+            limiter.acquire()
+        response = get_session().get(
+            url, params=params, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
+        # Retries are exhausted by now; an error body must not be returned
+        # (and cached) as data. Raises requests.HTTPError.
+        response.raise_for_status()
+        call.result = response.json()
+        return call.result
+    except Exception as e:
+        call.error = e
+        with _inflight_lock:
+            _stats["errors"] += 1
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call.done.set()
+
+
+def error_message(error):
+    # A short description of a failed call for display. requests' own
+    # messages include the URL, and with it the API key.
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"HTTP {error.response.status_code} {error.response.reason}"
+    if isinstance(error, requests.RequestException):
+        return type(error).__name__
+    if isinstance(error, ValueError):
+        return "invalid response"
+    return str(error)
+
+
+def client_stats():
+    with _inflight_lock:
+        return dict(_stats, inflight=len(_inflight))
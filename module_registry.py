@@ -0,0 +1,73 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+# "1" imports every registered module before the first render (the old
+# behaviour), "background" does it on a thread after startup, anything
+# else imports each module when its tab is first opened.
+APP_PRELOAD_MODULES = os.getenv("APP_PRELOAD_MODULES", "")
+
+# Guards the bookkeeping below; each import runs under its module's own
+# lock, so a slow import does not hold up a different tab.
+_lock = threading.Lock()
+_module_locks = {}
+_import_seconds = {}
+# Modules fully imported through load_target.
+_loaded = set()
+_preload_started = False
+
+
+def load_target(target):
+    # Resolve "module:attribute", importing the module on first use and
+    # recording how long that cold import took. Callables pass through.
+    if callable(target):
+        return target
+    module_name, attr = target.split(":")
+    if module_name not in _loaded:
+        # A module can be in sys.modules while another thread (the preload)
+        # is still running it; import_module waits for that import to finish.
+        with _lock:
+            module_lock = _module_locks.setdefault(module_name, threading.Lock())
+        with module_lock:
+            already = module_name in sys.modules
+            start = time.perf_counter()
+            importlib.import_module(module_name)
+            with _lock:
+                if not already:
+                    _import_seconds[module_name] = time.perf_counter() - start
+                _loaded.add(module_name)
+    return getattr(sys.modules[module_name], attr)
+
+
+def is_loaded(target):
+    return callable(target) or target.split(":")[0] in _loaded
+
+
+def preload(targets):
+    for target in targets:
+        load_target(target)
+
+
+def start_preload(targets, mode=APP_PRELOAD_MODULES):
+    # Called on every script run; only the first call does anything.
+    global _preload_started
+    if _preload_started:
+        return
+    _preload_started = True
+    targets = [t for t in targets if not callable(t)]
+    if mode == "1":
+        preload(targets)
+    elif mode == "background":
+        threading.Thread(
+            target=preload, args=(targets,), daemon=True, name="module-preload"
+        ).start()
+
+
+def import_times():
+    # Cold import cost of each module loaded through load_target, slowest
+    # first. Modules already imported by something else are not listed.
+    with _lock:
+        items = list(_import_seconds.items())
+    return dict(sorted(items, key=lambda kv: -kv[1]))
@@ -0,0 +1,430 @@
+import logging
+import os
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from cache import coord_key
+from sqlite_writer import GroupCommitWriter, connect
+
+logger = logging.getLogger(__name__)
+
+OBSERVATIONS_DB_PATH = os.getenv("OBSERVATIONS_DB_PATH", "observations.sqlite3")
+# "0" stops API responses from being recorded; the store can still be read.
+OBSERVATIONS_ENABLED = os.getenv("OBSERVATIONS_ENABLED", "1") == "1"
+
+# Group commit (see sqlite_writer): queued batches are written together,
+# up to this many rows per transaction.
+BATCH_MAX_ROWS = 50_000
+# SQLite page cache per connection, in KiB.
+CACHE_KIB = 65536
+# Rows per executemany call when bulk loading a DataFrame.
+BULK_CHUNK_ROWS = 500_000
+
+AGGREGATES = ("avg", "min", "max", "sum", "count")
+
+# Each (city, metric) pair is a series with a small integer id, so an
+# observation is three numbers. The WITHOUT ROWID primary key keeps every
+# series' points contiguous and in time order on disk, so a city/metric/time
+# range is one sequential B-tree scan. The ts index serves queries across
+# all series for a time window.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    UNIQUE (city, metric)
+);
+CREATE TABLE IF NOT EXISTS observations (
+    series_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_ts ON observations (ts);
+CREATE TABLE IF NOT EXISTS places (
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    city TEXT NOT NULL,
+    PRIMARY KEY (lat, lon)
+) WITHOUT ROWID;
+"""
+
+# Repeated fetches of the same reading (same upstream timestamp) are ignored.
+_INSERT = "INSERT OR IGNORE INTO observations (series_id, ts, value) VALUES (?, ?, ?)"
+
+WEATHER_FIELDS = {
+    "temp_c": ("main", "temp"),
+    "feels_like_c": ("main", "feels_like"),
+    "humidity": ("main", "humidity"),
+    "pressure": ("main", "pressure"),
+    "wind_speed": ("wind", "speed"),
+    "clouds": ("clouds", "all"),
+}
+TRAFFIC_FIELDS = {
+    "traffic_speed": "currentSpeed",
+    "traffic_free_flow_speed": "freeFlowSpeed",
+    "traffic_travel_time": "currentTravelTime",
+    "traffic_free_flow_travel_time": "freeFlowTravelTime",
+    "traffic_confidence": "confidence",
+}
+
+
+class ObservationStore:
+    # Append-only time-series store of (city, metric, ts, value) readings on
+    # SQLite in WAL mode. Writes go through one writer thread that batches
+    # them into transactions; record() returns immediately, add_rows() and
+    # add_frame() once committed. ts is Unix seconds (UTC).
+
+    def __init__(self, path=OBSERVATIONS_DB_PATH):
+        self.path = path
+        self._conn = connect(path, CACHE_KIB)
+        self._conn.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+        self._series_lock = threading.Lock()
+        self._series = {}
+        self._places = {}
+
+        self._writer = GroupCommitWriter(
+            path,
+            _INSERT,
+            BATCH_MAX_ROWS,
+            name="observation-writer",
+            cache_kib=CACHE_KIB,
+        )
+
+    @property
+    def dropped(self):
+        # Rows lost to failed writes.
+        return self._writer.dropped
+
+    # -------------------- Writing --------------------
+    def series_id(self, city, metric):
+        key = (city, metric)
+        with self._series_lock:
+            series_id = self._series.get(key)
+            if series_id is None:
+                with self._read_lock:
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO series (city, metric) VALUES (?, ?)",
+                            key,
+                        )
+                    series_id = self._conn.execute(
+                        "SELECT id FROM series WHERE city = ? AND metric = ?", key
+                    ).fetchone()[0]
+                self._series[key] = series_id
+            return series_id
+
+    def set_place(self, lat, lon, city):
+        # Name readings at lat/lon after city. The AQI and traffic APIs are
+        # queried by coordinates only and take the name from here.
+        key = coord_key(lat, lon)
+        with self._series_lock:
+            if self._places.get(key) == city:
+                return
+            with self._read_lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO places (lat, lon, city) VALUES (?, ?, ?)",
+                    key + (city,),
+                )
+            self._places[key] = city
+
+    def place(self, lat, lon):
+        # Name recorded for lat/lon, or the coordinates themselves.
+        key = coord_key(lat, lon)
+        with self._series_lock:
+            city = self._places.get(key)
+            if city is None:
+                with self._read_lock:
+                    row = self._conn.execute(
+                        "SELECT city FROM places WHERE lat = ? AND lon = ?", key
+                    ).fetchone()
+                city = self._places[key] = (
+                    row[0] if row else "{:.4f},{:.4f}".format(*key)
+                )
+            return city
+
+    def _encode(self, rows):
+        return [
+            (self.series_id(city, metric), int(ts), float(value))
+            for city, metric, ts, value in rows
+        ]
+
+    def record(self, rows):
+        # Queue (city, metric, ts, value) rows without waiting for the write;
+        # used on the request path. Write errors are counted in dropped.
+        rows = self._encode(rows)
+        if rows:
+            self._writer.put(rows)
+
+    def add_rows(self, rows):
+        self._writer.write(self._encode(rows))
+
+    def add_frame(self, df):
+        # Bulk load a DataFrame with city, metric, ds (datetime or Unix
+        # seconds) and value columns. Returns the number of rows written.
+        pairs = df[["city", "metric"]].astype(str)
+        codes, uniques = pd.MultiIndex.from_frame(pairs).factorize()
+        ids = np.array([self.series_id(c, m) for c, m in uniques], dtype=np.int64)
+        series_ids = ids[codes]
+        ts = _to_unix(df["ds"])
+        values = df["value"].to_numpy(dtype=float)
+        keep = ~np.isnan(values)
+        series_ids, ts, values = series_ids[keep], ts[keep], values[keep]
+        for start in range(0, len(ts), BULK_CHUNK_ROWS):
+            end = start + BULK_CHUNK_ROWS
+            self._writer.write(
+                list(
+                    zip(
+                        series_ids[start:end].tolist(),
+                        ts[start:end].tolist(),
+                        values[start:end].tolist(),
+                    )
+                )
+            )
+        return int(keep.sum())
+
+    def flush(self):
+        # Wait until everything queued so far is committed.
+        self._writer.write([])
+
+    # -------------------- Reading --------------------
+    def series(self, cities=None, metrics=None):
+        # DataFrame of id, city, metric for the matching series.
+        sql, params = "SELECT id, city, metric FROM series", []
+        clauses = []
+        for column, wanted in (("city", cities), ("metric", metrics)):
+            if wanted is not None:
+                wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+                clauses.append(f"{column} IN ({','.join('?' * len(wanted))})")
+                params += wanted
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._read_lock:
+            rows = self._conn.execute(sql + " ORDER BY city, metric", params)
+            return pd.DataFrame(rows.fetchall(), columns=["id", "city", "metric"])
+
+    def cities(self):
+        return sorted(self.series()["city"].unique())
+
+    def metrics(self, cities=None):
+        return sorted(self.series(cities)["metric"].unique())
+
+    def query(
+        self, cities=None, metrics=None, start=None, end=None, bucket=None, agg="avg"
+    ):
+        # Long-format DataFrame (city, metric, ds, value) of the matching
+        # series with start <= ds < end. With bucket (seconds or a Timedelta)
+        # readings are downsampled in SQL to one agg value per bucket,
+        # labelled by the bucket start.
+        if agg not in AGGREGATES:
+            raise ValueError(f"agg must be one of {AGGREGATES}")
+        series = self.series(cities, metrics).set_index("id")
+        columns = ["city", "metric", "ds", "value"]
+        if series.empty:
+            return pd.DataFrame(columns=columns)
+
+        clauses = [f"series_id IN ({','.join(map(str, series.index))})"]
+        params = []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_to_unix(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(_to_unix(end))
+        where = " AND ".join(clauses)
+        if bucket is None:
+            sql = f"SELECT series_id, ts, value FROM observations WHERE {where}"
+        else:
+            step = int(pd.Timedelta(bucket, unit="s").total_seconds())
+            sql = (
+                f"SELECT series_id, ts / {step} * {step} AS bucket, {agg}(value)"
+                f" FROM observations WHERE {where}"
+                " GROUP BY series_id, bucket"
+            )
+        with self._read_lock:
+            rows = self._conn.execute(sql + " ORDER BY 1, 2", params).fetchall()
+
+        data = np.array(rows, dtype=float).reshape(-1, 3)
+        ids = data[:, 0].astype(np.int64)
+        return pd.DataFrame(
+            {
+                "city": series["city"].reindex(ids).to_numpy(),
+                "metric": series["metric"].reindex(ids).to_numpy(),
+                "ds": pd.to_datetime(data[:, 1].astype(np.int64), unit="s"),
+                "value": data[:, 2],
+            },
+            columns=columns,
+        )
+
+    def frame(self, cities=None, metrics=None, start=None, end=None, bucket=None):
+        # Wide DataFrame (city, ds, one column per metric) for models that
+        # look at several metrics together. Readings from different sources
+        # rarely share a timestamp, so pass a bucket to line them up.
+        long = self.query(cities, metrics, start, end, bucket)
+        if long.empty:
+            return pd.DataFrame(columns=["city", "ds"])
+        wide = long.pivot_table(
+            index=["city", "ds"], columns="metric", values="value", aggfunc="mean"
+        )
+        wide.columns.name = None
+        return wide.reset_index()
+
+    def time_range(self):
+        with self._read_lock:
+            lo, hi = self._conn.execute(
+                "SELECT MIN(ts), MAX(ts) FROM observations"
+            ).fetchone()
+        if lo is None:
+            return None
+        return pd.to_datetime(lo, unit="s"), pd.to_datetime(hi, unit="s")
+
+    def count(self):
+        with self._read_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+
+
+def _to_unix(ds):
+    # Unix seconds from numbers, or from datetimes (naive ones are UTC).
+    # Scalars give an int, sequences an int64 array.
+    if isinstance(ds, (int, float, np.integer, np.floating)):
+        return int(ds)
+    if isinstance(ds, (str, date, np.datetime64)):
+        ts = pd.Timestamp(ds)
+        if ts.tz is not None:
+            ts = ts.tz_convert(None)
+        return ts.value // 10**9
+    values = pd.Series(ds)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    values = pd.to_datetime(values)
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert(None)
+    return values.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+
+# -------------------- Extracting readings from API payloads --------------------
+def weather_rows(data):
+    if not isinstance(data, dict) or "coord" not in data or "dt" not in data:
+        return []
+    lat, lon = data["coord"]["lat"], data["coord"]["lon"]
+    store = get_observation_store()
+    if data.get("name"):
+        store.set_place(lat, lon, data["name"])
+    city = store.place(lat, lon)
+    rows = []
+    for metric, (section, field) in WEATHER_FIELDS.items():
+        value = data.get(section, {}).get(field)
+        if value is None:
+            continue
+        # The standard endpoint reports Kelvin.
+        if metric.endswith("_c"):
+            value -= 273.15
+        rows.append((city, metric, data["dt"], value))
+    return rows
+
+
+def _place(lat, lon):
+    return get_observation_store().place(lat, lon)
+
+
+def air_pollution_rows(lat, lon, data):
+    try:
+        entry = data["list"][0]
+        ts, aqi = entry["dt"], entry["main"]["aqi"]
+    except (KeyError, IndexError, TypeError):
+        return []
+    city = _place(lat, lon)
+    rows = [(city, "aqi", ts, aqi)]
+    rows += [
+        (city, name, ts, value) for name, value in entry.get("components", {}).items()
+    ]
+    return rows
+
+
+def traffic_rows(lat, lon, data, ts=None):
+    # Flow data has no timestamp of its own; it is "now".
+    flow = data.get("flowSegmentData") if isinstance(data, dict) else None
+    if not flow:
+        return []
+    city = _place(lat, lon)
+    ts = int(time.time()) if ts is None else ts
+    rows = [
+        (city, metric, ts, flow[field])
+        for metric, field in TRAFFIC_FIELDS.items()
+        if flow.get(field) is not None
+    ]
+    if flow.get("freeFlowSpeed"):
+        congestion = 1 - flow["currentSpeed"] / flow["freeFlowSpeed"]
+        rows.append((city, "traffic_congestion", ts, congestion))
+    return rows
+
+
+# Payloads that could not be recorded, see recording_stats().
+_record_errors = 0
+_record_errors_lock = threading.Lock()
+
+
+def _record(extract, *args):
+    # Never let recording, or a payload the extractor does not expect,
+    # break the request that fetched the data; log and count it instead.
+    global _record_errors
+    if not OBSERVATIONS_ENABLED:
+        return
+    try:
+        rows = extract(*args)
+        if rows:
+            get_observation_store().record(rows)
+    except Exception:
+        logger.exception("Could not record observations (%s)", extract.__name__)
+        with _record_errors_lock:
+            _record_errors += 1
+
+
+def record_weather(data):
+    _record(weather_rows, data)
+
+
+def record_air_pollution(lat, lon, data):
+    _record(air_pollution_rows, lat, lon, data)
+
+
+def record_traffic(lat, lon, data):
+    _record(traffic_rows, lat, lon, data)
+
+
+def congestion_index_rows(lat, lon, index, ts=None):
+    # Filed under the same place name as the weather readings for lat/lon,
+    # not the name the user typed.
+    ts = int(time.time()) if ts is None else ts
+    return [(_place(lat, lon), "traffic_congestion_index", ts, index)]
+
+
+def record_congestion_index(lat, lon, index, ts=None):
+    _record(congestion_index_rows, lat, lon, index, ts)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_observation_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ObservationStore()
+        return _store
+
+
+def recording_stats():
+    # Responses that could not be recorded (errors) and rows lost to failed
+    # writes (dropped). Does not open the store.
+    with _store_lock:
+        store = _store
+    with _record_errors_lock:
+        errors = _record_errors
+    return {"errors": errors, "dropped": store.dropped if store is not None else 0}
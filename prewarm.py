@@ -0,0 +1,239 @@
+import math
+import os
+import threading
+import time
+
+import traffic
+import weather
+from cache import TTLCache
+from http_client import RateLimiter
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "20"))
+# Upstream calls the prewarmer may make per minute, across all APIs; 0 or
+# less disables prewarming.
+PREWARM_CALLS_PER_MINUTE = float(os.getenv("PREWARM_CALLS_PER_MINUTE", "30"))
+# Refresh entries once less than this share of their TTL is left.
+PREWARM_REFRESH_AHEAD = float(os.getenv("PREWARM_REFRESH_AHEAD", "0.2"))
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "15"))
+# Request counts halve over this many seconds, so "hot" means recently hot.
+PREWARM_HALF_LIFE = float(os.getenv("PREWARM_HALF_LIFE", str(60 * 60)))
+# Cities the weather API could not resolve are skipped for this long.
+PREWARM_UNKNOWN_TTL = float(os.getenv("PREWARM_UNKNOWN_TTL", str(60 * 60)))
+
+# What each page needs for a city, and so what makes a request "warm".
+KINDS = ("weather", "forecast", "air_pollution", "traffic")
+TTLS = {
+    "weather": weather.WEATHER_TTL,
+    "forecast": weather.FORECAST_TTL,
+    "air_pollution": weather.AIR_POLLUTION_TTL,
+    "traffic": traffic.TRAFFIC_TTL,
+}
+
+
+class HotCities:
+    # Exponentially decayed request counts per city. New requests weigh
+    # exp(rate * t) instead of decaying every old score; scores are rebased
+    # now and then so the weights stay finite.
+
+    def __init__(self, half_life=PREWARM_HALF_LIFE, maxsize=1000):
+        self.rate = math.log(2) / half_life
+        self.maxsize = maxsize
+        self._start = time.monotonic()
+        self._scores = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def record(self, city):
+        key = city.strip().lower()
+        with self._lock:
+            elapsed = time.monotonic() - self._start
+            if self.rate * elapsed > 50:
+                scale = math.exp(-self.rate * elapsed)
+                self._scores = {k: v * scale for k, v in self._scores.items()}
+                self._start += elapsed
+                elapsed = 0.0
+            weight = math.exp(self.rate * elapsed)
+            self._scores[key] = self._scores.get(key, 0.0) + weight
+            self._names.setdefault(key, city.strip())
+            if len(self._scores) > self.maxsize:
+                coldest = min(self._scores, key=self._scores.get)
+                del self._scores[coldest], self._names[coldest]
+
+    def top(self, n):
+        with self._lock:
+            keys = sorted(self._scores, key=self._scores.get, reverse=True)[:n]
+            return [self._names[k] for k in keys]
+
+
+def _remaining(kind, city, coords):
+    if kind == "weather":
+        return weather.cached_ttl("weather", city)
+    if coords is None:
+        return None
+    if kind == "traffic":
+        return traffic.cached_ttl(*coords)
+    return weather.cached_ttl(kind, lat=coords[0], lon=coords[1])
+
+
+class PrewarmScheduler:
+    # Background thread that keeps the most requested cities' weather,
+    # forecast, AQI and traffic entries in the shared module caches fresh,
+    # refreshing them shortly before they expire. Upstream calls are capped
+    # by a token bucket of calls_per_minute. Streamlit sessions read the
+    # same caches, so a prewarmed city is served without an upstream call.
+
+    def __init__(
+        self,
+        weather_api_key=None,
+        tomtom_api_key=None,
+        top_n=PREWARM_TOP_N,
+        calls_per_minute=PREWARM_CALLS_PER_MINUTE,
+        refresh_ahead=PREWARM_REFRESH_AHEAD,
+        interval=PREWARM_INTERVAL,
+    ):
+        self.weather_api_key = weather_api_key or os.getenv("openweathermap_api")
+        self.tomtom_api_key = tomtom_api_key or os.getenv("TOMTOM_API_KEY")
+        self.top_n = top_n
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.hot = HotCities()
+        self._unknown = TTLCache(ttl=PREWARM_UNKNOWN_TTL, maxsize=1000)
+        self._budget = (
+            RateLimiter(calls_per_minute / 60, burst=calls_per_minute)
+            if calls_per_minute > 0
+            else None
+        )
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ("requests", "warm", "refreshes", "errors", "over_budget", "unknown"), 0
+        )
+
+    def track_request(self, city, kinds=KINDS):
+        # Call when a user asks for city; returns whether everything the
+        # page needs was already cached.
+        self.hot.record(city)
+        coords = weather.get_cached_coords(city)
+        warm = all(_remaining(kind, city, coords) is not None for kind in kinds)
+        self._count("requests")
+        if warm:
+            self._count("warm")
+        return warm
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def _due(self):
+        # (city, kind) pairs to refresh, hottest city first. Cities without
+        # coordinates only get their weather lookup, which resolves them.
+        kinds = [k for k in KINDS if k != "traffic" or self.tomtom_api_key]
+        due = []
+        for city in self.hot.top(self.top_n):
+            if self._unknown.peek(city.strip().lower()):
+                continue
+            coords = weather.get_cached_coords(city)
+            for kind in kinds if coords is not None else ("weather",):
+                remaining = _remaining(kind, city, coords)
+                if remaining is None or remaining < self.refresh_ahead * TTLS[kind]:
+                    due.append((city, kind))
+        return due
+
+    def _refresh(self, city, kind, coords):
+        if kind == "weather":
+            weather.get_weather_data(city, self.weather_api_key, refresh=True)
+            if weather.get_cached_coords(city) is None:
+                # Typo or unknown city: stop asking about it for a while.
+                self._unknown.set(city.strip().lower(), True)
+                self._count("unknown")
+            return
+        lat, lon = coords
+        if kind == "forecast":
+            weather.get_weekly_forecast(self.weather_api_key, lat, lon, refresh=True)
+        elif kind == "air_pollution":
+            weather.get_air_pollution_data(lat, lon, self.weather_api_key, refresh=True)
+        else:
+            traffic.get_traffic_data(lat, lon, self.tomtom_api_key, refresh=True)
+
+    def run_once(self):
+        # One pass over the due entries within the call budget. Returns the
+        # number of upstream calls made.
+        if not self.weather_api_key or self._budget is None:
+            return 0
+        due = self._due()
+        calls = 0
+        for i, (city, kind) in enumerate(due):
+            if self._stop.is_set():
+                break
+            coords = weather.get_cached_coords(city)
+            if kind != "weather" and coords is None:
+                continue
+            # Only entries that make an upstream call take a budget token.
+            if self._budget.try_acquire():
+                self._count("over_budget", len(due) - i)
+                break
+            calls += 1
+            try:
+                self._refresh(city, kind, coords)
+                self._count("refreshes")
+            except Exception:
+                self._count("errors")
+        return calls
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        # Without a call budget there is nothing to do.
+        if self._budget is None:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="prewarm"
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        hot = self.hot.top(self.top_n)
+        # Mean share of TTL left per kind across the hot cities; 0 if absent.
+        freshness = {}
+        for kind in KINDS:
+            left = []
+            for city in hot:
+                remaining = _remaining(kind, city, weather.get_cached_coords(city))
+                left.append((remaining or 0.0) / TTLS[kind])
+            freshness[kind] = sum(left) / len(left) if left else 0.0
+        counts["warm_share"] = (
+            counts["warm"] / counts["requests"] if counts["requests"] else 0.0
+        )
+        counts["freshness"] = freshness
+        counts["hot_cities"] = hot
+        return counts
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_prewarm_scheduler():
+    # Shared by every session in the process; started on first use unless
+    # PREWARM_ENABLED is "0".
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PrewarmScheduler()
+            if PREWARM_ENABLED:
+                _scheduler.start()
+        return _scheduler
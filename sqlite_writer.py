@@ -0,0 +1,75 @@
+import queue
+import sqlite3
+import threading
+
+
+def connect(path, cache_kib=None):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    if cache_kib:
+        conn.execute(f"PRAGMA cache_size=-{int(cache_kib)}")
+    return conn
+
+
+class _Pending:
+    def __init__(self, rows):
+        self.rows = rows
+        self.done = threading.Event()
+        self.error = None
+
+
+class GroupCommitWriter:
+    # Single writer thread for one INSERT statement on a WAL database. While
+    # one transaction commits, new rows queue up and the thread commits them
+    # together, up to max_rows rows at a time. Rows from a failed
+    # transaction are counted in dropped.
+
+    def __init__(self, path, sql, max_rows, name, cache_kib=None):
+        self.path = path
+        self.sql = sql
+        self.max_rows = max_rows
+        self.cache_kib = cache_kib
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, rows):
+        # Queue rows without waiting for the commit.
+        self._queue.put(_Pending(rows))
+
+    def write(self, rows):
+        # Queue rows and wait until they are committed; re-raises the
+        # transaction's error.
+        pending = _Pending(rows)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def _write_loop(self):
+        conn = connect(self.path, self.cache_kib)
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0].rows)
+            while rows < self.max_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item.rows)
+
+            error = None
+            try:
+                with conn:
+                    for pending in batch:
+                        conn.executemany(self.sql, pending.rows)
+            except Exception as e:
+                error = e
+                self.dropped += rows
+            for pending in batch:
+                pending.error = error
+                pending.done.set()
@@ -0,0 +1,323 @@
+import argparse
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+STREAM_WINDOW = int(os.getenv("STREAM_ANOMALY_WINDOW", "2048"))
+STREAM_REFIT_EVERY = int(os.getenv("STREAM_ANOMALY_REFIT_EVERY", "5000"))
+STREAM_Z_THRESHOLD = float(os.getenv("STREAM_ANOMALY_Z_THRESHOLD", "4.0"))
+# Records seen before anything is flagged, so the statistics settle first.
+WARMUP_RECORDS = 100
+EULER_GAMMA = 0.5772156649015329
+
+
+def _average_path_length(n):
+    # Expected path length of an unsuccessful BST search among n points,
+    # used by IsolationForest to normalize depths.
+    n = np.asarray(n, dtype=float)
+    out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    big = n > 2
+    out[big] = (
+        2.0 * (np.log(n[big] - 1.0) + EULER_GAMMA) - 2.0 * (n[big] - 1.0) / n[big]
+    )
+    return out
+
+
+class CompiledForest:
+    # A fitted IsolationForest flattened into padded NumPy arrays so one
+    # record is scored with a fixed number of vectorized steps (the tree
+    # depth), instead of sklearn's per-call overhead. decision_function
+    # matches sklearn's: negative means anomalous.
+
+    def __init__(self, model):
+        trees = [est.tree_ for est in model.estimators_]
+        width = max(t.node_count for t in trees)
+        shape = (len(trees), width)
+        self.feature = np.zeros(shape, dtype=np.intp)
+        self.threshold = np.zeros(shape)
+        self.left = np.zeros(shape, dtype=np.intp)
+        self.right = np.zeros(shape, dtype=np.intp)
+        self.path = np.zeros(shape)
+        self.depth = max(t.max_depth for t in trees)
+
+        for i, (t, features) in enumerate(zip(trees, model.estimators_features_)):
+            n = t.node_count
+            nodes = np.arange(n)
+            leaf = t.children_left == -1
+            depth = np.zeros(n)
+            # Children always come after their parent in sklearn's layout.
+            for node in nodes[~leaf]:
+                depth[t.children_left[node]] = depth[t.children_right[node]] = (
+                    depth[node] + 1
+                )
+            self.feature[i, :n] = np.where(leaf, 0, features[t.feature.clip(0)])
+            self.threshold[i, :n] = t.threshold
+            # Leaves point at themselves so extra steps are no-ops.
+            self.left[i, :n] = np.where(leaf, nodes, t.children_left)
+            self.right[i, :n] = np.where(leaf, nodes, t.children_right)
+            self.path[i, :n] = depth + _average_path_length(t.n_node_samples)
+
+        self._rows = np.arange(len(trees))[:, None]
+        self._norm = _average_path_length([model.max_samples_])[0]
+        self.offset = model.offset_
+
+    def decision_function(self, X):
+        X = np.atleast_2d(X)
+        node = np.zeros((len(self._rows), len(X)), dtype=np.intp)
+        cols = np.arange(len(X))
+        for _ in range(self.depth):
+            go_left = (
+                X[cols, self.feature[self._rows, node]]
+                <= self.threshold[self._rows, node]
+            )
+            node = np.where(
+                go_left, self.left[self._rows, node], self.right[self._rows, node]
+            )
+        mean_path = self.path[self._rows, node].mean(axis=0)
+        return -(2.0 ** (-mean_path / self._norm)) - self.offset
+
+
+@dataclass
+class Detection:
+    values: np.ndarray
+    z: float  # largest absolute robust z-score across columns
+    ewma_z: float  # largest absolute z-score against the EWMA mean/std
+    forest_score: float  # NaN until the first forest is fitted
+    anomaly: bool
+
+
+class StreamingDetector:
+    # Incremental detector for records of len(columns) numbers. State is
+    # bounded by window: a ring buffer of recent records, EWMA moments,
+    # the robust median/MAD of the buffer and a compiled IsolationForest.
+    # The median/MAD and the forest are refreshed from a snapshot of the
+    # buffer every refit_every records on a background thread, so the
+    # per-record cost stays constant. A record is flagged when any robust
+    # or EWMA z-score exceeds z_threshold or the forest scores it below 0.
+
+    def __init__(
+        self,
+        columns,
+        window=STREAM_WINDOW,
+        refit_every=STREAM_REFIT_EVERY,
+        z_threshold=STREAM_Z_THRESHOLD,
+        ewma_alpha=0.01,
+        contamination=0.01,
+        background=True,
+    ):
+        self.columns = list(columns)
+        self.window = window
+        self.refit_every = refit_every
+        self.z_threshold = z_threshold
+        self.alpha = ewma_alpha
+        self.contamination = contamination
+        self.background = background
+
+        k = len(self.columns)
+        self._buffer = np.empty((window, k))
+        self._seen = 0
+        self._mean = np.zeros(k)
+        self._mean_sq = np.zeros(k)
+        self._median = None
+        self._scale = None
+        self._forest = None
+        self._refitting = threading.Lock()
+        self.refits = 0
+
+    def update(self, record):
+        return self.update_batch(np.asarray(record, dtype=float)[None, :])[0]
+
+    def update_batch(self, X):
+        # Score a micro-batch, then fold it into the state. All records in
+        # the batch are scored against the state from before the batch.
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.columns))
+        n = len(X)
+        if not n:
+            return []
+
+        warm = self._seen >= WARMUP_RECORDS
+        std = np.sqrt(np.maximum(self._mean_sq - self._mean**2, 1e-12))
+        ewma_z = np.abs(X - self._mean) / std if warm else np.zeros_like(X)
+        if self._median is not None:
+            z = np.abs(X - self._median) / self._scale
+        else:
+            z = np.zeros_like(X)
+        forest = self._forest
+        scores = forest.decision_function(X) if forest else np.full(n, np.nan)
+
+        max_z, max_ewma_z = z.max(axis=1), ewma_z.max(axis=1)
+        flags = (max_z > self.z_threshold) | (max_ewma_z > self.z_threshold)
+        if forest:
+            flags |= scores < 0
+
+        self._fold(X)
+        return [
+            Detection(
+                X[i],
+                float(max_z[i]),
+                float(max_ewma_z[i]),
+                float(scores[i]),
+                bool(flags[i]),
+            )
+            for i in range(n)
+        ]
+
+    def _fold(self, X):
+        n = len(X)
+        # EWMA of x and x**2 over the batch in closed form; the first
+        # record seeds the moments.
+        if self._seen == 0:
+            self._mean, self._mean_sq = X[0].copy(), X[0] ** 2
+            X_rest = X[1:]
+        else:
+            X_rest = X
+        if len(X_rest):
+            m = len(X_rest)
+            decay = (1 - self.alpha) ** m
+            weights = self.alpha * (1 - self.alpha) ** np.arange(m - 1, -1, -1)
+            self._mean = decay * self._mean + weights @ X_rest
+            self._mean_sq = decay * self._mean_sq + weights @ X_rest**2
+
+        pos = (self._seen + np.arange(n)) % self.window
+        self._buffer[pos[-self.window :]] = X[-self.window :]
+        before = self._seen
+        self._seen += n
+        due = self._seen // self.refit_every > before // self.refit_every
+        if self._seen >= WARMUP_RECORDS and (due or self._median is None):
+            self.refresh()
+
+    def refresh(self):
+        # Refit robust statistics and the forest from a snapshot of the
+        # buffer. Skipped if the previous refresh is still running.
+        if not self._refitting.acquire(blocking=False):
+            return
+        snapshot = self._buffer[: min(self._seen, self.window)].copy()
+        if self.background:
+            threading.Thread(target=self._refit, args=(snapshot,), daemon=True).start()
+        else:
+            self._refit(snapshot)
+
+    def _refit(self, snapshot):
+        try:
+            median = np.median(snapshot, axis=0)
+            mad = np.median(np.abs(snapshot - median), axis=0)
+            self._median, self._scale = median, np.maximum(1.4826 * mad, 1e-12)
+            model = IsolationForest(
+                contamination=self.contamination, random_state=self.refits
+            ).fit(snapshot)
+            self._forest = CompiledForest(model)
+            self.refits += 1
+        finally:
+            self._refitting.release()
+
+
+def tail_file(path, from_start=True, poll_interval=0.2, stop=None):
+    # Yields complete lines as they are appended to path, like tail -f.
+    # Yields None when no new data arrived within poll_interval so callers
+    # can flush partial micro-batches. Runs until stop (an Event) is set.
+    with open(path, encoding="utf-8") as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        pending = ""
+        while not (stop and stop.is_set()):
+            chunk = f.readline()
+            if not chunk:
+                yield None
+                time.sleep(poll_interval)
+                continue
+            pending += chunk
+            if pending.endswith("\n"):
+                yield pending.rstrip("\r\n")
+                pending = ""
+
+
+def socket_lines(host, port, idle_timeout=0.2):
+    # Yields newline-delimited lines from a TCP stream until it closes, and
+    # None whenever it is idle for idle_timeout seconds.
+    with socket.create_connection((host, port)) as sock:
+        sock.settimeout(idle_timeout)
+        pending = b""
+        while True:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                yield None
+                continue
+            if not data:
+                break
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8").rstrip("\r")
+        if pending:
+            yield pending.decode("utf-8")
+
+
+def parse_csv_records(lines, columns):
+    # The first line is a CSV header; yields (line, values of columns).
+    # Malformed lines are skipped; None is passed through.
+    indices = None
+    for line in lines:
+        if line is None:
+            yield None
+            continue
+        fields = line.split(",")
+        if indices is None:
+            indices = [fields.index(c) for c in columns]
+            continue
+        try:
+            yield line, [float(fields[i]) for i in indices]
+        except (IndexError, ValueError):
+            continue
+
+
+def detect_stream(records, detector, batch_size=256):
+    # Groups (line, values) records into micro-batches of up to batch_size,
+    # flushing early on None (source idle). Yields (line, Detection).
+    lines, batch = [], []
+    for record in records:
+        if record is not None:
+            lines.append(record[0])
+            batch.append(record[1])
+        if batch and (record is None or len(batch) >= batch_size):
+            yield from zip(lines, detector.update_batch(batch))
+            lines, batch = [], []
+    if batch:
+        yield from zip(lines, detector.update_batch(batch))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Flag anomalies in a live CSV feed, printing flagged lines."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="CSV file to follow (tail -f)")
+    source.add_argument("--socket", help="host:port sending CSV lines")
+    parser.add_argument("--columns", nargs="+", required=True)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.file:
+        lines = tail_file(args.file)
+    else:
+        host, port = args.socket.rsplit(":", 1)
+        lines = socket_lines(host, int(port))
+    detector = StreamingDetector(args.columns)
+    records = parse_csv_records(lines, args.columns)
+    for line, detection in detect_stream(records, detector, args.batch_size):
+        if detection.anomaly:
+            print(
+                f"{line},z={detection.z:.2f},ewma_z={detection.ewma_z:.2f},"
+                f"forest={detection.forest_score:.3f}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,223 @@
-import os
+import itertools
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import streamlit as st
-from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-import docx
-from ibm_watsonx_ai.foundation_models.model import Model
+from document_extractor import iter_document_pages
+from document_index import get_document_index
+from granite_client import configured_model_id, get_model
+from summary_cache import content_hash, get_summary_cache
 
-# Load environment variables
-load_dotenv()
 
-# IBM Credentials
-API_KEY = os.getenv("IBM_GRANITE_API_KEY")
-PROJECT_ID = os.getenv("IBM_GRANITE_PROJECT_ID")
-API_URL = os.getenv(
-    "IBM_GRANITE_URL"
-)  # just base URL like: https://us-south.ml.cloud.ibm.com
-MODEL_ID = os.getenv("MODEL_ID")  # e.g., granite-3b-instruct
+# Chunking limits. Token counts are estimated at ~4 characters per token.
+CHUNK_TOKEN_BUDGET = 1200
+MAX_PARALLEL_CHUNKS = 4
+CHARS_PER_TOKEN = 4
+PREVIEW_PAGES = 3
 
+SUMMARY_PARAMS = {
+    "max_new_tokens": 300,
+    "temperature": 0.5,
+    "top_p": 0.9,
+    "decoding_method": "sample",
+    "stop_sequences": [],
+}
 
-# Function to summarize text using IBM Granite SDK
-def summarize_text(text):
-    if len(text) > 5000:
-        text = text[:5000]
 
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_oversized(paragraph, max_chars):
+    # Fall back to sentence boundaries, then to hard cuts.
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def iter_chunks(pages, max_tokens=CHUNK_TOKEN_BUDGET):
+    # Pack whole pages/paragraphs (split on form feeds and blank lines) into
+    # chunks that fit the token budget, yielding each chunk as soon as it is
+    # full so extraction and summarization overlap.
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    current = ""
+    for page in pages:
+        for paragraph in re.split(r"\f|\n\s*\n", page):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            for piece in (
+                [paragraph]
+                if len(paragraph) <= max_chars
+                else _split_oversized(paragraph, max_chars)
+            ):
+                if current and len(current) + len(piece) + 2 > max_chars:
+                    yield current
+                    current = ""
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        yield current
+
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKEN_BUDGET):
+    return list(iter_chunks([text], max_tokens))
+
+
+def _generate(model, prompt):
+    response = model.generate_text(
+        prompt=prompt, params=SUMMARY_PARAMS, raw_response=True
+    )
+    if isinstance(response, dict) and response.get("results"):
+        result = response["results"][0]
+        return result.get("generated_text", "").strip(), {
+            "input_tokens": result.get("input_token_count", estimate_tokens(prompt)),
+            "output_tokens": result.get("generated_token_count", 0),
+        }
+    text = str(response)
+    return text, {
+        "input_tokens": estimate_tokens(prompt),
+        "output_tokens": estimate_tokens(text),
+    }
+
+
+def summarize_long_text(
+    text,
+    model=None,
+    max_tokens=CHUNK_TOKEN_BUDGET,
+    max_workers=MAX_PARALLEL_CHUNKS,
+    on_progress=None,
+):
+    # Map-reduce summary: summarize chunks concurrently, then merge partial
+    # summaries level by level until one remains. `text` may be a string or
+    # an iterable of page texts; chunks are submitted as pages arrive.
+    # on_progress(done, total, stage) is called from the calling thread.
+    model = model or get_model()
+    start = time.perf_counter()
+    stats = {"chunks": 0, "llm_calls": 0, "input_tokens": 0, "output_tokens": 0}
+    pages = [text] if isinstance(text, str) else text
+
+    def run_stage(prompts, stage):
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for prompt in prompts:
+                futures.append(pool.submit(_generate, model, prompt))
+                if on_progress:
+                    done = sum(future.done() for future in futures)
+                    on_progress(done, len(futures), stage)
+            for done, _ in enumerate(as_completed(futures), start=1):
+                if on_progress:
+                    on_progress(done, len(futures), stage)
+        results = []
+        for future in futures:
+            summary, usage = future.result()
+            results.append(summary)
+            stats["llm_calls"] += 1
+            stats["input_tokens"] += usage["input_tokens"]
+            stats["output_tokens"] += usage["output_tokens"]
+        return results
+
+    summaries = run_stage(
+        (
+            f"Summarize this text clearly:\n\n{chunk}"
+            for chunk in iter_chunks(pages, max_tokens)
+        ),
+        "map",
+    )
+    stats["chunks"] = len(summaries)
+    if not summaries:
+        return "", dict(stats, latency=time.perf_counter() - start, levels=0)
+    levels = 1
+    while len(summaries) > 1:
+        groups = split_into_chunks("\n\n".join(summaries), max_tokens)
+        # Guard against partial summaries too long to ever merge.
+        if len(groups) >= len(summaries):
+            groups = [
+                "\n\n".join(summaries[i : i + 2]) for i in range(0, len(summaries), 2)
+            ]
+        summaries = run_stage(
+            [
+                "Combine these partial summaries of one document into a single "
+                f"clear summary:\n\n{group}"
+                for group in groups
+            ],
+            f"reduce {levels}",
+        )
+        levels += 1
+
+    stats.update(latency=time.perf_counter() - start, levels=levels)
+    return summaries[0], stats
+
+
+def index_for_chat(text, name=None):
+    # Make the document searchable by the chat assistant. Already indexed
+    # texts are skipped, so this is cheap on repeat summaries.
     try:
-        model = Model(
-            model_id=MODEL_ID,
-            credentials={"apikey": API_KEY, "url": API_URL},
-            project_id=PROJECT_ID,
+        get_document_index().add_document(
+            content_hash(text), name or "Pasted text", text
         )
+    except Exception as e:
+        st.warning(f"⚠️ Could not add the document to the chat index: {e}")
+
+
+# Function to summarize text using IBM Granite SDK
+def summarize_text(text=None, on_progress=None, pages=None, file_hash=None, name=None):
+    # Summarize either `text`, or `pages` streamed from the extractor. Streamed
+    # pages are collected so the text and summary can be cached afterwards.
+    # The text is also added to the chat assistant's document index.
+    try:
+        # The key uses the configured model id, so a cache hit never needs
+        # the model (or its IAM token exchange).
+        model_id = configured_model_id()
+        # Everything that changes the output is part of the cache key.
+        config = dict(SUMMARY_PARAMS, chunk_token_budget=CHUNK_TOKEN_BUDGET)
+        cache = get_summary_cache()
+        if text is not None:
+            cached = cache.get_summary(text, model_id, config)
+            if cached is not None:
+                index_for_chat(text, name)
+                summary, stats = cached
+                return summary, dict(stats, cached=True)
 
-        prompt = f"Summarize this text clearly:\n\n{text}"
-
-        response = model.generate_text(
-            prompt=prompt,
-            params={
-                "max_new_tokens": 300,
-                "temperature": 0.5,
-                "top_p": 0.9,
-                "decoding_method": "sample",
-                "stop_sequences": [],
-            },
+        collected = []
+        if pages is not None:
+            source = (collected.append(page) or page for page in pages)
+        else:
+            source = text
+        summary, stats = summarize_long_text(
+            source, model=get_model(), on_progress=on_progress
         )
-        st.write("🧪 Raw Response:", response)
-        return response if isinstance(response, str) else str(response)
+        if pages is not None:
+            text = "\n\n".join(collected)
+            cache.put_text(text, file_hash)
+        index_for_chat(text, name)
+        if summary:
+            cache.put_summary(text, model_id, config, summary, stats)
+        return summary, dict(stats, cached=False)
 
     except Exception as e:
         st.error(f"IBM SDK Error: {str(e)}")
-        return None
+        return None, None
 
 
 # File text extraction
 def extract_text_from_file(uploaded_file):
-    file_type = uploaded_file.type
-
-    if "text/plain" in file_type:
-        return uploaded_file.read().decode("utf-8")
-    elif "application/pdf" in file_type:
-        reader = PdfReader(uploaded_file)
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
-    elif (
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        in file_type
-    ):
-        doc = docx.Document(uploaded_file)
-        return "\n".join([para.text for para in doc.paragraphs])
-    return None
+    pages = iter_document_pages(uploaded_file.getvalue(), uploaded_file.type)
+    if pages is None:
+        return None
+    return "\n\n".join(pages)
 
 
 # Streamlit app UI
@@ -74,6 +227,7 @@ def run_summarizer():
 
     option = st.radio("Choose input type:", ["Text", "Document"])
     text = ""
+    uploaded_file = None
 
     if option == "Text":
         text = st.text_area("Enter text to summarize", height=200)
@@ -82,12 +236,58 @@ def run_summarizer():
             "Upload document (TXT, PDF, DOCX)", type=["txt", "pdf", "docx"]
         )
         if uploaded_file:
-            text = extract_text_from_file(uploaded_file)
-            st.text_area("Extracted Text Preview", value=text, height=200)
-
-    if text and st.button("Summarize"):
-        with st.spinner("Generating summary..."):
-            summary = summarize_text(text)
-            if summary:
-                st.success("✅ Summary:")
-                st.write(summary)
+            data = uploaded_file.getvalue()
+            # Re-uploads of the same file skip extraction entirely.
+            file_hash = content_hash(data)
+            text = get_summary_cache().get_text(file_hash)
+            # Only the first few pages are extracted for the preview; the full
+            # document is streamed into the summarizer.
+            pages = iter_document_pages(data, uploaded_file.type, max_workers=1)
+            preview = "\n\n".join(itertools.islice(pages or [], PREVIEW_PAGES))
+            if pages is not None:
+                pages.close()
+            st.text_area(
+                f"Extracted Text Preview (first {PREVIEW_PAGES} pages)",
+                value=preview,
+                height=200,
+            )
+
+    if (text or uploaded_file) and st.button("Summarize"):
+        progress = st.progress(0.0, text="Generating summary...")
+
+        def on_progress(done, total, stage):
+            progress.progress(done / total, text=f"{stage}: {done}/{total} chunks")
+
+        name = uploaded_file.name if uploaded_file else None
+        if text:
+            summary, stats = summarize_text(text, on_progress=on_progress, name=name)
+        else:
+            summary, stats = summarize_text(
+                pages=iter_document_pages(data, uploaded_file.type),
+                file_hash=file_hash,
+                on_progress=on_progress,
+                name=name,
+            )
+        progress.empty()
+        if summary:
+            st.success("✅ Summary:" + (" (from cache)" if stats["cached"] else ""))
+            st.write(summary)
+            st.caption(
+                f"{stats['chunks']} chunks, {stats['llm_calls']} model calls, "
+                f"{stats['input_tokens']} input / {stats['output_tokens']} output "
+                f"tokens, {stats['latency']:.1f}s"
+            )
+
+    with st.expander("🗄️ Summary Cache Stats"):
+        cache_stats = get_summary_cache().stats()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Summaries", cache_stats["summaries"])
+        c2.metric("Documents", cache_stats["documents"])
+        c3.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+        st.write(
+            f"{cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+            f"{cache_stats['bytes'] / 1024 / 1024:.1f} of "
+            f"{cache_stats['max_bytes'] / 1024 / 1024:.0f} MB used"
+        )
+        if st.button("🧹 Clear Summary Cache"):
+            get_summary_cache().clear()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")
+SUMMARY_CACHE_MAX_BYTES = int(
+    os.getenv("SUMMARY_CACHE_MAX_BYTES", str(200 * 1024 * 1024))
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    text_hash TEXT PRIMARY KEY,
+    file_hash TEXT,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_file_hash ON documents (file_hash);
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    text_hash TEXT NOT NULL,
+    model_id TEXT,
+    summary TEXT NOT NULL,
+    stats TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def summary_key(text_hash, model_id, params):
+    config = json.dumps({"model_id": model_id, "params": params}, sort_keys=True)
+    return content_hash(f"{text_hash}:{config}")
+
+
+class SummaryCache:
+    # Content-addressed, size-bounded SQLite cache of extracted document text
+    # and generated summaries, evicted least-recently-used first.
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_bytes=SUMMARY_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get_text(self, file_hash):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text_hash, text FROM documents WHERE file_hash = ?",
+                (file_hash,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch("documents", "text_hash", row[0])
+            return row[1]
+
+    def put_text(self, text, file_hash=None):
+        text_hash = content_hash(text)
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            # Storing it would evict everything else, then itself.
+            return text_hash
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                (text_hash, file_hash, text, size, time.time()),
+            )
+            self._evict()
+        return text_hash
+
+    def get_summary(self, text, model_id, params):
+        key = summary_key(content_hash(text), model_id, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, stats FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch("summaries", "key", key)
+            return row[0], json.loads(row[1] or "{}")
+
+    def put_summary(self, text, model_id, params, summary, stats=None):
+        text_hash = content_hash(text)
+        key = summary_key(text_hash, model_id, params)
+        size = len(summary.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    text_hash,
+                    model_id,
+                    summary,
+                    json.dumps(stats or {}),
+                    size,
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+
+    def _touch(self, table, column, value):
+        with self._conn:
+            self._conn.execute(
+                f"UPDATE {table} SET last_access = ? WHERE {column} = ?",
+                (time.time(), value),
+            )
+
+    def _count(self, table):
+        return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def _total_bytes(self):
+        return self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM documents)"
+            " + (SELECT COALESCE(SUM(size), 0) FROM summaries)"
+        ).fetchone()[0]
+
+    def _evict(self):
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT 'documents', text_hash, size, last_access FROM documents"
+            " UNION ALL SELECT 'summaries', key, size, last_access FROM summaries"
+            " ORDER BY last_access"
+        )
+        doomed = []
+        for table, key, size, _ in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((table, key))
+            total -= size
+        for table, key in doomed:
+            column = "text_hash" if table == "documents" else "key"
+            self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "documents": self._count("documents"),
+                "summaries": self._count("summaries"),
+                "bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM summaries")
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache()
+        return _cache
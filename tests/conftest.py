@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# Keep tests offline and side-effect free: no recorded observations, a
+# throwaway document index, and the local fake Granite model without token
+# delays.
+os.environ.setdefault("OBSERVATIONS_ENABLED", "0")
+os.environ.setdefault("GRANITE_BACKEND", "fake")
+os.environ.setdefault("FAKE_MODEL_TOKEN_DELAY", "0")
+os.environ.setdefault("DOC_INDEX_DIR", tempfile.mkdtemp(prefix="doc_index_"))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class StubServer(ThreadingHTTPServer):
+    # Local JSON endpoint. Echoes the request's path and query after
+    # `latency` seconds; the first `fail_first` requests get `fail_status`.
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, fail_first=0, fail_status=429):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency)
+        with server._lock:
+            server.requests += 1
+            fail = server.requests <= server.fail_first
+        url = urlsplit(self.path)
+        if fail:
+            status, body = server.fail_status, {"error": "stub failure"}
+        else:
+            status, body = 200, {"path": url.path, "query": parse_qs(url.query)}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if fail:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    # Factory for StubServer instances served on background threads; all
+    # are shut down after the test.
+    servers = []
+
+    def start(**kwargs):
+        server = StubServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
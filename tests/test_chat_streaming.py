@@ -0,0 +1,52 @@
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from chatbot import build_prompt, stream_reply
+from granite_client import FakeModel
+
+
+def test_stream_reply_yields_the_full_reply_in_pieces():
+    model = FakeModel(token_delay=0)
+    chunks = list(stream_reply(model, "How can cities cut emissions?"))
+
+    assert len(chunks) > 1
+    expected = model.generate_text(prompt=build_prompt("How can cities cut emissions?"))
+    assert "".join(chunks) == expected
+
+
+def test_first_chunk_arrives_before_generation_finishes():
+    model = FakeModel(token_delay=0.02)
+    start = time.perf_counter()
+    stream = stream_reply(model, "Tell me about bike lanes")
+    next(stream)
+    first = time.perf_counter() - start
+    rest = list(stream)
+    total = time.perf_counter() - start
+
+    assert len(rest) > 5
+    assert first < total / 3
+
+
+def test_stream_reply_unwraps_raw_response_chunks():
+    class RawModel:
+        def generate_text_stream(self, prompt=None, params=None):
+            for text in ("Plant", " more", " trees"):
+                yield {"results": [{"generated_text": text}]}
+
+    assert "".join(stream_reply(RawModel(), "tips?")) == "Plant more trees"
+
+
+def test_chat_page_streams_a_reply_into_the_history():
+    at = AppTest.from_string(
+        "from chatbot import run_chatbot\nrun_chatbot()", default_timeout=30
+    )
+    at.run()
+    at.chat_input[0].set_value("What is a smart city?").run()
+
+    assert not at.exception
+    history = at.session_state.chat_history
+    assert history[0] == "What is a smart city?"
+    assert history[1].startswith("This is a fake response to:")
+    assert "pending_reply" not in at.session_state
+    assert at.chat_message[-1].markdown[-1].value == history[1]
@@ -0,0 +1,85 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+import http_client
+
+
+def test_concurrent_identical_requests_share_one_upstream_call(stub_server):
+    server = stub_server(latency=0.3)
+    url, params = server.base_url + "/data", {"q": "Hyderabad"}
+    before = http_client.client_stats()
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(http_client.get_json(url, params))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.requests == 1
+    assert len(results) == 8
+    assert all(r == {"path": "/data", "query": {"q": ["Hyderabad"]}} for r in results)
+    after = http_client.client_stats()
+    assert after["requests"] - before["requests"] == 1
+    assert after["coalesced"] - before["coalesced"] == 7
+    assert after["inflight"] == 0
+
+
+def test_different_params_are_not_coalesced(stub_server):
+    server = stub_server()
+    http_client.get_json(server.base_url + "/data", {"q": "Delhi"})
+    http_client.get_json(server.base_url + "/data", {"q": "Pune"})
+    assert server.requests == 2
+
+
+def test_throttled_and_failing_requests_are_retried(stub_server):
+    for status in (429, 503):
+        server = stub_server(fail_first=2, fail_status=status)
+        data = http_client.get_json(server.base_url + "/data", {"q": "Delhi"})
+        assert data["query"] == {"q": ["Delhi"]}
+        assert server.requests == 3
+
+
+def test_error_status_raises_once_retries_are_exhausted(stub_server):
+    server = stub_server(fail_first=100, fail_status=503)
+    with pytest.raises(requests.HTTPError) as info:
+        http_client.get_json(server.base_url + "/data", {"q": "Delhi"})
+    assert info.value.response.status_code == 503
+    assert server.requests == 1 + http_client.MAX_RETRIES
+    assert "Delhi" not in http_client.error_message(info.value)
+
+
+def test_client_errors_are_not_retried(stub_server):
+    server = stub_server(fail_first=100, fail_status=404)
+    with pytest.raises(requests.HTTPError):
+        http_client.get_json(server.base_url + "/data", {"q": "Nowhere"})
+    assert server.requests == 1
+
+
+def test_client_rate_limit_spaces_requests(stub_server):
+    server = stub_server()
+    http_client.set_rate_limit(urlsplit(server.base_url).netloc, 5, burst=1)
+    start = time.perf_counter()
+    for i in range(6):
+        http_client.get_json(server.base_url + "/data", {"i": i})
+    assert time.perf_counter() - start >= 0.9
+    assert server.requests == 6
+
+
+def test_rate_limiter_reports_the_wait_for_the_next_token():
+    limiter = http_client.RateLimiter(2, burst=1)
+    assert limiter.try_acquire() == 0
+    assert 0 < limiter.try_acquire() <= 0.5
+
+
+def test_rate_limiter_rejects_a_non_positive_rate():
+    with pytest.raises(ValueError):
+        http_client.RateLimiter(0)
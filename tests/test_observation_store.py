@@ -0,0 +1,36 @@
+import pytest
+
+import observation_store
+from observation_store import ObservationStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Recording switched on, into a throwaway database.
+    path = str(tmp_path / "observations.sqlite3")
+    monkeypatch.setattr(observation_store, "OBSERVATIONS_ENABLED", True)
+    monkeypatch.setattr(observation_store, "_store", ObservationStore(path))
+    return path
+
+
+def test_unexpected_payload_is_counted_not_raised(store, caplog):
+    before = observation_store.recording_stats()["errors"]
+    # Free-flow speed without a current speed cannot give a congestion.
+    observation_store.record_traffic(
+        1.0, 2.0, {"flowSegmentData": {"freeFlowSpeed": 50}}
+    )
+    assert observation_store.recording_stats()["errors"] == before + 1
+    assert "traffic_rows" in caplog.text
+
+
+def test_place_names_outlive_the_process(store, monkeypatch):
+    observation_store.record_weather(
+        {"coord": {"lat": 17.385, "lon": 78.4867}, "dt": 1, "name": "Hyderabad"}
+    )
+    # A fresh store on the same file, as after a restart.
+    monkeypatch.setattr(observation_store, "_store", ObservationStore(store))
+    observation_store.record_air_pollution(
+        17.385, 78.4867, {"list": [{"dt": 2, "main": {"aqi": 3}}]}
+    )
+    observation_store.get_observation_store().flush()
+    assert observation_store.get_observation_store().cities() == ["Hyderabad"]
@@ -0,0 +1,11 @@
+import threading
+
+import prewarm
+
+
+def test_zero_call_budget_disables_prewarming():
+    scheduler = prewarm.PrewarmScheduler(weather_api_key="key", calls_per_minute=0)
+    scheduler.hot.record("Pune")
+    assert scheduler.run_once() == 0
+    scheduler.start()
+    assert not any(t.name == "prewarm" for t in threading.enumerate())
@@ -0,0 +1,13 @@
+from summary_cache import SummaryCache
+
+
+def test_entries_larger_than_the_budget_are_not_stored(tmp_path):
+    cache = SummaryCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=100)
+    cache.put_text("small", file_hash="a")
+    cache.put_text("x" * 101, file_hash="b")
+    cache.put_summary("small", "m", {}, "y" * 101)
+
+    assert cache.get_text("a") == "small"
+    assert cache.get_text("b") is None
+    assert cache.get_summary("small", "m", {}) is None
+    assert cache.stats()["bytes"] == 5
@@ -0,0 +1,121 @@
+from urllib.parse import urlsplit
+
+import pandas as pd
+import pytest
+
+import http_client
+import traffic
+from benchmarks.stub_tomtom import start_stub
+
+CENTRE = (17.385, 78.4867)
+
+
+@pytest.fixture
+def tomtom(monkeypatch):
+    # Start a TomTom stub (start_stub's arguments), point traffic at it and
+    # empty the flow cache. The latest stub started serves the requests.
+    servers = []
+
+    def start(latency=0.0, qps=None):
+        server = start_stub(latency, qps)
+        servers.append(server)
+        monkeypatch.setattr(traffic, "TOMTOM_BASE_URL", server.base_url)
+        http_client.set_rate_limit(urlsplit(server.base_url).netloc, None)
+        return server
+
+    traffic._traffic_cache.clear()
+    yield start
+    traffic._traffic_cache.clear()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    # A fresh session without retries, so a 429 is final.
+    monkeypatch.setattr(http_client, "MAX_RETRIES", 0)
+    http_client.reset_session()
+    yield
+    monkeypatch.undo()
+    http_client.reset_session()
+
+
+def _expected_index(server, points):
+    # Extra travel time over free flow across the distinct stub segments.
+    segments = {}
+    for lat, lon in points:
+        flow = server.flow(lat, lon)["flowSegmentData"]
+        start = flow["coordinates"]["coordinate"][0]
+        segments[(start["latitude"], start["longitude"])] = flow
+    current = sum(f["currentTravelTime"] for f in segments.values())
+    free = sum(f["freeFlowTravelTime"] for f in segments.values())
+    return len(segments), 100 * (current / free - 1)
+
+
+def test_survey_merges_points_on_the_same_segment(tomtom):
+    # 0.5 km spacing on the stub's ~1 km segments: neighbours share one.
+    server = tomtom()
+    points = traffic.grid_points(*CENTRE, size=5, span_km=2)
+    df, errors, stats = traffic.survey_traffic(points, "key", max_workers=4)
+
+    expected_segments, expected_index = _expected_index(server, points)
+    assert errors == {}
+    assert stats["points"] == len(points) == 25
+    assert stats["segments"] == len(df) == expected_segments < len(points)
+    assert df["samples"].sum() == len(points)
+    assert stats["congestion_index"] == pytest.approx(expected_index)
+    assert df["congestion"].between(0, 1).all()
+
+
+def test_survey_serves_repeat_points_from_cache(tomtom):
+    server = tomtom()
+    points = traffic.grid_points(*CENTRE, size=3, span_km=4)
+    traffic.survey_traffic(points, "key")
+    requests = server.requests
+    _, _, stats = traffic.survey_traffic(points, "key")
+
+    assert server.requests == requests
+    assert stats["cached"] == len(points)
+
+
+def test_throttled_points_are_reported_and_not_cached(tomtom, no_retries):
+    # A quota too small for even one request: each point fails with the
+    # 429 body, and a later survey against a free stub goes upstream again.
+    throttled = tomtom(qps=0.001)
+    points = traffic.grid_points(*CENTRE, size=2, span_km=4)
+    df, errors, stats = traffic.survey_traffic(points, "key")
+
+    assert df.empty
+    assert set(errors) == set(points)
+    assert all("Too Many Requests" in message for message in errors.values())
+    assert stats["failed"] == len(points)
+    assert throttled.throttled == len(points)
+
+    tomtom()
+    df, errors, stats = traffic.survey_traffic(points, "key")
+    assert errors == {}
+    assert stats["cached"] == 0
+    assert stats["segments"] == len(df) > 0
+
+
+def test_unknown_corridor_names_the_known_ones(tmp_path, monkeypatch):
+    path = tmp_path / "corridors.json"
+    path.write_text('{"Hyderabad": {"Ring road": [[17.4, 78.5]]}}')
+    monkeypatch.setattr(traffic, "TRAFFIC_CORRIDORS_PATH", str(path))
+    with pytest.raises(ValueError, match="Ring road"):
+        traffic.survey_city("Hyderabad", *CENTRE, "key", corridor="Old city")
+
+
+def test_heatmap_shows_missing_speeds_as_na():
+    df = pd.DataFrame(
+        {
+            "lat": [17.4, 17.5],
+            "lon": [78.5, 78.6],
+            "current_speed": [None, 30.0],
+            "free_flow_speed": [None, 50.0],
+            "congestion": [None, 0.4],
+        }
+    )
+    fig = traffic.traffic_heatmap(df, *CENTRE)
+    assert list(fig.data[1].text) == ["n/a / n/a km/h", "30 / 50 km/h"]
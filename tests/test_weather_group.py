@@ -0,0 +1,15 @@
+import weather
+
+
+def test_group_fetch_skips_cities_with_fresh_weather(stub_server, monkeypatch):
+    server = stub_server()
+    monkeypatch.setattr(weather, "OPENWEATHERMAP_BASE_URL", server.base_url)
+    weather._city_id_cache.set(weather._city_key("Fresh"), 1)
+    weather._city_id_cache.set(weather._city_key("Stale"), 2)
+    weather._weather_cache.set(weather._city_key("Fresh"), {"id": 1})
+
+    weather.get_weather_group(["Fresh"], "key")
+    assert server.requests == 0
+
+    weather.get_weather_group(["Fresh", "Stale"], "key")
+    assert server.requests == 1
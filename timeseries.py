@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# Output frequencies offered for forecasts, finest first, with the horizon
+# suggested by default and the longest horizon allowed.
+FREQUENCIES = {
+    "h": ("Hourly", pd.Timedelta(hours=1), 24 * 7, 24 * 90),
+    "D": ("Daily", pd.Timedelta(days=1), 90, 365 * 5),
+    "W": ("Weekly", pd.Timedelta(weeks=1), 52, 52 * 5),
+    "MS": ("Monthly", pd.Timedelta(days=30), 24, 12 * 10),
+}
+
+MAX_CHART_POINTS = 2000
+
+
+def infer_frequency(ds):
+    # Closest entry of FREQUENCIES to the typical spacing of the timestamps.
+    # Irregular or gappy data is handled by using the median step.
+    values = np.unique(pd.to_datetime(ds).values)
+    if len(values) < 2:
+        return "D"
+    step = pd.Timedelta(np.median(np.diff(values)))
+    return min(FREQUENCIES, key=lambda f: abs(np.log(step / FREQUENCIES[f][1])))
+
+
+def coarser_frequencies(freq):
+    # Frequencies a series sampled at freq can be aggregated to.
+    names = list(FREQUENCIES)
+    return names[names.index(freq) :]
+
+
+def resample_series(df, freq, id_column=None, how="sum"):
+    # Sum y (e.g. kWh) into freq buckets, or average it with how="mean" for
+    # levels such as temperature. Duplicate timestamps are combined too,
+    # empty buckets are dropped, and partially covered buckets at either end
+    # are dropped so they do not look like a sudden dip.
+    keys = [pd.Grouper(key="ds", freq=freq)]
+    if id_column is not None:
+        keys.insert(0, id_column)
+    grouped = df.groupby(keys)["y"]
+    y = grouped.sum(min_count=1) if how == "sum" else grouped.agg(how)
+    out = pd.DataFrame({"y": y, "n": grouped.size()})
+    out = out.dropna(subset=["y"]).reset_index()
+
+    # Edge buckets with well under the typical number of raw rows are
+    # partial; series with fewer than three buckets are left alone.
+    series = (
+        out.groupby(id_column, sort=False)
+        if id_column
+        else out.groupby(np.zeros(len(out)))
+    )
+    pos = series.cumcount()
+    size = series["n"].transform("size")
+    interior = (pos > 0) & (pos < size - 1)
+    full = out["n"].where(interior).groupby(series.ngroup()).transform("median")
+    partial = ((pos == 0) | (pos == size - 1)) & (size >= 3) & (out["n"] < 0.8 * full)
+    columns = [id_column, "ds", "y"] if id_column else ["ds", "y"]
+    return out.loc[~partial, columns].reset_index(drop=True)
+
+
+def downsample_minmax(x, y, max_points=MAX_CHART_POINTS):
+    # Keep the min and max of each of max_points // 2 equal-count buckets,
+    # in time order, so peaks and dips survive. NaNs are dropped. Returns
+    # (x, y) unchanged when already small enough.
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    n = len(y)
+    buckets = max_points // 2
+    if n <= max_points or buckets < 1:
+        return x, y
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sorting by (bucket, y) puts each bucket's min first and max last.
+    order = np.lexsort((y, bucket))
+    idx = np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+    return x[idx], y[idx]
+
+
+def lttb_indices(x, y, max_points=MAX_CHART_POINTS):
+    # Largest-Triangle-Three-Buckets: indices of max_points points that
+    # keep the visual shape of the line. The first and last points are
+    # always kept. x must be sorted; datetimes are fine.
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    x = x.astype(float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    idx = np.empty(max_points, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex.
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+def downsample_lttb(x, y, max_points=MAX_CHART_POINTS):
+    idx = lttb_indices(x, y, max_points)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
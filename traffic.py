@@ -1,12 +1,301 @@
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import streamlit as st
-import requests
 import os
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from cache import TTLCache, coord_key
+from http_client import TOMTOM_BASE_URL, error_message, get_json
+from observation_store import record_congestion_index, record_traffic
+
+TRAFFIC_TTL = 2 * 60  # flow data changes quickly
+
+# Grid sampling: GRID_SIZE x GRID_SIZE points over a square GRID_SPAN_KM
+# wide, centred on the city. Requests still pass the per-host rate limit in
+# http_client, so more workers only help up to TOMTOM_RATE_LIMIT.
+GRID_SIZE = int(os.getenv("TRAFFIC_GRID_SIZE", "5"))
+GRID_SPAN_KM = float(os.getenv("TRAFFIC_GRID_SPAN_KM", "10"))
+SAMPLE_WORKERS = int(os.getenv("TRAFFIC_SAMPLE_WORKERS", "8"))
+# JSON file of {"city": {"area name": [[lat, lon], ...]}}; an area may also
+# be {"bbox": [south, west, north, east], "rows": 5, "cols": 5}.
+TRAFFIC_CORRIDORS_PATH = os.getenv("TRAFFIC_CORRIDORS_PATH", "traffic_corridors.json")
+KM_PER_DEGREE = 111.32
+
+# One entry per sample point; grids of a few cities fit comfortably.
+_traffic_cache = TTLCache(ttl=TRAFFIC_TTL, maxsize=4096)
+
+
+def _has_flow(data):
+    return isinstance(data, dict) and "flowSegmentData" in data
+
+
+def cache_stats():
+    return {"traffic": _traffic_cache.stats()}
+
+
+def cached_ttl(lat, lon):
+    return _traffic_cache.ttl_remaining(coord_key(lat, lon))
+
+
+def _fetch_flow(lat, lon, tomtom_api_key):
+    return get_json(
+        f"{TOMTOM_BASE_URL}/traffic/services/4/flowSegmentData/absolute/10/json",
+        params={"point": f"{lat},{lon}", "key": tomtom_api_key},
+    )
+
+
+def get_traffic_data(lat, lon, tomtom_api_key, refresh=False):
+    # refresh=True skips the lookup and replaces the cached value; used by
+    # the background prewarmer.
+    def fetch():
+        data = _fetch_flow(lat, lon, tomtom_api_key)
+        record_traffic(lat, lon, data)
+        return data
+
+    load = _traffic_cache.refresh if refresh else _traffic_cache.get_or_load
+    return load(coord_key(lat, lon), fetch, should_cache=_has_flow)
+
+
+def grid_points(lat, lon, size=GRID_SIZE, span_km=GRID_SPAN_KM):
+    # size x size points evenly spaced over a span_km square around lat/lon.
+    half_lat = span_km / 2 / KM_PER_DEGREE
+    half_lon = half_lat / max(math.cos(math.radians(lat)), 0.01)
+    return bbox_points(
+        lat - half_lat, lon - half_lon, lat + half_lat, lon + half_lon, size, size
+    )
+
+
+def bbox_points(south, west, north, east, rows, cols):
+    lats = np.linspace(south, north, rows) if rows > 1 else [(south + north) / 2]
+    lons = np.linspace(west, east, cols) if cols > 1 else [(west + east) / 2]
+    return [(float(a), float(b)) for a in lats for b in lons]
+
+
+def _area_points(area):
+    if isinstance(area, dict):
+        return bbox_points(
+            *area["bbox"], area.get("rows", GRID_SIZE), area.get("cols", GRID_SIZE)
+        )
+    return [(float(a), float(b)) for a, b in area]
+
+
+def load_corridors(path=None):
+    # {city (lower case): {area: [(lat, lon), ...]}}; empty if no file.
+    path = path or TRAFFIC_CORRIDORS_PATH
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        city.strip().lower(): {name: _area_points(area) for name, area in areas.items()}
+        for city, areas in data.items()
+    }
+
+
+def _segment_key(flow, lat, lon):
+    # TomTom snaps each point to the nearest road segment, so neighbouring
+    # points often return the same one. Its end coordinates identify it.
+    coords = (flow.get("coordinates") or {}).get("coordinate") or []
+    if len(coords) < 2:
+        return coord_key(lat, lon)
+    first, last = coords[0], coords[-1]
+    return (
+        flow.get("frc"),
+        coord_key(first["latitude"], first["longitude"]),
+        coord_key(last["latitude"], last["longitude"]),
+    )
+
+
+def _sample_point(lat, lon, tomtom_api_key, refresh):
+    key = coord_key(lat, lon)
+    cached = not refresh and _traffic_cache.peek(key) is not None
+    load = _traffic_cache.refresh if refresh else _traffic_cache.get_or_load
+    data = load(
+        key, lambda: _fetch_flow(lat, lon, tomtom_api_key), should_cache=_has_flow
+    )
+    return data, cached
+
+
+def survey_traffic(
+    points,
+    tomtom_api_key,
+    max_workers=SAMPLE_WORKERS,
+    refresh=False,
+    on_progress=None,
+):
+    # Fetch flow data for every (lat, lon) point through a bounded worker
+    # pool, each point cached on its own. Returns one row per distinct road
+    # segment and summary stats, including the congestion index: extra
+    # travel time over free flow across all segments, in percent.
+    start = time.perf_counter()
+    results, errors, cached = {}, {}, 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_sample_point, lat, lon, tomtom_api_key, refresh): (lat, lon)
+            for lat, lon in points
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            point = futures[future]
+            try:
+                data, hit = future.result()
+                cached += hit
+                if _has_flow(data):
+                    results[point] = data["flowSegmentData"]
+                else:
+                    errors[point] = str(data)[:200]
+            except Exception as e:
+                errors[point] = error_message(e)
+            if on_progress:
+                on_progress(done, len(points))
+    elapsed = time.perf_counter() - start
+
+    segments = {}
+    for (lat, lon), flow in results.items():
+        key = _segment_key(flow, lat, lon)
+        if key in segments:
+            segments[key]["samples"] += 1
+            continue
+        segments[key] = {
+            "lat": lat,
+            "lon": lon,
+            "frc": flow.get("frc"),
+            "current_speed": flow.get("currentSpeed"),
+            "free_flow_speed": flow.get("freeFlowSpeed"),
+            "current_travel_time": flow.get("currentTravelTime"),
+            "free_flow_travel_time": flow.get("freeFlowTravelTime"),
+            "confidence": flow.get("confidence"),
+            "road_closure": bool(flow.get("roadClosure")),
+            "samples": 1,
+        }
+    df = pd.DataFrame(
+        list(segments.values()),
+        columns=[
+            "lat",
+            "lon",
+            "frc",
+            "current_speed",
+            "free_flow_speed",
+            "current_travel_time",
+            "free_flow_travel_time",
+            "confidence",
+            "road_closure",
+            "samples",
+        ],
+    )
+    df["road_closure"] = df["road_closure"].astype(bool)
+    # 0 = free flow, 1 = standstill or closed.
+    ratio = df["current_speed"] / df["free_flow_speed"].where(df["free_flow_speed"] > 0)
+    df["congestion"] = (1 - ratio).clip(0, 1).where(~df["road_closure"], 1.0)
+
+    open_roads = df[~df["road_closure"]]
+    free = open_roads["free_flow_travel_time"].sum()
+    stats = {
+        "points": len(points),
+        "segments": len(df),
+        "failed": len(errors),
+        "cached": cached,
+        "closures": int(df["road_closure"].sum()),
+        "elapsed": elapsed,
+        "points_per_second": len(points) / elapsed if elapsed else 0.0,
+        "congestion_index": (
+            100 * (open_roads["current_travel_time"].sum() / free - 1)
+            if free
+            else float("nan")
+        ),
+        "mean_congestion": float(df["congestion"].mean()) if len(df) else float("nan"),
+    }
+    return df, errors, stats
+
+
+def survey_city(city, lat, lon, tomtom_api_key, corridor=None, **kwargs):
+    # Survey a named corridor of the city, or a grid around lat/lon, and
+    # record the congestion index in the observation store.
+    if corridor is not None:
+        areas = load_corridors().get(city.strip().lower(), {})
+        if corridor not in areas:
+            raise ValueError(
+                f"Unknown corridor {corridor!r} for {city}; "
+                f"known corridors: {', '.join(areas) or 'none'}"
+            )
+        points = areas[corridor]
+    else:
+        points = grid_points(lat, lon)
+    df, errors, stats = survey_traffic(points, tomtom_api_key, **kwargs)
+    if corridor is None and not math.isnan(stats["congestion_index"]):
+        record_congestion_index(lat, lon, stats["congestion_index"])
+    return df, errors, stats
+
+
+def _speed(value):
+    # TomTom omits speeds for some segments.
+    return "n/a" if value is None or pd.isna(value) else f"{value:.0f}"
+
+
+def traffic_heatmap(df, lat, lon):
+    # Congestion per sampled segment as a density layer with hoverable
+    # markers on top.
+    fig = go.Figure()
+    fig.add_trace(
+        go.Densitymap(
+            lat=df["lat"],
+            lon=df["lon"],
+            z=df["congestion"],
+            radius=30,
+            zmin=0,
+            zmax=1,
+            colorscale="RdYlGn_r",
+            showscale=False,
+            hoverinfo="skip",
+        )
+    )
+    fig.add_trace(
+        go.Scattermap(
+            lat=df["lat"],
+            lon=df["lon"],
+            mode="markers",
+            marker=dict(
+                size=9,
+                color=df["congestion"],
+                cmin=0,
+                cmax=1,
+                colorscale="RdYlGn_r",
+                colorbar=dict(title="Congestion"),
+            ),
+            text=[
+                f"{_speed(s)} / {_speed(f)} km/h"
+                for s, f in zip(df["current_speed"], df["free_flow_speed"])
+            ],
+            hovertemplate="%{text}<br>congestion %{marker.color:.0%}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        map=dict(style="open-street-map", center=dict(lat=lat, lon=lon), zoom=11),
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=500,
+    )
+    return fig
 
 
-def get_traffic_data(lat, lon, tomtom_api_key):
-    url = f"https://api.tomtom.com/traffic/services/4/flowSegmentData/absolute/10/json?point={lat},{lon}&key={tomtom_api_key}"
-    response = requests.get(url)
-    return response.json()
+def display_traffic_survey(df, errors, stats, lat, lon):
+    st.subheader("🗺️ Area Congestion")
+    c1, c2, c3, c4 = st.columns(4)
+    index = stats["congestion_index"]
+    c1.metric("Congestion Index", "n/a" if math.isnan(index) else f"{index:+.0f}%")
+    c2.metric("Segments", f"{stats['segments']} ({stats['points']} points)")
+    c3.metric("Road Closures", stats["closures"])
+    c4.metric("Throughput", f"{stats['points_per_second']:.1f} points/s")
+    st.caption(
+        "Congestion index: extra travel time over free flow across all sampled "
+        f"segments. {stats['cached']} points served from cache."
+    )
+    if len(df):
+        st.plotly_chart(traffic_heatmap(df, lat, lon), use_container_width=True)
+    if errors:
+        st.warning(f"⚠️ {len(errors)} points could not be sampled.")
 
 
 def display_traffic_data(data):
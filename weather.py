@@ -1,31 +1,265 @@
-import requests
-from datetime import datetime
+from collections import Counter
+
 import streamlit as st
-import openai
 import os
+import numpy as np
 import pandas as pd
-import altair as alt
+import requests
+from cache import TTLCache, coord_key
+from http_client import OPENWEATHERMAP_BASE_URL, get_json
+from observation_store import record_air_pollution, record_weather
+
+# Shared caches for every OpenWeatherMap call in this module. They live at
+# module level, so all Streamlit sessions in the process share them.
+WEATHER_TTL = 10 * 60  # current conditions: minutes
+FORECAST_TTL = 3 * 60 * 60  # 3-hourly forecast: hours
+AIR_POLLUTION_TTL = 30 * 60
+GEOCODE_TTL = 30 * 24 * 60 * 60  # city coordinates practically never change
+
+_weather_cache = TTLCache(ttl=WEATHER_TTL, maxsize=512)
+_forecast_cache = TTLCache(ttl=FORECAST_TTL, maxsize=512)
+_air_pollution_cache = TTLCache(ttl=AIR_POLLUTION_TTL, maxsize=512)
+_geocode_cache = TTLCache(ttl=GEOCODE_TTL, maxsize=4096)
+_city_id_cache = TTLCache(ttl=GEOCODE_TTL, maxsize=4096)
+# Parsed forecast frames, keyed by the id() of the payload they came from.
+_forecast_frame_cache = TTLCache(ttl=FORECAST_TTL, maxsize=512)
+
+# OpenWeatherMap's group endpoint accepts at most 20 city IDs per call.
+GROUP_MAX_IDS = 20
+
+
+def _city_key(city):
+    return city.strip().lower()
+
+
+def _has_coords(data):
+    return isinstance(data, dict) and "coord" in data
+
+
+def _has_list(data):
+    return isinstance(data, dict) and "list" in data
+
 
+def cache_stats():
+    return {
+        "geocode": _geocode_cache.stats(),
+        "weather": _weather_cache.stats(),
+        "forecast": _forecast_cache.stats(),
+        "air_pollution": _air_pollution_cache.stats(),
+    }
 
-def get_weather_data(city, weather_api_key):
-    base_url = "http://api.openweathermap.org/data/2.5/weather?"
-    complete_url = base_url + "appid=" + weather_api_key + "&q=" + city
-    response = requests.get(complete_url)
-    return response.json()
 
+def clear_caches():
+    for c in (
+        _geocode_cache,
+        _city_id_cache,
+        _weather_cache,
+        _forecast_cache,
+        _forecast_frame_cache,
+        _air_pollution_cache,
+    ):
+        c.clear()
 
-def get_weekly_forecast(weather_api_key, lat, lon):
-    base_url = "https://api.openweathermap.org/data/2.5/"
-    complete_url = f"{base_url}forecast?lat={lat}&lon={lon}&appid={weather_api_key}"
-    response = requests.get(complete_url)
-    return response.json()
+
+def _fetch_weather_data(city, weather_api_key):
+    try:
+        data = get_json(
+            f"{OPENWEATHERMAP_BASE_URL}/data/2.5/weather",
+            params={"q": city, "appid": weather_api_key},
+        )
+    except requests.HTTPError as e:
+        # An unknown city is a 404; callers check for "cod" 404 rather than
+        # handling an exception.
+        if e.response is not None and e.response.status_code == 404:
+            return {"cod": 404, "message": "city not found"}
+        raise
+    record_weather(data)
+    return data
+
+
+def _load(cache, refresh):
+    # refresh=True skips the lookup and replaces the cached value; used by
+    # the background prewarmer.
+    return cache.refresh if refresh else cache.get_or_load
+
+
+def get_weather_data(city, weather_api_key, refresh=False):
+    data = _load(_weather_cache, refresh)(
+        _city_key(city),
+        lambda: _fetch_weather_data(city, weather_api_key),
+        should_cache=_has_coords,
+    )
+    if _has_coords(data):
+        _remember_city(city, data)
+    return data
+
+
+def _remember_city(city, data):
+    _geocode_cache.set(_city_key(city), (data["coord"]["lat"], data["coord"]["lon"]))
+    if "id" in data:
+        _city_id_cache.set(_city_key(city), data["id"])
+
+
+def get_cached_city_id(city):
+    return _city_id_cache.get(_city_key(city))
+
+
+def get_weather_group(cities, weather_api_key):
+    # Fetch current weather for cities whose OpenWeatherMap IDs are already
+    # known, 20 per request, and fill the per-city weather cache. Cities whose
+    # cached weather is still fresh are skipped. Returns the cities that were
+    # fetched this way.
+    ids = {}
+    for city in cities:
+        if _weather_cache.peek(_city_key(city)) is not None:
+            continue
+        city_id = get_cached_city_id(city)
+        if city_id is not None:
+            ids.setdefault(city_id, []).append(city)
+
+    served = []
+    id_list = list(ids)
+    for i in range(0, len(id_list), GROUP_MAX_IDS):
+        chunk = id_list[i : i + GROUP_MAX_IDS]
+        data = get_json(
+            f"{OPENWEATHERMAP_BASE_URL}/data/2.5/group",
+            params={"id": ",".join(str(c) for c in chunk), "appid": weather_api_key},
+        )
+        for entry in data.get("list", []) if isinstance(data, dict) else []:
+            record_weather(entry)
+            for city in ids.get(entry.get("id"), []):
+                _weather_cache.set(_city_key(city), entry)
+                served.append(city)
+    return served
+
+
+def get_cached_coords(city):
+    return _geocode_cache.peek(_city_key(city))
+
+
+def cached_ttl(kind, city=None, lat=None, lon=None):
+    # Seconds until the cached "weather" (by city), "forecast" or
+    # "air_pollution" (by coordinates) entry expires, or None if absent.
+    if kind == "weather":
+        return _weather_cache.ttl_remaining(_city_key(city))
+    if kind == "forecast":
+        return _forecast_cache.ttl_remaining(("standard",) + coord_key(lat, lon))
+    return _air_pollution_cache.ttl_remaining(coord_key(lat, lon))
+
+
+def get_city_coords(city, weather_api_key):
+    # Resolve a city to (lat, lon). Returns None if the city is unknown.
+    coords = _geocode_cache.get(_city_key(city))
+    if coords is not None:
+        return coords
+    data = get_weather_data(city, weather_api_key)
+    if _has_coords(data):
+        return data["coord"]["lat"], data["coord"]["lon"]
+    return None
+
+
+def get_weekly_forecast(weather_api_key, lat, lon, refresh=False):
+    def fetch():
+        return get_json(
+            f"{OPENWEATHERMAP_BASE_URL}/data/2.5/forecast",
+            params={"lat": lat, "lon": lon, "appid": weather_api_key},
+        )
+
+    return _load(_forecast_cache, refresh)(
+        ("standard",) + coord_key(lat, lon), fetch, should_cache=_has_list
+    )
+
+
+def _parse_forecast(forecast_data):
+    entries = forecast_data["list"]
+    dt = np.fromiter((e["dt"] for e in entries), dtype=np.int64, count=len(entries))
+    main = np.array(
+        [
+            (
+                e["main"]["temp"],
+                e["main"]["temp_min"],
+                e["main"]["temp_max"],
+                e["main"]["humidity"],
+                e["wind"]["speed"],
+            )
+            for e in entries
+        ],
+        dtype=float,
+    ).reshape(-1, 5)
+    description = [e["weather"][0]["description"] for e in entries]
+    # Payloads fetched without units=metric are in Kelvin. No surface
+    # temperature is above 150 in Celsius or below it in Kelvin.
+    if len(main) and np.median(main[:, 0]) > 150:
+        main[:, :3] -= 273.15
+
+    # Days are calendar days in the city's own timezone. Entries are in
+    # time order, so each day is a contiguous run.
+    local = dt + forecast_data.get("city", {}).get("timezone", 0)
+    day = local // 86400
+    starts = np.flatnonzero(np.diff(day, prepend=day[:1] - 1))
+    counts = np.diff(np.append(starts, len(day)))
+
+    frame = pd.DataFrame(
+        {
+            "time": local.astype("datetime64[s]"),
+            "temp_c": main[:, 0],
+            "temp_min_c": main[:, 1],
+            "temp_max_c": main[:, 2],
+            "humidity": main[:, 3],
+            "wind_speed": main[:, 4],
+            "description": description,
+        }
+    )
+    daily = pd.DataFrame(
+        {
+            "date": (day[starts] * 86400).astype("datetime64[s]"),
+            "temp_min_c": np.minimum.reduceat(main[:, 1], starts),
+            "temp_max_c": np.maximum.reduceat(main[:, 2], starts),
+            "temp_mean_c": np.add.reduceat(main[:, 0], starts) / counts,
+            "humidity": np.add.reduceat(main[:, 3], starts) / counts,
+            "wind_speed": np.add.reduceat(main[:, 4], starts) / counts,
+            "wind_speed_max": np.maximum.reduceat(main[:, 4], starts),
+            # The day's most frequent description; ties go to the earliest.
+            "description": [
+                Counter(description[lo : lo + n]).most_common(1)[0][0]
+                for lo, n in zip(starts, counts)
+            ],
+        }
+    )
+    return frame, daily
+
+
+def forecast_frames(forecast_data):
+    # (entries, daily) DataFrames for a 3-hourly forecast payload, parsed
+    # once and shared by every renderer. entries has one row per
+    # timestamp; daily has true per-day min/max/mean, all in °C.
+    key = id(forecast_data)
+    hit = _forecast_frame_cache.get(key)
+    # The payload is kept alongside so its id() cannot be reused.
+    if hit is not None and hit[0] is forecast_data:
+        return hit[1], hit[2]
+    entries, daily = _parse_forecast(forecast_data)
+    _forecast_frame_cache.set(key, (forecast_data, entries, daily))
+    return entries, daily
+
+
+def display_current_weather(weather_data):
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(
+            "🌡️ Temperature",
+            f"{weather_data['main']['temp'] - 273.15:.2f}°C",
+        )
+        st.metric("💧 Humidity", f"{weather_data['main']['humidity']}%")
+    with col2:
+        st.metric("📊 Pressure", f"{weather_data['main']['pressure']} hPa")
+        st.metric("🌬️ Wind Speed", f"{weather_data['wind']['speed']} m/s")
 
 
 def display_weekly_forecast(data):
     try:
         st.write("__________________________________________________")
         st.write("### weekly weather forecast")
-        displayed_dates = set()
         c1, c2, c3, c4 = st.columns(4)
         with c1:
             st.metric("", "Day")
@@ -36,27 +270,19 @@ def display_weekly_forecast(data):
         with c4:
             st.metric("", "max_temp")
 
-        for day in data["list"]:
-            date = datetime.fromtimestamp(day["dt"]).strftime("%A, %B, %d")
-
-            if date not in displayed_dates:
-                displayed_dates.add(date)
-
-                min_temp = day["main"]["temp_min"] - 273.15
-                max_temp = day["main"]["temp_max"] - 273.15
-                description = day["weather"][0]["description"]
+        _, daily = forecast_frames(data)
+        for day in daily.itertuples():
+            with c1:
+                st.write(day.date.strftime("%A, %B, %d"))
 
-                with c1:
-                    st.write(f"{date}")
+            with c2:
+                st.write(f"{day.description.capitalize()}")
 
-                with c2:
-                    st.write(f"{description.capitalize()}")
+            with c3:
+                st.write(f"{day.temp_min_c:.1f}degree C")
 
-                with c3:
-                    st.write(f"{min_temp:.1f}degree C")
-
-                with c4:
-                    st.write(f"{max_temp:.1f}degree C")
+            with c4:
+                st.write(f"{day.temp_max_c:.1f}degree C")
 
     except Exception as e:
         st.error("Error in displaying weekly forecast: " + str(e))
@@ -65,18 +291,30 @@ def display_weekly_forecast(data):
 def get_weather_data1(city, weather_api_key):
     if not weather_api_key:
         raise ValueError("Missing OpenWeatherMap API key")
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={weather_api_key}"
-    response = requests.get(url)
-    return response.json()
+    return get_weather_data(city, weather_api_key)
 
 
 def get_weekly_forecast1(lat, lon, weather_api_key):
-    url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&units=metric&appid={weather_api_key}"
-    response = requests.get(url)
-    return response.json()
+    def fetch():
+        return get_json(
+            f"{OPENWEATHERMAP_BASE_URL}/data/2.5/forecast",
+            params={
+                "lat": lat,
+                "lon": lon,
+                "units": "metric",
+                "appid": weather_api_key,
+            },
+        )
+
+    return _forecast_cache.get_or_load(
+        ("metric",) + coord_key(lat, lon), fetch, should_cache=_has_list
+    )
 
 
 def generate_forecast_summary1(forecast_data, openai_api_key):
+    # openai is slow to import and only needed here.
+    import openai
+
     openai.api_key = openai_api_key
 
     try:
@@ -109,24 +347,27 @@ def display_weekly_forecast1(forecast_data, summary):
         st.success(summary)
 
     st.markdown("### 📅 Detailed Forecast")
-    displayed_days = set()
-    for entry in forecast_data["list"]:
-        date = entry["dt_txt"].split(" ")[0]
-        if date not in displayed_days:
-            displayed_days.add(date)
-            time = entry["dt_txt"].split(" ")[1]
-            desc = entry["weather"][0]["description"]
-            temp_min = entry["main"]["temp_min"]
-            temp_max = entry["main"]["temp_max"]
-            st.write(
-                f"**{date} ({time})**: {desc.capitalize()}, 🌡️ {temp_min:.1f}°C to {temp_max:.1f}°C"
-            )
+    _, daily = forecast_frames(forecast_data)
+    for day in daily.itertuples():
+        st.write(
+            f"**{day.date:%Y-%m-%d}**: {day.description.capitalize()}, "
+            f"🌡️ {day.temp_min_c:.1f}°C to {day.temp_max_c:.1f}°C "
+            f"(avg {day.temp_mean_c:.1f}°C)"
+        )
+
 
+def get_air_pollution_data(lat, lon, weather_api_key, refresh=False):
+    def fetch():
+        data = get_json(
+            f"{OPENWEATHERMAP_BASE_URL}/data/2.5/air_pollution",
+            params={"lat": lat, "lon": lon, "appid": weather_api_key},
+        )
+        record_air_pollution(lat, lon, data)
+        return data
 
-def get_air_pollution_data(lat, lon, weather_api_key):
-    url = f"http://api.openweathermap.org/data/2.5/air_pollution?lat={lat}&lon={lon}&appid={weather_api_key}"
-    response = requests.get(url)
-    return response.json()
+    return _load(_air_pollution_cache, refresh)(
+        coord_key(lat, lon), fetch, should_cache=_has_list
+    )
 
 
 def display_air_pollution(data):
@@ -153,30 +394,19 @@ def display_air_pollution(data):
         st.error("Error displaying air pollution data: " + str(e))
 
 
-import pandas as pd
-import altair as alt
-
-
 def plot_forecast_chart(forecast_data):
-    # Prepare data
-    daily_data = []
-    seen_dates = set()
-
-    for entry in forecast_data["list"]:
-        date_str = entry["dt_txt"].split(" ")[0]
-        if date_str not in seen_dates:
-            seen_dates.add(date_str)
-            daily_data.append(
-                {
-                    "Date": date_str,
-                    "Min Temp (°C)": entry["main"]["temp_min"],
-                    "Max Temp (°C)": entry["main"]["temp_max"],
-                    "Humidity (%)": entry["main"]["humidity"],
-                    "Wind Speed (m/s)": entry["wind"]["speed"],
-                }
-            )
-
-    df = pd.DataFrame(daily_data)
+    import altair as alt
+
+    _, daily = forecast_frames(forecast_data)
+    df = daily.rename(
+        columns={
+            "date": "Date",
+            "temp_min_c": "Min Temp (°C)",
+            "temp_max_c": "Max Temp (°C)",
+            "humidity": "Humidity (%)",
+            "wind_speed": "Wind Speed (m/s)",
+        }
+    )
 
     st.subheader("📈 Temperature Forecast")
     temp_chart = (